@@ -0,0 +1,78 @@
+import re
+
+# One alternative per lexical element, in shlex posix order of precedence.
+# The last group only matches an unterminated quote or a trailing backslash.
+_word_pattern = re.compile(r'''(\s+)|([^\s"'\\]+)|"((?:[^"\\]|\\.)*)"|'([^']*)'|\\(.)|(.)''', re.S)
+_double_quote_escape = re.compile(r'\\([\\"])')
+_unterminated_escape = re.compile(r'(?:[^"\\]|\\.)*\\\Z', re.S)
+
+def _scan_double_quoted(parts:list[str]) -> list[tuple[str, bool]]:
+    # parts is line.split('"') for a line with balanced double quotes and no
+    # other quoting, so odd parts are quoted and even parts are bare text
+    words = []
+    joining = False
+    for i, part in enumerate(parts):
+        if i % 2:
+            if joining:
+                words[-1] = (words[-1][0] + part, True)
+            else:
+                words.append((part, True))
+            joining = True
+            continue
+        if not part:
+            continue
+        pieces = part.split()
+        if not pieces:
+            joining = False
+            continue
+        start = 0
+        if joining and not part[0].isspace():
+            words[-1] = (words[-1][0] + pieces[0], True)
+            start = 1
+        words.extend((piece, False) for piece in pieces[start:])
+        joining = not part[-1].isspace()
+    return words
+
+def scan_words(line:str) -> list[tuple[str, bool]]:
+    """
+    Splits a line like split_line, pairing each word with whether any part
+    of it was quoted.
+    """
+    if "'" not in line and "\\" not in line:
+        if '"' not in line:
+            return [(word, False) for word in line.split()]
+        parts = line.split('"')
+        if len(parts) % 2:
+            return _scan_double_quoted(parts)
+
+    words = []
+    current = None
+    quoted = False
+    for match in _word_pattern.finditer(line):
+        group = match.lastindex
+        text = match.group(group)
+        if group == 1:
+            if current is not None:
+                words.append((current, quoted))
+                current = None
+                quoted = False
+            continue
+        if group == 6:
+            if text == "\\" or (text == '"' and _unterminated_escape.match(line, match.end())):
+                raise ValueError("No escaped character")
+            raise ValueError("No closing quotation")
+        if group == 3:
+            text = _double_quote_escape.sub(r"\1", text)
+        quoted = quoted or group in (3, 4)
+        current = text if current is None else current + text
+    if current is not None:
+        words.append((current, quoted))
+    return words
+
+def split_line(line:str) -> list[str]:
+    """
+    Splits a line into words with the same quoting rules as shlex.split.
+    """
+    if '"' not in line and "'" not in line and "\\" not in line:
+        return line.split()
+    return [word for word, quoted in scan_words(line)]
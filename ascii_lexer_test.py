@@ -0,0 +1,34 @@
+import io, shlex
+
+import pytest
+
+from ascii_lexer import split_line
+from model.track_def import track_def
+
+def test_split_line_matches_shlex():
+    lines = [
+        'FRAME 256 0 0 0 -16384 0 0 0',
+        'TAG "C01AELFC01A_ELF_TRACK"',
+        'SPRITE ""',
+        'FRAME "ELFCH0001.BMP" "ELFCH0001"',
+        'a"b c"d \'e f\' g\\ h',
+        '"escaped \\" quote" "back\\\\slash" "keep\\x"',
+        '\t  ',
+    ]
+    for line in lines:
+        assert split_line(line) == shlex.split(line)
+
+def test_split_line_errors():
+    with pytest.raises(ValueError):
+        split_line('TAG "unterminated')
+    with pytest.raises(ValueError):
+        split_line("TAG trailing\\")
+
+def test_track_def_reads_through_lexer():
+    r = io.StringIO('\tTAGINDEX 0\n\tSPRITE "ELF_DMSPRITEDEF"\n\tNUMFRAMES 1\n\t\tFRAME 256 1 2 3 -16384 4 5 6\n\tNUMLEGACYFRAMES 0\n')
+
+    definition = track_def("ELF_TRACKDEF", r)
+
+    assert definition.sprite == "ELF_DMSPRITEDEF"
+    assert definition.frames[0].xyz == (1, 2, 3)
+    assert definition.frames[0].rot_scale == -16384
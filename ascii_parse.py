@@ -1,4 +1,5 @@
-import io, shlex
+import io
+from ascii_lexer import split_line
 
 def parse_property(r:io.TextIOWrapper=None, property:str="", num_args:int=-1) -> list[str]:
     if r is None:
@@ -6,12 +7,12 @@ def parse_property(r:io.TextIOWrapper=None, property:str="", num_args:int=-1) ->
     if property == "":
         raise Exception("empty property")
     for line in r:
-        if line.find("//"):
+        if "//" in line:
             line = line.split("//")[0]
         line = line.strip()
         if line == "":
             continue
-        records = shlex.split(line)
+        records = split_line(line)
         if len(records) == 0:
             raise Exception("%s: empty records (%s)" % (property, line))
         if records[0] != property:
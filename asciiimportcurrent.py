@@ -2,6 +2,7 @@ import bpy
 import bmesh
 import mathutils
 from mathutils import Quaternion
+import numpy as np
 import os
 import sys
 
@@ -13,13 +14,48 @@ if script_dir not in sys.path:
 
 # Import the modules
 from eq_ascii_wld_parser import eq_ascii_parse
+from dmspritedef2_parse import geometry_key, material_slots
 from calculations import euler_to_quaternion
 from create_polyhedron import create_polyhedron
 from material_creator import create_materials  # Import the material creation function
+from mesh_builder import build_mesh, pydata_mesh
+from keyframe_writer import write_bone_keyframes
+from pose_channels import track_channels
+from weld_mesh import weld_mesh
+from import_stats import import_stats
 
 # Path to the text file
 file_path = r"C:\Users\dariu\Documents\Quail\globalelf_chr.old.quail\elf.mod"
 
+# Import statistics: set stats_path to write them as JSON, and name stages
+# (e.g. "animation") to run them under cProfile or tracemalloc
+stats_path = None
+profile_stages = []
+trace_memory_stages = []
+stats = import_stats(profile_stages, trace_memory_stages)
+
+# Merge duplicate vertices before building meshes: None leaves meshes as parsed,
+# 0.0 welds exact duplicates, a positive value also welds within that distance
+weld_epsilon = None
+
+# Build mesh geometry with mesh_builder.build_mesh (bulk foreach_set) instead of
+# from_pydata and per-loop UV assignment. Off until mesh_build_benchmark.py has
+# been timed in Blender
+bulk_mesh_build = False
+
+# Processes that parse include files (eq_ascii_parse workers), 0 parses inside
+# Blender. Blender's Python may not start worker processes, so it stays opt-in
+parse_workers = 0
+
+# Thin animation keys before writing them: None keeps a key per frame, 0.0 drops
+# constant channels to one key and keys on straight runs, a positive value also
+# drops keys that interpolation reproduces within it (see keyframe_writer)
+keyframe_tolerance = None
+
+# Only import meshes and polyhedrons inside ((min x, y, z), (max x, y, z)), e.g. one
+# area of a zone; None imports everything
+import_bbox = None
+
 # Get the base name for the main object
 base_name = os.path.splitext(os.path.basename(file_path))[0]
 prefix = base_name.upper()
@@ -34,20 +70,27 @@ def clear_console():
 clear_console()
 
 # Read 3D data from file using eq_ascii_wld_parser
-meshes, armature_data, track_definitions, material_palettes, include_files, polyhedrons, textures, materials = eq_ascii_parse(file_path)
+with stats.stage("eq_ascii_parse"):
+    meshes, armature_data, track_definitions, material_palettes, include_files, polyhedrons, textures, materials = eq_ascii_parse(file_path, stats=stats, mesh_arrays=True, bbox=import_bbox, workers=parse_workers)
 
 # Cache for node groups
 node_group_cache = {}
 
+# Mesh datablocks by geometry_key, shared by meshes that only differ by tag
+mesh_cache = {}
+
 # Create materials using the separate script
-created_materials = create_materials(materials, textures, file_path, node_group_cache)
+with stats.stage("materials"):
+    created_materials = create_materials(materials, textures, file_path, node_group_cache)
+stats.count("materials", len(created_materials))
 
 # Create polyhedron objects
 polyhedron_objects = {}
 
-for polyhedron_data in polyhedrons:
-    polyhedron_obj = create_polyhedron(polyhedron_data)
-    polyhedron_objects[polyhedron_data['name']] = polyhedron_obj
+with stats.stage("polyhedrons"):
+    for polyhedron_data in polyhedrons:
+        polyhedron_obj = create_polyhedron(polyhedron_data)
+        polyhedron_objects[polyhedron_data['name']] = polyhedron_obj
 
 # Create a new main object
 main_obj = bpy.data.objects.new(base_name, None)
@@ -56,7 +99,29 @@ bpy.context.collection.objects.link(main_obj)
 def create_mesh(mesh_data, parent_obj, armature_obj=None):
     #print(f"Creating mesh '{mesh_data['name']}'")
 
-    mesh = bpy.data.meshes.new(mesh_data['name'])
+    if weld_epsilon is not None:
+        with stats.stage("weld"):
+            welded = weld_mesh(mesh_data, weld_epsilon)
+        stats.count("welded_vertices", len(mesh_data['vertices']) - len(welded['vertices']))
+        mesh_data = welded
+
+    # Identical geometry with the same material slots reuses the datablock built first
+    if 'face_materials' in mesh_data and mesh_data['face_materials']:
+        palette = material_palettes.get(mesh_data.get('material_palette'), ())
+        slot_materials, material_indices = material_slots(mesh_data, palette, created_materials)
+    else:
+        slot_materials, material_indices = [], None
+    key, geometry_bytes = geometry_key(mesh_data, slot_materials, material_indices)
+    mesh = mesh_cache.get(key)
+    shared = mesh is not None
+    if shared:
+        stats.count("meshes_shared")
+        stats.count("shared_geometry_bytes", geometry_bytes)
+    else:
+        # Vertices, faces, UVs and normals (see mesh_builder and bulk_mesh_build)
+        build = build_mesh if bulk_mesh_build else pydata_mesh
+        mesh = build(mesh_data['name'], mesh_data['vertices'], mesh_data['faces'], mesh_data['uvs'], mesh_data['normals'])
+        mesh_cache[key] = mesh
     obj = bpy.data.objects.new(mesh_data['name'], mesh)
     bpy.context.collection.objects.link(obj)
     obj.parent = parent_obj
@@ -65,31 +130,18 @@ def create_mesh(mesh_data, parent_obj, armature_obj=None):
     center_offset = mathutils.Vector(mesh_data.get('center_offset', [0.0, 0.0, 0.0]))
     obj.location = center_offset
 
-    # Extract only the first three vertices for each face
-    faces_for_creation = [face[:3] for face in mesh_data['faces']]
-
-    mesh.from_pydata(mesh_data['vertices'], [], faces_for_creation)
-    mesh.update()
-
-    # == UV mapping ==
-    if 'uvs' in mesh_data and mesh_data['uvs']:  # Check if UV data is present
-        uvlayer = mesh.uv_layers.new(name=mesh_data['name'] + "_uv")
-        for i, triangle in enumerate(mesh.polygons):
-            vertices = list(triangle.vertices)
-            for j, vertex in enumerate(vertices):
-                uvlayer.data[triangle.loop_indices[j]].uv = (mesh_data['uvs'][vertex][0], mesh_data['uvs'][vertex][1] - 1)
+    stats.count("meshes")
+    stats.count("vertices", len(mesh_data['vertices']))
+    stats.count("faces", len(mesh_data['faces']))
 
-    # == Apply Custom Normals ==
-    if 'normals' in mesh_data and len(mesh_data['normals']) == len(mesh_data['vertices']):
-        mesh.use_auto_smooth = True  # Enable auto smooth for custom normals
-        mesh.normals_split_custom_set_from_vertices(mesh_data['normals'])
-
-    # Create vertex groups if armature data is available
+    # Create vertex groups if armature data is available, one per bone even when
+    # the bone has several runs of vertices
     if armature_obj and 'vertex_groups' in mesh_data and mesh_data['vertex_groups']:
-        for vg_start, vg_end, bone_index in mesh_data['vertex_groups']:
+        vertex_bones = mesh_data['vertex_bone_indices']
+        for bone_index in dict.fromkeys(bone_index for _, _, bone_index in mesh_data['vertex_groups']):
             bone_name = armature_data['bones'][bone_index]['name']
             group = obj.vertex_groups.new(name=bone_name)
-            group.add(range(vg_start, vg_end), 1.0, 'ADD')
+            group.add(np.flatnonzero(vertex_bones == bone_index).tolist(), 1.0, 'ADD')
         
     # Create materials only if face materials exist
     if 'face_materials' in mesh_data and mesh_data['face_materials']:
@@ -101,35 +153,23 @@ def create_mesh(mesh_data, parent_obj, armature_obj=None):
 
             materials = material_palettes[palette_name]
             for mat_name in materials:
-                if mat_name in created_materials:
-                    obj.data.materials.append(created_materials[mat_name])
-                else:
+                if mat_name not in created_materials:
                     print(f"Warning: Material '{mat_name}' not found in created materials")
         else:
             print(f"Warning: No material palette found for mesh '{mesh_data['name']}'")
             materials = []
 
-        # Assign materials to faces
-        face_index = 0
-        for face_data in mesh_data['face_materials']:
-            start_face, end_face, material_index = face_data[:3]
-            num_faces = end_face - start_face
-
-            if material_index < len(materials):
-                material_name = materials[material_index]
-                material_list_index = obj.data.materials.find(material_name)
-                if material_list_index == -1:
-                    material_list_index = len(obj.data.materials) - 1
-
-                for i in range(num_faces):
-                    if face_index < len(obj.data.polygons):
-                        obj.data.polygons[face_index].material_index = material_list_index
-                        face_index += 1
-
-                #print(f"Material index: {material_list_index}, Material name: {material_name}")
-            else:
+        for start_face, end_face, material_index in mesh_data['face_materials']:
+            if material_index >= len(materials):
                 print(f"Material index: {material_index}, Material name: Unknown")
 
+        # Slots and per-face material indices come from material_slots; a shared mesh,
+        # having the same key, already has exactly these
+        if not shared:
+            for mat_name in slot_materials:
+                obj.data.materials.append(created_materials[mat_name])
+            mesh.polygons.foreach_set("material_index", material_indices)
+
     return obj
 
 # Function to create an armature from given data
@@ -221,6 +261,28 @@ def assign_mesh_to_armature(mesh_obj, armature_obj, armature_data, cumulative_ma
                 #print(f"Mesh '{mesh_name}' parented to bone '{bone['name']}' with origin adjusted by tail length: {tail_length}")
                 return  # Mesh is assigned, no need to check further
 
+# Pose bone names by their name without '_DAG', and without '_ANIDAG', first bone wins
+def bone_name_index(armature_obj):
+    index = {}
+    for bone in armature_obj.pose.bones:
+        index.setdefault(bone.name.replace('_DAG', ''), bone.name)
+        index.setdefault(bone.name.replace('_ANIDAG', ''), bone.name)
+    return index
+
+# Adds an animation-only "_ANIDAG" bone under the "_DAG" parent of each name, in one edit-mode session
+def create_animation_bones(armature_obj, names, index):
+    bpy.ops.object.mode_set(mode='EDIT')
+    edit_bones = armature_obj.data.edit_bones
+    for name in names:
+        parent_bone = edit_bones.get(name[:-1] + '_DAG')
+        if parent_bone:
+            anim_bone = edit_bones.new(f"{name}_ANIDAG")
+            anim_bone.head = parent_bone.tail
+            anim_bone.tail = anim_bone.head + mathutils.Vector((0, 0.1, 0))
+            anim_bone.parent = parent_bone
+            index[name] = anim_bone.name
+    bpy.ops.object.mode_set(mode='OBJECT')
+
 # Function to create and apply animations
 def create_animation(armature_obj, track_definitions, armature_data, model_prefix=prefix):
     # Get the scene's frame rate
@@ -236,8 +298,16 @@ def create_animation(armature_obj, track_definitions, armature_data, model_prefi
 
         if action_name not in animations_by_key:
             animations_by_key[action_name] = []
-        
-        animations_by_key[action_name].append(animation_data)
+
+        # Strip the animation prefix and '_TRACK' from the track instance name
+        stripped_track_instance_name = animation_data['instance']['name'][len(animation_key):].replace('_TRACK', '')
+        animations_by_key[action_name].append((animation_data, stripped_track_instance_name))
+
+    # Identify which bone each track belongs to, creating the missing animation bones together
+    bone_index = bone_name_index(armature_obj)
+    missing = {name: None for tracks in animations_by_key.values() for _, name in tracks if name not in bone_index}
+    if missing:
+        create_animation_bones(armature_obj, missing, bone_index)
 
     # Create actions for each animation key
     for action_name, tracks in animations_by_key.items():
@@ -253,13 +323,13 @@ def create_animation(armature_obj, track_definitions, armature_data, model_prefi
         # Optional: Mark the action as having a "fake user" to keep it even if unassigned
         action.use_fake_user = True  # This ensures the action will not be deleted even if it’s not actively used
 
-        fcurves = {}
+        # Frame numbers and (F, 10) channel rows of every bone, written once all tracks are read
+        bone_keys = {}
 
         # Go through each track in the animation data
-        for track_data in tracks:
+        for track_data, stripped_track_instance_name in tracks:
             track = track_data['definition']
             track_instance = track_data['instance']
-            track_instance_name = track_instance['name']
             sleep = track_instance.get('sleep', None)
 
             # Determine frames_per_sleep only if sleep is not None
@@ -269,90 +339,23 @@ def create_animation(armature_obj, track_definitions, armature_data, model_prefi
 
             current_frame = 1
 
-            # Strip the animation prefix and '_TRACK' from the track instance name
-            stripped_track_instance_name = track_instance_name[len(animation_key):].replace('_TRACK', '')
-
-            # Identify which bone this track belongs to
-            bone_name = None
-            for bone in armature_obj.pose.bones:
-                stripped_bone_name = bone.name.replace('_DAG', '')
-
-                if stripped_bone_name == stripped_track_instance_name:
-                    bone_name = bone.name
-                    break
-                elif bone.name.replace('_ANIDAG', '') == stripped_track_instance_name:
-                    bone_name = bone.name
-                    break
-
-            if not bone_name:
-                # Create new animation-only bone with "_ANIDAG"
-                bpy.ops.object.mode_set(mode='EDIT')
-                parent_bone_name = stripped_track_instance_name[:-1] + '_DAG'
-                parent_bone = armature_obj.data.edit_bones.get(parent_bone_name)
-
-                if parent_bone:
-                    anim_bone_name = f"{stripped_track_instance_name}_ANIDAG"
-                    anim_bone = armature_obj.data.edit_bones.new(anim_bone_name)
-                    anim_bone.head = parent_bone.tail
-                    anim_bone.tail = anim_bone.head + mathutils.Vector((0, 0.1, 0))
-                    anim_bone.parent = parent_bone
-                    bpy.ops.object.mode_set(mode='OBJECT')
-
-                    # After creating the animation bone, retry matching
-                    for bone in armature_obj.pose.bones:
-                        stripped_bone_name = bone.name.replace('_ANIDAG', '')
-                        if stripped_bone_name == stripped_track_instance_name:
-                            bone_name = bone.name
-                            break
+            bone_name = bone_index.get(stripped_track_instance_name)
 
             if bone_name:
-                if bone_name not in fcurves:
-                    fcurves[bone_name] = {
-                        'location': [],
-                        'rotation_quaternion': [],
-                        'scale': []
-                    }
-
-                    for i in range(3):
-                        fcurves[bone_name]['location'].append(action.fcurves.new(data_path=f'pose.bones["{bone_name}"].location', index=i))
-                        fcurves[bone_name]['scale'].append(action.fcurves.new(data_path=f'pose.bones["{bone_name}"].scale', index=i))
-
-                    for i in range(4):
-                        fcurves[bone_name]['rotation_quaternion'].append(action.fcurves.new(data_path=f'pose.bones["{bone_name}"].rotation_quaternion', index=i))
-
-                for frame_index, frame in enumerate(track['frame_transforms']):
-                    location = frame.get('translation', [0, 0, 0])
-                    frame_rotation = mathutils.Quaternion(frame.get('rotation', [1, 0, 0, 0]))
-                    xyz_scale = track.get('xyz_scale', 256)
-                    scale_factor = xyz_scale / 256.0
+                channels = track_channels(track['translations'], track['rotations'], track.get('xyz_scale', 256))
+                frames = current_frame + frames_per_sleep * np.arange(len(channels))
+                bone_keys.setdefault(bone_name, []).append((frames, channels))
 
-                    scale_matrix = mathutils.Matrix.Scale(scale_factor, 4)
-                    rotation_matrix = frame_rotation.to_matrix().to_4x4()
-                    translation_matrix = mathutils.Matrix.Translation(location)
+                # Three location, four rotation and three scale keys per frame
+                stats.count("keyframes", len(track['translations']) * 10)
 
-                    bone_matrix = translation_matrix @ rotation_matrix @ scale_matrix
-
-                    translation = bone_matrix.to_translation()
-                    rotation = bone_matrix.to_quaternion()
-                    scale = [scale_factor] * 3
-
-                    for i, value in enumerate(translation):
-                        fcurve = fcurves[bone_name]['location'][i]
-                        kf = fcurve.keyframe_points.insert(current_frame, value)
-                        kf.interpolation = 'LINEAR'
-
-                    for i, value in enumerate(rotation):
-                        fcurve = fcurves[bone_name]['rotation_quaternion'][i]
-                        kf = fcurve.keyframe_points.insert(current_frame, value)
-                        kf.interpolation = 'LINEAR'
-
-                    for i, value in enumerate(scale):
-                        fcurve = fcurves[bone_name]['scale'][i]
-                        kf = fcurve.keyframe_points.insert(current_frame, value)
-                        kf.interpolation = 'LINEAR'
-
-                    current_frame += frames_per_sleep
+        for bone_name, keys in bone_keys.items():
+            with stats.stage("keyframes"):
+                written = write_bone_keyframes(action, bone_name, np.concatenate([frames for frames, _ in keys]),
+                    np.concatenate([channels for _, channels in keys]), tolerance=keyframe_tolerance)
+            stats.count("keyframes_written", written)
 
+    stats.count("actions", len(animations_by_key))
     print("Animation creation complete")
 
 # Function to create a default pose
@@ -370,7 +373,6 @@ def create_default_pose(armature_obj, track_definitions, armature_data, cumulati
     # Optional: Mark the action as having a "fake user" to keep it even if not actively used
     action.use_fake_user = True  # This ensures the action will not be deleted
 
-    fcurves = {}  # Initialize the fcurves dictionary
 
     # Loop through the bones in the armature and create default pose keyframes
     for bone_name, bone in armature_obj.pose.bones.items():
@@ -380,10 +382,8 @@ def create_default_pose(armature_obj, track_definitions, armature_data, cumulati
         if corresponding_bone:
             track_name = corresponding_bone['track']
             track_def = track_definitions['armature_tracks'][track_name]['definition']
-            initial_transform = track_def['frame_transforms'][0]
-
-            armature_translation = initial_transform.get('translation', [0, 0, 0])
-            armature_rotation = initial_transform.get('rotation', Quaternion((1, 0, 0, 0)))
+            armature_translation = track_def['translations'][0].tolist()
+            armature_rotation = Quaternion(track_def['rotations'][0].tolist())
             xyz_scale = track_def.get('xyz_scale', 256)
             scale_factor = xyz_scale / 256.0
 
@@ -395,84 +395,64 @@ def create_default_pose(armature_obj, track_definitions, armature_data, cumulati
             # Combine the matrices in the correct order: Translation * Rotation * Scale * Cumulative Matrix
             bone_matrix = translation_matrix @ rotation_matrix @ scale_matrix @ cumulative_matrices.get(bone_name, mathutils.Matrix.Identity(4))
 
-            # Initialize fcurves for location, rotation, and scale
-            if bone_name not in fcurves:
-                fcurves[bone_name] = {
-                    'location': [],
-                    'rotation_quaternion': [],
-                    'scale': []
-                }
-
-                # Create fcurves for location, rotation, and scale
-                for i in range(3):  # Location and Scale have 3 components: X, Y, Z
-                    fcurves[bone_name]['location'].append(action.fcurves.new(data_path=f'pose.bones["{bone_name}"].location', index=i))
-                    fcurves[bone_name]['scale'].append(action.fcurves.new(data_path=f'pose.bones["{bone_name}"].scale', index=i))
-
-                for i in range(4):  # Rotation quaternion has 4 components: W, X, Y, Z
-                    fcurves[bone_name]['rotation_quaternion'].append(action.fcurves.new(data_path=f'pose.bones["{bone_name}"].rotation_quaternion', index=i))
-
-            # Extract translation, rotation, and scale from the bone matrix
-            translation = bone_matrix.to_translation()
-            rotation = bone_matrix.to_quaternion()
-            scale = [scale_factor] * 3  # Apply the scaling factor uniformly on all axes
-
-            # Insert location keyframes
-            for i, value in enumerate(translation):
-                fcurve = fcurves[bone_name]['location'][i]
-                kf = fcurve.keyframe_points.insert(1, value)
-                kf.interpolation = 'LINEAR'
-
-            # Insert rotation keyframes
-            for i, value in enumerate(rotation):
-                fcurve = fcurves[bone_name]['rotation_quaternion'][i]
-                kf = fcurve.keyframe_points.insert(1, value)
-                kf.interpolation = 'LINEAR'
-
-            # Insert scale keyframes
-            for i, value in enumerate(scale):
-                fcurve = fcurves[bone_name]['scale'][i]
-                kf = fcurve.keyframe_points.insert(1, value)
-                kf.interpolation = 'LINEAR'
+            # Location, rotation and scale keys on frame 1
+            channels = np.concatenate([bone_matrix.to_translation(), bone_matrix.to_quaternion(), [scale_factor] * 3])
+            write_bone_keyframes(action, bone_name, [1], channels)
+
+            stats.count("keyframes", 10)
 
     print(f"Created default pose action '{action_name}'")
 
 # After armature creation, generate the default pose
 if armature_data and track_definitions:
     armature_tracks = track_definitions['armature_tracks']
-    armature_obj, bone_map, cumulative_matrices = create_armature(armature_data, armature_tracks, main_obj)
+    with stats.stage("armature"):
+        armature_obj, bone_map, cumulative_matrices = create_armature(armature_data, armature_tracks, main_obj)
+    stats.count("bones", len(armature_data['bones']))
     
     # Create meshes
-    for mesh_data in meshes:
-        mesh_obj = create_mesh(mesh_data, main_obj, armature_obj)
-        assign_mesh_to_armature(mesh_obj, armature_obj, armature_data, cumulative_matrices)
+    with stats.stage("meshes"):
+        for mesh_data in meshes:
+            mesh_obj = create_mesh(mesh_data, main_obj, armature_obj)
+            assign_mesh_to_armature(mesh_obj, armature_obj, armature_data, cumulative_matrices)
 
     # Create default pose based on the cumulative matrices
-    create_default_pose(armature_obj, track_definitions, armature_data, cumulative_matrices)
+    with stats.stage("default_pose"):
+        create_default_pose(armature_obj, track_definitions, armature_data, cumulative_matrices)
 
     # Create animations after parenting
-    create_animation(armature_obj, track_definitions, armature_data)
+    with stats.stage("animation"):
+        create_animation(armature_obj, track_definitions, armature_data)
 else:
     # If no armature data, just create meshes
-    for mesh_data in meshes:
-        mesh_obj = create_mesh(mesh_data, main_obj)
+    with stats.stage("meshes"):
+        for mesh_data in meshes:
+            mesh_obj = create_mesh(mesh_data, main_obj)
 
 # Parent polyhedron to matching DMSPRITEDEF mesh
-for polyhedron_name, polyhedron_obj in polyhedron_objects.items():
-    actual_polyhedron_name = polyhedron_obj.name  # Access the actual Blender name of the polyhedron object
-    base_name = actual_polyhedron_name.split('.')[0]  # Get the base name without the suffix
-    appendix = actual_polyhedron_name.split('.')[-1] if '.' in actual_polyhedron_name else ''
+with stats.stage("parent_polyhedrons"):
+    for polyhedron_name, polyhedron_obj in polyhedron_objects.items():
+        actual_polyhedron_name = polyhedron_obj.name  # Access the actual Blender name of the polyhedron object
+        base_name = actual_polyhedron_name.split('.')[0]  # Get the base name without the suffix
+        appendix = actual_polyhedron_name.split('.')[-1] if '.' in actual_polyhedron_name else ''
     
-    print(f"Polyhedron Name: '{actual_polyhedron_name}', Base Name: '{base_name}', Appendix: '{appendix}'")
+        print(f"Polyhedron Name: '{actual_polyhedron_name}', Base Name: '{base_name}', Appendix: '{appendix}'")
     
-    for mesh_data in meshes:
-        if mesh_data.get('polyhedron') == base_name:
-            # Look for the mesh object with the same appendix
-            mesh_name_with_appendix = f"{mesh_data['name']}.{appendix}" if appendix else mesh_data['name']
-            mesh_obj = bpy.data.objects.get(mesh_name_with_appendix)
-            if mesh_obj:
-                print(f"Matching mesh found: {mesh_obj.name} for polyhedron: {actual_polyhedron_name}")
-                polyhedron_obj.parent = mesh_obj
-                break  # Stop searching once the correct parent is found
+        for mesh_data in meshes:
+            if mesh_data.get('polyhedron') == base_name:
+                # Look for the mesh object with the same appendix
+                mesh_name_with_appendix = f"{mesh_data['name']}.{appendix}" if appendix else mesh_data['name']
+                mesh_obj = bpy.data.objects.get(mesh_name_with_appendix)
+                if mesh_obj:
+                    print(f"Matching mesh found: {mesh_obj.name} for polyhedron: {actual_polyhedron_name}")
+                    polyhedron_obj.parent = mesh_obj
+                    break  # Stop searching once the correct parent is found
 
 print("Created object '{}' with {} meshes and armature '{}'".format(base_name, len(meshes), armature_data['name'] if armature_data else "None"))
 print("Included files:", include_files)  # Print the list of include files for reference
+
+print(stats.report())
+for stage_name in stats.profiles:
+    print(stats.profile_text(stage_name))
+if stats_path:
+    stats.dump(stats_path)
@@ -0,0 +1,245 @@
+import os
+import random
+import sys
+
+# Synthetic WCE/MOD corpora for tests and benchmarks. Everything is derived
+# from a seeded random.Random, so the same arguments always write the same
+# bytes.
+
+# A few of the animation prefixes track_parse recognises
+animation_prefixes = ["C01", "C02", "C03", "C05", "C06", "C09", "D01", "D02", "L01", "L02", "O01", "P01", "S01", "T01"]
+
+def format_float(value):
+    return f"{value:.8e}"
+
+def material_blocks(base, materials):
+    blocks = []
+    names = [f"{base}CH{index:04d}" for index in range(materials)]
+    for name in names:
+        blocks.append(
+            "SIMPLESPRITEDEF\n"
+            f"\tSIMPLESPRITETAG \"{name}_SPRITE\"\n"
+            "\tNUMFRAMES 1\n"
+            "\tSLEEP? NULL\n"
+            f"\tFRAME \"{name}.BMP\" \"{name}\"\n"
+            "ENDSIMPLESPRITEDEF\n\n"
+        )
+        blocks.append(
+            "MATERIALDEFINITION\n"
+            f"\tTAG \"{name}_MDF\"\n"
+            "\tRENDERMETHOD \"USERDEFINED_2\"\n"
+            "\tRGBPEN 178 178 178 0\n"
+            "\tBRIGHTNESS 0.00000000e+00\n"
+            "\tSCALEDAMBIENT 7.50000000e-01\n"
+            "\tSIMPLESPRITEINST\n"
+            f"\t\tTAG \"{name}_SPRITE\"\n"
+            "\t\tHEXFIFTYFLAG 0\n"
+            "\tENDSIMPLESPRITEINST\n"
+            "ENDMATERIALDEFINITION\n\n"
+        )
+    palette = [
+        "MATERIALPALETTE\n",
+        f"\tTAG \"{base}_MP\"\n",
+        f"\tNUMMATERIALS {materials}\n",
+    ]
+    palette.extend(f"\tMATERIAL \"{name}_MDF\"\n" for name in names)
+    palette.append("ENDMATERIALPALETTE\n\n")
+    blocks.append("".join(palette))
+    return blocks
+
+def groups(total, count, rng, value_range):
+    # "N count value count value ..." covering total items in count runs
+    count = max(1, min(count, total))
+    cuts = sorted(rng.sample(range(1, total), count - 1)) if total > 1 else []
+    sizes = [end - start for start, end in zip([0] + cuts, cuts + [total])]
+    parts = [str(len(sizes))]
+    for size in sizes:
+        parts.append(str(size))
+        parts.append(str(rng.randrange(value_range)))
+    return " ".join(parts)
+
+def mesh_block(base, index, vertices, materials, bones, rng):
+    vertices = max(3, vertices)
+    faces = max(1, vertices * 2 - 4)
+    lines = [
+        "DMSPRITEDEF2",
+        f"\tTAG \"{base}{index:02d}_DMSPRITEDEF\"",
+        "\tCENTEROFFSET 0.00000000e+00 0.00000000e+00 0.00000000e+00",
+        f"\tNUMVERTICES {vertices}",
+    ]
+    for _ in range(vertices):
+        lines.append("\tXYZ " + " ".join(format_float(rng.uniform(-10, 10)) for _ in range(3)))
+    lines.append(f"\tNUMUVS {vertices}")
+    for _ in range(vertices):
+        lines.append("\tUV " + " ".join(format_float(rng.random()) for _ in range(2)))
+    lines.append(f"\tNUMVERTEXNORMALS {vertices}")
+    for _ in range(vertices):
+        lines.append("\tXYZ " + " ".join(format_float(rng.uniform(-1, 1)) for _ in range(3)))
+    lines.append(f"\tNUMVERTEXCOLORS {vertices}")
+    for _ in range(vertices):
+        lines.append("\tRGBA " + " ".join(str(rng.randrange(256)) for _ in range(4)))
+    lines.append(f"\tSKINASSIGNMENTGROUPS {groups(vertices, bones, rng, bones)}")
+    lines.append(f"\tMATERIALPALETTE \"{base}_MP\"")
+    lines.append("\tPOLYHEDRON")
+    lines.append("\t\tDEFINITION \"\"")
+    lines.append("\tENDPOLYHEDRON")
+    lines.append(f"\tNUMFACE2S {faces}")
+    for face in range(faces):
+        a, b, c = rng.sample(range(vertices), 3)
+        lines.append(f"\tDMFACE2 //{face}")
+        lines.append(f"\t\tPASSABLE {int(rng.random() < 0.05)}")
+        lines.append(f"\t\tTRIANGLE {a}, {b}, {c}")
+        lines.append(f"\tENDDMFACE2 //{face}")
+    lines.append("\tNUMMESHOPS 0")
+    lines.append(f"\tFACEMATERIALGROUPS {groups(faces, materials, rng, materials)}")
+    lines.append(f"\tVERTEXMATERIALGROUPS {groups(vertices, materials, rng, materials)}")
+    lines.append("\tBOUNDINGBOXMIN -1.00000000e+01 -1.00000000e+01 -1.00000000e+01")
+    lines.append("\tBOUNDINGBOXMAX 1.00000000e+01 1.00000000e+01 1.00000000e+01")
+    lines.append("\tBOUNDINGRADIUS 1.73205078e+01")
+    lines.append("\tFPSCALE 8")
+    lines.append("ENDDMSPRITEDEF2")
+    return "\n".join(lines) + "\n\n"
+
+def bone_names(base, bones):
+    return [f"{base}B{index:02d}" for index in range(bones)]
+
+def hierarchy_block(base, meshes, bones):
+    names = bone_names(base, bones)
+    lines = [
+        "HIERARCHICALSPRITEDEF",
+        f"\tTAG \"{base}_HS_DEF\"",
+        f"\tNUMDAGS {bones}",
+    ]
+    for index, name in enumerate(names):
+        children = [child for child in (index * 2 + 1, index * 2 + 2) if child < bones]
+        lines.append(f"\tDAG // {index}")
+        lines.append(f"\t\tTAG \"{name}_DAG\"")
+        lines.append("\t\tSPRITE \"\"")
+        lines.append(f"\t\tTRACK \"{name}_TRACK\"")
+        lines.append("\t\tTRACKINDEX 0")
+        lines.append(f"\t\tSUBDAGLIST {len(children)} " + " ".join(str(child) for child in children))
+        lines.append(f"\tENDDAG // {index}")
+    lines.append(f"\tNUMATTACHEDSKINS {meshes}")
+    for index in range(meshes):
+        lines.append(f"\t\tDMSPRITE \"{base}{index:02d}_DMSPRITEDEF\"")
+        lines.append("\t\tLINKSKINUPDATESTODAGINDEX 0")
+    lines.append("\tCENTEROFFSET? 0.00000000e+00 0.00000000e+00 0.00000000e+00")
+    lines.append("\tBOUNDINGRADIUS? 1.73205078e+01")
+    lines.append("ENDHIERARCHICALSPRITEDEF")
+    return "\n".join(lines) + "\n\n"
+
+def track_names(base, tracks, bones):
+    # Rest pose tracks for every bone, then animated tracks cycling through
+    # the animation prefixes; yields (tag, is_rest_track)
+    names = bone_names(base, bones)
+    for name in names:
+        yield f"{name}_TRACK", True
+    for index in range(tracks):
+        prefix = animation_prefixes[index // bones % len(animation_prefixes)]
+        yield f"{prefix}{names[index % bones]}_TRACK", False
+
+def mod_track_blocks(base, tracks, frames, bones, rng):
+    blocks = []
+    for tag, rest in track_names(base, tracks, bones):
+        frame_count = 1 if rest else frames
+        lines = [
+            "TRACKDEFINITION",
+            f"\tTAG \"{tag}DEF\"",
+            f"\tNUMFRAMES {frame_count}",
+        ]
+        for _ in range(frame_count):
+            lines.append("\tFRAMETRANSFORM")
+            lines.append("\t\tXYZSCALE 256")
+            lines.append("\t\tXYZ " + " ".join(str(rng.randrange(-512, 512)) for _ in range(3)))
+            lines.append("\t\tROTSCALE? 16384")
+            lines.append("\t\tROTABC? " + " ".join(str(rng.randrange(-16384, 16384)) for _ in range(3)))
+            lines.append("\tENDFRAMETRANSFORM")
+        lines.append("ENDTRACKDEFINITION")
+        blocks.append("\n".join(lines) + "\n\n")
+        blocks.append(
+            "TRACKINSTANCE\n"
+            f"\tTAG \"{tag}\"\n"
+            f"\tDEFINITION \"{tag}DEF\"\n"
+            "\tINTERPOLATE 0\n"
+            "\tSLEEP? 100\n"
+            "ENDTRACKINSTANCE\n\n"
+        )
+    return blocks
+
+def wce_track_blocks(base, tracks, frames, bones, rng):
+    blocks = []
+    for tag, rest in track_names(base, tracks, bones):
+        frame_count = 1 if rest else frames
+        lines = [
+            f"TRACKDEFINITION \"{tag}DEF\"",
+            "\tTAGINDEX 0",
+            f"\tSPRITE \"{base}_DMSPRITEDEF\"",
+            f"\tNUMFRAMES {frame_count}",
+        ]
+        for _ in range(frame_count):
+            xyz = " ".join(str(rng.randrange(-512, 512)) for _ in range(3))
+            rot = " ".join(str(rng.randrange(-16384, 16384)) for _ in range(3))
+            lines.append(f"\t\tFRAME 256 {xyz} 16384 {rot}")
+        lines.append("\tNUMLEGACYFRAMES 0")
+        blocks.append("\n".join(lines) + "\n\n")
+        blocks.append(
+            f"TRACKINSTANCE \"{tag}\"\n"
+            "\tTAGINDEX 0\n"
+            "\tSPRITE \"\"\n"
+            f"\tDEFINITION \"{tag}DEF\"\n"
+            "\tDEFINITIONINDEX 0\n"
+            "\tINTERPOLATE 0\n"
+            "\tREVERSE 0\n"
+            "\tSLEEP? NULL\n\n"
+        )
+    return blocks
+
+def write_chain(directory, names, blocks, header="", lower=False):
+    # Spreads blocks over the files in names, each file INCLUDEing the next.
+    # WCE trees are written with lower case file names, as quail does
+    per_file = -(-len(blocks) // len(names)) if blocks else 0
+    paths = []
+    for index, name in enumerate(names):
+        path = os.path.join(directory, name.lower() if lower else name)
+        with open(path, 'w') as file:
+            if index == 0:
+                file.write(header)
+            if index + 1 < len(names):
+                file.write(f"INCLUDE \"{names[index + 1]}\"\n\n")
+            file.write("".join(blocks[index * per_file:(index + 1) * per_file]))
+        paths.append(path)
+    return paths
+
+def write_mod_corpus(directory, base="ELF", meshes=4, vertices=500, tracks=100, frames=20, materials=4, bones=16, includes=2, seed=0):
+    """
+    Writes a character style .mod tree: materials, meshes of the given vertex
+    count, a skeleton of bones and tracks of frames each, spread over a chain
+    of includes nested that many levels deep. Returns the root file path.
+    """
+    rng = random.Random(seed)
+    blocks = material_blocks(base, materials)
+    blocks.extend(mesh_block(base, index, vertices, materials, bones, rng) for index in range(meshes))
+    blocks.append(hierarchy_block(base, meshes, bones))
+    blocks.extend(mod_track_blocks(base, tracks, frames, bones, rng))
+    names = [f"{base}.MOD"] + [f"{base}{index:02d}.INC" for index in range(includes)]
+    return write_chain(directory, names, blocks)[0]
+
+def write_wce_corpus(directory, base="ELF", tracks=100, frames=20, bones=16, includes=2, seed=0):
+    """
+    Writes a quail style .wce tree with a WORLDDEF root and track definitions
+    and instances spread over nested includes. Returns the root file path.
+    """
+    rng = random.Random(seed)
+    blocks = wce_track_blocks(base, tracks, frames, bones, rng)
+    header = "// wcemu v0.0.1\nWORLDDEF\n\tNEWWORLD 0\n\tZONE 0\n\tEQGVERSION? NULL\n\n"
+    names = ["_ROOT.WCE"] + [f"{base}{index:02d}.WCE" for index in range(includes)]
+    return write_chain(directory, names, blocks, header, lower=True)[0]
+
+if __name__ == '__main__':
+    # Usage: python corpus_generator.py directory [mod|wce]
+    directory = sys.argv[1]
+    os.makedirs(directory, exist_ok=True)
+    if len(sys.argv) > 2 and sys.argv[2] == "wce":
+        print(write_wce_corpus(directory))
+    else:
+        print(write_mod_corpus(directory))
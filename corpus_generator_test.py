@@ -0,0 +1,60 @@
+import os
+
+from corpus_generator import write_mod_corpus, write_wce_corpus
+from dmspritedef2_parse import dmspritedef2_parse
+from hierarchicalspritedef_parse import hierarchicalspritedef_parse
+from parse_benchmark import main_parse_tree, print_results, run_benchmarks
+
+def test_mod_corpus_matches_its_parameters(tmp_path):
+    root = write_mod_corpus(str(tmp_path), meshes=3, vertices=40, tracks=10, frames=5, materials=2, bones=4, includes=2)
+
+    sections, paths = main_parse_tree(root)
+
+    assert len(paths) == 3
+    assert len(sections['DMSPRITEDEF2']) == 3
+    assert len(sections['MATERIALDEFINITION']) == 2
+    assert len(sections['TRACKDEFINITION']) == 10 + 4
+    assert len(sections['TRACKINSTANCE']) == 10 + 4
+    mesh, _ = dmspritedef2_parse(sections['DMSPRITEDEF2'][0])
+    assert len(mesh['vertices']) == len(mesh['normals']) == len(mesh['uvs']) == 40
+    assert len(mesh['faces']) == 76
+    assert mesh['vertex_groups'][-1][1] == 40
+    armature = hierarchicalspritedef_parse(sections['HIERARCHICALSPRITEDEF'][0])
+    assert [bone['track'] for bone in armature['bones']] == ["ELFB00_TRACK", "ELFB01_TRACK", "ELFB02_TRACK", "ELFB03_TRACK"]
+
+def test_corpus_is_deterministic(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+
+    first = write_wce_corpus(str(tmp_path / "a"), tracks=5, frames=3)
+    second = write_wce_corpus(str(tmp_path / "b"), tracks=5, frames=3)
+
+    assert open(first).read() == open(second).read()
+
+def test_benchmark_reports_regressions(tmp_path, capsys):
+    mod_root = write_mod_corpus(str(tmp_path), meshes=1, vertices=10, tracks=2, frames=2, materials=1, bones=2, includes=1)
+    wce_root = write_wce_corpus(str(tmp_path), tracks=2, frames=2, bones=2, includes=1)
+
+    results = run_benchmarks(mod_root, wce_root, repeat=1)
+
+    assert results['main_parse']['defs'] > 0
+    assert results['wce.parse_definitions']['defs'] == 2 * (2 + 2) + 1
+    baseline = {name: dict(result, defs_per_s=result.get('defs_per_s', 0) * 10) for name, result in results.items()}
+    assert 'main_parse' in print_results(results, baseline)
+    assert print_results(results, results) == []
+
+def test_main_parse_tree_reads_each_include_once(tmp_path):
+    (tmp_path / "ROOT.MOD").write_text('INCLUDE "A.INC"\nINCLUDE "A.INC"\n')
+    (tmp_path / "A.INC").write_text('INCLUDE "ROOT.MOD"\nMATERIALPALETTE\n\tTAG "A_PAL"\nENDMATERIALPALETTE\n')
+    sections, paths = main_parse_tree(str(tmp_path / "ROOT.MOD"))
+    assert len(paths) == 2
+    assert sections['MATERIALPALETTE'] == [['TAG "A_PAL"']]
+
+def test_main_parse_tree_merges_depth_first(tmp_path):
+    (tmp_path / "ROOT.MOD").write_text('INCLUDE "A.INC"\nINCLUDE "B.INC"\n')
+    (tmp_path / "A.INC").write_text('INCLUDE "C.INC"\nMATERIALPALETTE\n\tTAG "A_PAL"\nENDMATERIALPALETTE\n')
+    (tmp_path / "B.INC").write_text('MATERIALPALETTE\n\tTAG "B_PAL"\nENDMATERIALPALETTE\n')
+    (tmp_path / "C.INC").write_text('MATERIALPALETTE\n\tTAG "C_PAL"\nENDMATERIALPALETTE\n')
+    sections, paths = main_parse_tree(str(tmp_path / "ROOT.MOD"))
+    assert [os.path.basename(path) for path in paths] == ["ROOT.MOD", "A.INC", "C.INC", "B.INC"]
+    assert sections['MATERIALPALETTE'] == [['TAG "A_PAL"'], ['TAG "C_PAL"'], ['TAG "B_PAL"']]
@@ -1,9 +1,66 @@
-import bpy
-import bmesh
-import mathutils
+import hashlib
 import os
 import sys
 
+import numpy as np
+
+from tag_index import find_definition, read_section
+
+# Keywords dmspritedef2_parse reacts to. A line is handled as the keyword its
+# first token starts with, so DMTRACKINST is read as DMTRACK and MESHOP_VA as a
+# MESHOP; any other line is data of the open sub-section, if there is one
+line_prefixes = {
+    "TAG": "TAG",
+    "CENTEROFFSET": "CENTEROFFSET",
+    "NUMVERTICES": "NUMVERTICES",
+    "XYZ": "XYZ",
+    "NUMUVS": "NUMUVS",
+    "UV": "UV",
+    "NUMVERTEXNORMALS": "NUMVERTEXNORMALS",
+    "NUMVERTEXCOLORS": "NUMVERTEXCOLORS",
+    "RGBA": "RGBA",
+    "NUMFACE2S": "NUMFACE2S",
+    "DMFACE2": "DMFACE2",
+    "TRIANGLE": "TRIANGLE",
+    "PASSABLE": "PASSABLE",
+    "ENDDMFACE2": "ENDDMFACE2",
+    "NUMMESHOPS": "NUMMESHOPS",
+    "MESHOP_VA": "MESHOP",
+    "MESHOP_SW": "MESHOP",
+    "MESHOP_EL": "MESHOP",
+    "MESHOP_FA": "MESHOP",
+    "FACEMATERIALGROUPS": "FACEMATERIALGROUPS",
+    "VERTEXMATERIALGROUPS": "VERTEXMATERIALGROUPS",
+    "SKINASSIGNMENTGROUPS": "SKINASSIGNMENTGROUPS",
+    "MATERIALPALETTE": "MATERIALPALETTE",
+    "BOUNDINGRADIUS": "BOUNDINGRADIUS",
+    "BOUNDINGBOXMIN": "BOUNDINGBOXMIN",
+    "BOUNDINGBOXMAX": "BOUNDINGBOXMAX",
+    "DMTRACK": "DMTRACK",
+    "ENDDMTRACK": "ENDDMTRACK",
+    "POLYHEDRON": "POLYHEDRON",
+    "ENDPOLYHEDRON": "ENDPOLYHEDRON",
+    "SPRITEDEFPOLYHEDRON": "SPRITEDEFPOLYHEDRON",
+    "REGIONPOLYHEDRON": "REGIONPOLYHEDRON",
+    "PARAMS2": "PARAMS2",
+    # Has no handler of its own, only closes the open sub-section
+    "FPSCALE": "FPSCALE"
+}
+
+# First token -> keyword, filled in as new tokens match a prefix. Data lines
+# (vertex and face continuations) never start with a prefix letter, so they
+# are rejected on their first character and never cached.
+token_keywords = dict(line_prefixes)
+prefix_initials = frozenset(prefix[0] for prefix in line_prefixes)
+
+def line_keyword(token):
+    keyword = token_keywords.get(token)
+    if keyword is None and token[:1] in prefix_initials:
+        keyword = next((line_prefixes[prefix] for prefix in line_prefixes if token.startswith(prefix)), None)
+        if keyword is not None:
+            token_keywords[token] = keyword
+    return keyword
+
 def process_skin_assignment_groups(data_string):
     parts = data_string.split()
     num_groups = int(parts[0])
@@ -52,6 +109,45 @@ def process_vertex_material_groups(data_string):
 
     return vertex_material_groups
 
+def expand_groups(groups, count):
+    """
+    Expands consecutive (start, end, index) runs into one int32 index per item,
+    e.g. the bone of every vertex or the material of every face. Items no run
+    covers are -1.
+    """
+    expanded = np.full(count, -1, dtype=np.int32)
+    if groups:
+        runs = np.array(groups, dtype=np.int64)
+        indices = np.repeat(runs[:, 2], np.maximum(runs[:, 1] - runs[:, 0], 0))[:count]
+        expanded[:len(indices)] = indices
+    return expanded
+
+# MESHOP_<name> followed by up to four numbers, decoded into meshop_dtype records.
+# The fields are named by position only; what each op does with them is not known.
+meshop_codes = {"VA": 0, "SW": 1, "EL": 2, "FA": 3}
+meshop_dtype = np.dtype([('op', np.uint8), ('index1', np.int32), ('index2', np.int32), ('value', np.float32), ('param', np.int32)])
+
+def decode_meshops(meshops):
+    """
+    Turns the split MESHOP lines of a parsed mesh ('meshops') into one
+    meshop_dtype record each; missing trailing fields are 0. Returns the
+    records and the lines that could not be decoded (unknown op, more than
+    four fields, or a field that is not a number of the right kind), which
+    are left out of the records. dmspritedef2_parse does not call this.
+    """
+    decoded = []
+    undecoded = []
+    for parts in meshops:
+        fields = (parts[1:] + ["0"] * 4)[:4]
+        try:
+            if len(parts) <= 5:
+                decoded.append((meshop_codes[parts[0][7:9]], int(fields[0]), int(fields[1]), float(fields[2]), int(fields[3])))
+                continue
+        except (KeyError, ValueError):
+            pass
+        undecoded.append(parts)
+    return np.array(decoded, dtype=meshop_dtype), undecoded
+
 def process_dmtrack(data_lines):
     for line in data_lines:
         if line.startswith("DEFINITION"):
@@ -64,7 +160,77 @@ def process_polyhedron(data_lines):
             return line.split('"')[1]
     return None
 
-def dmspritedef2_parse(lines):
+def text_array(rows, dtype, width):
+    # Parses rows of whitespace separated numbers in one numpy call
+    if not rows:
+        return np.zeros((0, width), dtype=dtype)
+    return np.array(" ".join(rows).split(), dtype=dtype).reshape(-1, width)
+
+def counted_block(lines, start, count, keyword, width, dtype):
+    """
+    Decodes the count lines at lines[start:] as one block of "keyword n n n"
+    rows into a (count, width) array with a single numpy call. Returns None
+    when the block is short, a row starts with something else, a value is not
+    a number of dtype or the block does not hold exactly count * width values,
+    so the caller can fall back to reading line by line.
+    """
+    block = lines[start:start + count]
+    if count <= 0 or len(block) != count or not block[0].startswith(keyword):
+        return None
+    text = "\n".join(block)
+    if text.count("\n" + keyword) != count - 1:
+        return None
+    try:
+        values = np.array(text.replace(keyword, " ").replace(",", " ").split(), dtype=dtype)
+    except ValueError:
+        return None
+    if values.size != count * width:
+        return None
+    return values.reshape(count, width)
+
+def counted_faces(lines, start, count):
+    """
+    Decodes count DMFACE2 blocks starting at lines[start:]. Every block must
+    have the same layout, DMFACE2 / PASSABLE n / TRIANGLE a, b, c / ENDDMFACE2
+    or the same without the PASSABLE line. Returns (triangles, passable, lines
+    used) with the TRIANGLE numbers as they appear in the file, or None.
+    """
+    per_face = 4 if start + 1 < len(lines) and lines[start + 1].startswith("PASSABLE") else 3
+    layout = ["DMFACE2", "PASSABLE", "TRIANGLE", "ENDDMFACE2"] if per_face == 4 else ["DMFACE2", "TRIANGLE", "ENDDMFACE2"]
+    block = lines[start:start + count * per_face]
+    if count <= 0 or len(block) != count * per_face:
+        return None
+    for offset, keyword in enumerate(layout):
+        if keyword == "TRIANGLE":
+            continue
+        column = block[offset::per_face]
+        if not column[0].startswith(keyword) or "\n".join(column).count("\n" + keyword) != count - 1:
+            return None
+    triangles = counted_block(block[layout.index("TRIANGLE")::per_face], 0, count, "TRIANGLE", 3, np.int64)
+    if triangles is None:
+        return None
+    # Any PASSABLE line marks its face, whatever its value
+    return triangles, per_face == 4, count * per_face
+
+def joined_array(blocks, rows, dtype, width):
+    # Counted blocks followed by any rows that had to be read one at a time
+    return np.concatenate(blocks + [text_array(rows, dtype, width)]).astype(dtype, copy=False)
+
+def dmspritedef2_parse(lines, arrays=False):
+    """
+    Parses the lines of one DMSPRITEDEF2 section into a mesh dict.
+
+    With arrays=True the per-vertex and per-face data is returned as numpy
+    arrays instead of lists: float32 (V,3) 'vertices' and 'normals', float32
+    (V,2) 'uvs', uint8 (V,4) 'colors' (0-255, not normalized), int32 (F,3)
+    'faces' (in the same reversed winding as the list form) and a bool (F,)
+    'passable' mask in place of the face tuples' fourth element.
+
+    In both modes the skin and material groups are also returned expanded to
+    int32 arrays, 'vertex_bone_indices', 'face_material_indices' and
+    'vertex_material_indices', with -1 where no group covers an item. MESHOP
+    lines are kept split, undecoded, in 'meshops' (see decode_meshops).
+    """
     mesh = {}
     vertices = []
     uvs = []
@@ -85,144 +251,196 @@ def dmspritedef2_parse(lines):
     dmtrack_data = []
     polyhedron_data = []
     bounding_box_data = []
-    keywords = [
-        "BOUNDINGBOXMIN",
-        "BOUNDINGBOXMAX",
-        "BOUNDINGRADIUS",
-        "CENTEROFFSET",
-        "DMTRACK",
-        "FACEMATERIALGROUPS",
-        "FPSCALE",
-        "MATERIALPALETTE",
-        "NUMFACE2S",
-        "NUMMESHOPS",
-        "NUMUVS",
-        "NUMVERTEXNORMALS",
-        "NUMVERTEXCOLORS",
-        "PARAMS2",
-        "POLYHEDRON",
-        "REGIONPOLYHEDRON",
-        "SKINASSIGNMENTGROUPS",
-        "SPRITEDEFPOLYHEDRON",
-        "TAG",
-        "VERTEXMATERIALGROUPS"
-    ]
+    # Raw number text per row, only used with arrays=True
+    vertex_rows = []
+    uv_rows = []
+    normal_rows = []
+    color_rows = []
+    triangle_rows = []
+    passable = []
+    # Counted blocks decoded in one go, only used with arrays=True
+    vertex_blocks = []
+    uv_blocks = []
+    normal_blocks = []
+    color_blocks = []
+    triangle_blocks = []
+    passable_blocks = []
 
     line_index = 0
     while line_index < len(lines):
         line = lines[line_index]
+        keyword = line_keyword(line.split(None, 1)[0] if line else "")
 
-        if line.startswith("TAG"):
-            mesh['name'] = line.split('"')[1]
-        elif line.startswith("CENTEROFFSET"):
-            mesh['center_offset'] = list(map(float, line.split()[1:]))
-        elif line.startswith("NUMVERTICES"):
-            num_vertices = int(line.split()[1])
-        elif line.startswith("XYZ") and num_vertices > 0:
-            vertices.append(list(map(float, line.split()[1:])))
+        # Counted rows belong to their block only while it is owed lines,
+        # otherwise they are sub-section data like any unknown line
+        if keyword == "XYZ":
+            keyword = "VERTEX" if num_vertices > 0 else "NORMAL" if num_normals > 0 else None
+        elif keyword == "UV" and num_uvs <= 0 or keyword == "RGBA" and num_colors <= 0 or keyword == "DMFACE2" and num_faces <= 0:
+            keyword = None
+
+        if keyword is None:
+            if current_section == "DMTRACK":
+                dmtrack_data.append(line.strip())
+            elif current_section == "POLYHEDRON":
+                polyhedron_data.append(line.strip())
+            elif current_section:
+                dmsprite_sections[current_section][-1] += " " + line.strip()
+        elif keyword == "VERTEX":
+            if arrays:
+                vertex_rows.append(line[3:])
+            else:
+                vertices.append(list(map(float, line.split()[1:])))
             num_vertices -= 1
-        elif line.startswith("NUMUVS"):
-            num_uvs = int(line.split()[1])
-        elif line.startswith("UV") and num_uvs > 0:
-            parts = line.split()
-            u = float(parts[1])
-            v = float(parts[2])
-            uvs.append((u, v))
-            num_uvs -= 1
-        elif line.startswith("NUMVERTEXNORMALS"):
-            num_normals = int(line.split()[1])
-        elif line.startswith("XYZ") and num_normals > 0:
-            normals.append(list(map(float, line.split()[1:])))
+        elif keyword == "NORMAL":
+            if arrays:
+                normal_rows.append(line[3:])
+            else:
+                normals.append(list(map(float, line.split()[1:])))
             num_normals -= 1
-        elif line.startswith("NUMVERTEXCOLORS"):
-            num_colors = int(line.split()[1])
-        elif line.startswith("RGBA") and num_colors > 0:
-            parts = line.split()
-            r = int(parts[1]) / 255.0
-            g = int(parts[2]) / 255.0
-            b = int(parts[3]) / 255.0
-            a = int(parts[4]) / 255.0
-            colors.append((r, g, b, a))
+        elif keyword == "UV":
+            if arrays:
+                uv_rows.append(line[2:])
+            else:
+                parts = line.split()
+                u = float(parts[1])
+                v = float(parts[2])
+                uvs.append((u, v))
+            num_uvs -= 1
+        elif keyword == "RGBA":
+            if arrays:
+                color_rows.append(line[4:])
+            else:
+                parts = line.split()
+                r = int(parts[1]) / 255.0
+                g = int(parts[2]) / 255.0
+                b = int(parts[3]) / 255.0
+                a = int(parts[4]) / 255.0
+                colors.append((r, g, b, a))
             num_colors -= 1
-        elif line.startswith("NUMFACE2S"):
-            num_faces = int(line.split()[1])
-        elif line.startswith("DMFACE2") and num_faces > 0:
-            face = []
+        elif keyword == "DMFACE2":
             face_no_collision = False  # Reset the collision flag for each new face
-        elif line.startswith("TRIANGLE"):
-            parts = line.split()
-            v1 = int(parts[1].strip(","))  # 0-based now
-            v2 = int(parts[2].strip(","))  # 0-based now
-            v3 = int(parts[3])  # 0-based now
-            current_face = (v3, v2, v1, face_no_collision)  # Add the no collision flag to the face tuple
-            faces.append(current_face)
+        elif keyword == "TRIANGLE":
+            if arrays:
+                triangle_rows.append(line[8:].replace(",", " "))
+                passable.append(face_no_collision)
+                current_face = True
+            else:
+                parts = line.split()
+                v1 = int(parts[1].strip(","))  # 0-based now
+                v2 = int(parts[2].strip(","))  # 0-based now
+                v3 = int(parts[3])  # 0-based now
+                current_face = (v3, v2, v1, face_no_collision)  # Add the no collision flag to the face tuple
+                faces.append(current_face)
             num_faces -= 1
-        elif line.startswith("PASSABLE"):
+        elif keyword == "PASSABLE":
             face_no_collision = True  # Set the flag if the current face has no collision
-        elif line.startswith("ENDDMFACE2"):
-            if current_face is not None:
+        elif keyword == "ENDDMFACE2":
+            if current_face is not None and arrays:
+                passable[-1] = face_no_collision
+            elif current_face is not None:
                 faces[-1] = (faces[-1][0], faces[-1][1], faces[-1][2], face_no_collision)  # Update the last face with the no collision flag
-        elif line.startswith("NUMMESHOPS"):
-            num_meshops = int(line.split()[1])
-        elif any(line.startswith(op) for op in ["MESHOP_VA", "MESHOP_SW", "MESHOP_EL", "MESHOP_FA"]):
+        elif keyword == "MESHOP":
             parts = line.split()
             meshops.append(parts)
-        elif line.startswith("FACEMATERIALGROUPS"):
-            current_section = "FACEMATERIALGROUPS"
-            if current_section not in dmsprite_sections:
-                dmsprite_sections[current_section] = []
-            dmsprite_sections[current_section].append(line.split(current_section)[1].strip())
-        elif line.startswith("VERTEXMATERIALGROUPS"):
-            current_section = "VERTEXMATERIALGROUPS"
-            if current_section not in dmsprite_sections:
-                dmsprite_sections[current_section] = []
-            dmsprite_sections[current_section].append(line.split(current_section)[1].strip())
-        elif line.startswith("SKINASSIGNMENTGROUPS"):
-            current_section = "SKINASSIGNMENTGROUPS"
+        elif keyword == "TAG":
+            mesh['name'] = line.split('"')[1]
+        elif keyword == "CENTEROFFSET":
+            mesh['center_offset'] = list(map(float, line.split()[1:]))
+        elif keyword == "NUMVERTICES":
+            num_vertices = int(line.split()[1])
+            block = counted_block(lines, line_index + 1, num_vertices, "XYZ", 3, np.float64)
+            if block is not None:
+                if arrays:
+                    vertex_blocks.append(block)
+                else:
+                    vertices.extend(block.tolist())
+                line_index += num_vertices
+                num_vertices = 0
+        elif keyword == "NUMUVS":
+            num_uvs = int(line.split()[1])
+            block = counted_block(lines, line_index + 1, num_uvs, "UV", 2, np.float64)
+            if block is not None:
+                if arrays:
+                    uv_blocks.append(block)
+                else:
+                    uvs.extend(map(tuple, block.tolist()))
+                line_index += num_uvs
+                num_uvs = 0
+        elif keyword == "NUMVERTEXNORMALS":
+            num_normals = int(line.split()[1])
+            block = counted_block(lines, line_index + 1, num_normals, "XYZ", 3, np.float64)
+            # XYZ rows go to the vertices first while any are still owed
+            if block is not None and num_vertices == 0:
+                if arrays:
+                    normal_blocks.append(block)
+                else:
+                    normals.extend(block.tolist())
+                line_index += num_normals
+                num_normals = 0
+        elif keyword == "NUMVERTEXCOLORS":
+            num_colors = int(line.split()[1])
+            block = counted_block(lines, line_index + 1, num_colors, "RGBA", 4, np.int64)
+            if block is not None:
+                if arrays:
+                    color_blocks.append(block)
+                else:
+                    colors.extend(map(tuple, (block / 255.0).tolist()))
+                line_index += num_colors
+                num_colors = 0
+        elif keyword == "NUMFACE2S":
+            num_faces = int(line.split()[1])
+            block = counted_faces(lines, line_index + 1, num_faces)
+            if block is not None:
+                triangles, face_no_collision, used = block
+                if arrays:
+                    triangle_blocks.append(triangles)
+                    passable_blocks.append(np.full(num_faces, face_no_collision))
+                else:
+                    faces.extend((v3, v2, v1, face_no_collision) for v1, v2, v3 in triangles.tolist())
+                # The block used up its ENDDMFACE2 lines, so a later one closes no face
+                current_face = None
+                line_index += used
+                num_faces = 0
+        elif keyword == "NUMMESHOPS":
+            num_meshops = int(line.split()[1])
+        elif keyword == "FACEMATERIALGROUPS" or keyword == "VERTEXMATERIALGROUPS" or keyword == "SKINASSIGNMENTGROUPS":
+            current_section = keyword
             if current_section not in dmsprite_sections:
                 dmsprite_sections[current_section] = []
             dmsprite_sections[current_section].append(line.split(current_section)[1].strip())
-        elif line.startswith("MATERIALPALETTE"):
+        elif keyword == "MATERIALPALETTE":
             palette_name = line.split('"')[1]
             mesh['material_palette'] = palette_name
-        elif line.startswith("BOUNDINGRADIUS"):
+        elif keyword == "BOUNDINGRADIUS":
             mesh['bounding_radius'] = float(line.split()[1])
-        elif line.startswith("BOUNDINGBOXMIN"):
+        elif keyword == "BOUNDINGBOXMIN":
             current_section = "BOUNDINGBOX"
             bounding_box_data = []
             bounding_box_data.append(list(map(float, line.split()[1:])))
-        elif line.startswith("BOUNDINGBOXMAX"):
+        elif keyword == "BOUNDINGBOXMAX":
             bounding_box_data.append(list(map(float, line.split()[1:])))
             mesh['bounding_box'] = bounding_box_data
             current_section = None
-        elif line.startswith("DMTRACK"):
+        elif keyword == "DMTRACK":
             current_section = "DMTRACK"
             dmtrack_data = []
-        elif line.startswith("ENDDMTRACK"):
+        elif keyword == "ENDDMTRACK":
             mesh['dmtrack'] = process_dmtrack(dmtrack_data)
             current_section = None
-        elif line.startswith("POLYHEDRON"):
+        elif keyword == "POLYHEDRON":
             current_section = "POLYHEDRON"
             polyhedron_data = []
-        elif line.startswith("ENDPOLYHEDRON"):
+        elif keyword == "ENDPOLYHEDRON":
             mesh['polyhedron'] = process_polyhedron(polyhedron_data)
             current_section = None
-        elif line.startswith("SPRITEDEFPOLYHEDRON"):
+        elif keyword == "SPRITEDEFPOLYHEDRON":
             mesh['has_spritedefpolyhedron'] = True
-        elif line.startswith("REGIONPOLYHEDRON"):
+        elif keyword == "REGIONPOLYHEDRON":
             mesh['has_regionpolyhedron'] = True
-        elif line.startswith("PARAMS2"):
+        elif keyword == "PARAMS2":
             mesh['params2'] = list(map(float, line.split()[1:]))
-        elif current_section and any(line.startswith(keyword) for keyword in keywords):
+        elif keyword == "FPSCALE":
             current_section = None
-            continue  # Re-process the current line by skipping the increment
-        elif current_section:
-            if current_section == "DMTRACK":
-                dmtrack_data.append(line.strip())
-            elif current_section == "POLYHEDRON":
-                polyhedron_data.append(line.strip())
-            else:
-                dmsprite_sections[current_section][-1] += " " + line.strip()
 
         line_index += 1  # Increment the line index
 
@@ -241,11 +459,76 @@ def dmspritedef2_parse(lines):
         vertex_material_data = ' '.join(dmsprite_sections["VERTEXMATERIALGROUPS"])
         mesh['vertex_materials'] = process_vertex_material_groups(vertex_material_data)
 
-    mesh['vertices'] = vertices
-    mesh['uvs'] = uvs
-    mesh['normals'] = normals
-    mesh['colors'] = colors  # Add vertex colors to mesh data
-    mesh['faces'] = faces
+    if arrays:
+        mesh['vertices'] = joined_array(vertex_blocks, vertex_rows, np.float32, 3)
+        mesh['uvs'] = joined_array(uv_blocks, uv_rows, np.float32, 2)
+        mesh['normals'] = joined_array(normal_blocks, normal_rows, np.float32, 3)
+        mesh['colors'] = joined_array(color_blocks, color_rows, np.uint8, 4)
+        # TRIANGLE a, b, c is stored as (c, b, a) like the list form
+        mesh['faces'] = np.ascontiguousarray(joined_array(triangle_blocks, triangle_rows, np.int32, 3)[:, ::-1])
+        mesh['passable'] = np.concatenate(passable_blocks + [np.array(passable, dtype=bool)])
+    else:
+        mesh['vertices'] = vertices
+        mesh['uvs'] = uvs
+        mesh['normals'] = normals
+        mesh['colors'] = colors  # Add vertex colors to mesh data
+        mesh['faces'] = faces
     mesh['meshops'] = meshops
 
+    # The same groups expanded per vertex / per face, for assigning them in bulk
+    if 'vertex_groups' in mesh:
+        mesh['vertex_bone_indices'] = expand_groups(mesh['vertex_groups'], len(mesh['vertices']))
+    if 'face_materials' in mesh:
+        mesh['face_material_indices'] = expand_groups(mesh['face_materials'], len(mesh['faces']))
+    if 'vertex_materials' in mesh:
+        mesh['vertex_material_indices'] = expand_groups(mesh['vertex_materials'], len(mesh['vertices']))
+
     return mesh, dmsprite_sections
+
+def material_slots(mesh, palette, available):
+    """
+    The material slots the importer gives a mesh using palette: returns
+    (slot materials, material slot of every face). The slots hold the
+    palette's materials that are in available, in palette order. A palette
+    entry that is not takes the last slot, and faces whose material index is
+    outside the palette take slot 0.
+    """
+    slot_materials = [name for name in palette if name in available]
+    slot_of = {}
+    for slot, name in enumerate(slot_materials):
+        slot_of.setdefault(name, slot)
+    slots = np.array([slot_of.get(name, len(slot_materials) - 1) for name in palette], dtype=np.int32)
+    face_materials = np.asarray(mesh.get('face_material_indices', ()), dtype=np.int32)
+    known = (face_materials >= 0) & (face_materials < len(slots))
+    material_indices = np.zeros(len(face_materials), dtype=np.int32)
+    material_indices[known] = slots[face_materials[known]]
+    return slot_materials, material_indices
+
+def geometry_key(mesh, material_names=(), material_indices=None):
+    """
+    Hashes what a mesh datablock is built from: vertices, faces, UVs, normals,
+    the material slot of every face and the materials in those slots (see
+    material_slots). Without material_indices the mesh's face material
+    indices are hashed instead. Returns (key, bytes), bytes being the size of
+    the hashed arrays. Meshes with the same key only differ by tag and can
+    share one datablock.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    size = 0
+    arrays = {name: mesh.get(name, ()) for name in ('vertices', 'faces', 'uvs', 'normals', 'face_material_indices')}
+    if material_indices is not None:
+        arrays['face_material_indices'] = material_indices
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        digest.update(f"{name} {array.dtype.str} {array.shape}\n".encode())
+        digest.update(array)
+        size += array.nbytes
+    digest.update("\n".join(material_names).encode())
+    return digest.hexdigest(), size
+
+def load_dmspritedef2(index, tag):
+    """
+    Parses a single DMSPRITEDEF2 located through a tag_index, without splitting
+    the rest of the file it lives in.
+    """
+    return dmspritedef2_parse(read_section(find_definition(index, tag, "DMSPRITEDEF2")))
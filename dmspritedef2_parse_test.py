@@ -0,0 +1,152 @@
+import numpy as np
+
+from corpus_generator import write_mod_corpus
+from dmspritedef2_parse import counted_block, decode_meshops, dmspritedef2_parse, geometry_key, material_slots, meshop_codes, token_keywords
+from main_parse import main_parse
+
+def test_array_mode_matches_lists(tmp_path):
+    root = write_mod_corpus(str(tmp_path), meshes=1, vertices=40, tracks=0, materials=2, bones=4, includes=0)
+    lines = main_parse(root)[0]['DMSPRITEDEF2'][0]
+
+    mesh, _ = dmspritedef2_parse(lines)
+    arrays, _ = dmspritedef2_parse(lines, arrays=True)
+
+    assert arrays['vertices'].shape == arrays['normals'].shape == (40, 3)
+    assert arrays['uvs'].shape == (40, 2)
+    assert arrays['vertices'].dtype == np.float32 and arrays['colors'].dtype == np.uint8
+    assert np.allclose(arrays['vertices'], mesh['vertices'])
+    assert np.allclose(arrays['normals'], mesh['normals'])
+    assert np.allclose(arrays['uvs'], mesh['uvs'])
+    assert np.allclose(arrays['colors'] / 255.0, mesh['colors'])
+    assert arrays['faces'].dtype == np.int32
+    assert arrays['faces'].tolist() == [list(face[:3]) for face in mesh['faces']]
+    assert arrays['passable'].tolist() == [face[3] for face in mesh['faces']]
+    assert arrays['vertex_groups'] == mesh['vertex_groups']
+    assert arrays['face_materials'] == mesh['face_materials']
+
+def test_malformed_block_falls_back_to_line_parsing(tmp_path):
+    root = write_mod_corpus(str(tmp_path), meshes=1, vertices=20, tracks=0, materials=2, bones=4, includes=0)
+    lines = main_parse(root)[0]['DMSPRITEDEF2'][0]
+    mesh, _ = dmspritedef2_parse(lines)
+
+    # A face without its PASSABLE line breaks the counted DMFACE2 layout
+    broken = list(lines)
+    del broken[next(index for index, line in enumerate(broken) if line.startswith("PASSABLE"))]
+    fallback, _ = dmspritedef2_parse(broken)
+    assert fallback['vertices'] == mesh['vertices']
+    assert len(fallback['faces']) == len(mesh['faces'])
+    assert [face[:3] for face in fallback['faces']] == [face[:3] for face in mesh['faces']]
+    assert fallback['faces'][0][3] is False and fallback['faces'][1][3] is True
+
+    arrays, _ = dmspritedef2_parse(broken, arrays=True)
+    assert arrays['faces'].tolist() == [list(face[:3]) for face in fallback['faces']]
+    assert arrays['passable'].tolist() == [face[3] for face in fallback['faces']]
+
+def test_counted_block_rejects_bad_values():
+    assert counted_block(["XYZ 1 2 3", "XYZ 4 5 6"], 0, 2, "XYZ", 3, np.float32).tolist() == [[1, 2, 3], [4, 5, 6]]
+    assert counted_block(["XYZ 1 2 3", "XYZ 4 x 6"], 0, 2, "XYZ", 3, np.float32) is None
+    assert counted_block(["XYZ 1 2 3", "XYZ 4 5"], 0, 2, "XYZ", 3, np.float32) is None
+    assert counted_block(["TRIANGLE 0, 1, 2", "TRIANGLE 0, 1, 2.5"], 0, 2, "TRIANGLE", 3, np.int64) is None
+
+def test_stray_end_after_face_block(tmp_path):
+    root = write_mod_corpus(str(tmp_path), meshes=1, vertices=20, tracks=0, materials=2, bones=4, includes=0)
+    lines = main_parse(root)[0]['DMSPRITEDEF2'][0]
+    end = max(index for index, line in enumerate(lines) if line.startswith("ENDDMFACE2"))
+    stray = lines[:end + 1] + ["ENDDMFACE2"] + lines[end + 1:]
+
+    for arrays in (False, True):
+        mesh, _ = dmspritedef2_parse(lines, arrays=arrays)
+        with_stray, _ = dmspritedef2_parse(stray, arrays=arrays)
+        if arrays:
+            assert with_stray['passable'].tolist() == mesh['passable'].tolist()
+        else:
+            assert with_stray['faces'] == mesh['faces']
+
+def test_lines_are_classified_by_first_token_prefix():
+    lines = [
+        'TAG "WLD_DMSPRITEDEF"',
+        "DMTRACKINST",
+        'DEFINITION "WLD_DMTRACKDEF"',
+        "ENDDMTRACKINST",
+        "VERTEXMATERIALGROUPS 1",
+        "2 0",
+        "XYZSCALE 1",
+        "FPSCALE 8",
+        "3 1",
+        "NUMVERTICES 1",
+        "XYZ 1 2 3",
+        "NUMVERTEXNORMALS 1",
+        "XYZ 0 0 1",
+        "MESHOP_VA 1 2 0 3.5 1",
+    ]
+    mesh, sections = dmspritedef2_parse(lines)
+
+    assert mesh['dmtrack'] == "WLD_DMTRACKDEF"
+    # FPSCALE closes the group list, so "3 1" is not appended to it
+    assert sections['VERTEXMATERIALGROUPS'] == ["1 2 0 XYZSCALE 1"]
+    assert mesh['vertices'] == [[1.0, 2.0, 3.0]]
+    assert mesh['normals'] == [[0.0, 0.0, 1.0]]
+    assert mesh['meshops'] == [["MESHOP_VA", "1", "2", "0", "3.5", "1"]]
+    # Only tokens that matched a prefix are remembered
+    assert "MESHOP_VA" in token_keywords
+    assert "2" not in token_keywords and "3" not in token_keywords
+
+def test_groups_expanded_per_vertex_and_face(tmp_path):
+    root = write_mod_corpus(str(tmp_path), meshes=1, vertices=30, tracks=0, materials=3, bones=5, includes=0)
+    lines = main_parse(root)[0]['DMSPRITEDEF2'][0]
+
+    for arrays in (False, True):
+        mesh, _ = dmspritedef2_parse(lines, arrays)
+        expected_bones = [bone for start, end, bone in mesh['vertex_groups'] for _ in range(start, end)]
+        expected_materials = [material for start, end, material in mesh['face_materials'] for _ in range(start, end)]
+        assert mesh['vertex_bone_indices'].dtype == np.int32
+        assert mesh['vertex_bone_indices'].tolist() == expected_bones
+        assert mesh['face_material_indices'].tolist() == expected_materials
+        assert len(mesh['vertex_material_indices']) == 30
+
+    partial, _ = dmspritedef2_parse(["NUMVERTICES 3", "XYZ 0 0 0", "XYZ 1 0 0", "XYZ 0 1 0", "SKINASSIGNMENTGROUPS 1 2 4"])
+    assert partial['vertex_bone_indices'].tolist() == [4, 4, -1]
+
+def test_geometry_key_ignores_tag_only(tmp_path):
+    root = write_mod_corpus(str(tmp_path), meshes=2, vertices=20, tracks=0, materials=2, bones=4, includes=0)
+    first, second = main_parse(root)[0]['DMSPRITEDEF2']
+    mesh = dmspritedef2_parse(first, arrays=True)[0]
+    renamed = dmspritedef2_parse([line.replace("ELF00", "ELF99") for line in first], arrays=True)[0]
+    other = dmspritedef2_parse(second, arrays=True)[0]
+
+    key, size = geometry_key(mesh, ["A_MDF", "B_MDF"])
+    assert renamed['name'] != mesh['name']
+    assert geometry_key(renamed, ["A_MDF", "B_MDF"]) == (key, size)
+    assert size == sum(mesh[name].nbytes for name in ('vertices', 'faces', 'uvs', 'normals', 'face_material_indices'))
+    assert geometry_key(mesh, ["B_MDF", "A_MDF"])[0] != key
+    assert geometry_key(other, ["A_MDF", "B_MDF"])[0] != key
+
+def test_shared_geometry_keyed_by_resolved_material_slots(tmp_path):
+    root = write_mod_corpus(str(tmp_path), meshes=1, vertices=20, tracks=0, materials=2, bones=4, includes=0)
+    mesh = dmspritedef2_parse(main_parse(root)[0]['DMSPRITEDEF2'][0], arrays=True)[0]
+    available = {"A_MDF", "B_MDF"}
+
+    def key(palette):
+        return geometry_key(mesh, *material_slots(mesh, palette, available))[0]
+
+    slots, indices = material_slots(mesh, ["B_MDF", "A_MDF"], available)
+    assert slots == ["B_MDF", "A_MDF"]
+    assert indices.tolist() == mesh['face_material_indices'].tolist()
+    # Same geometry with another palette order puts the faces in other slots
+    assert key(["B_MDF", "A_MDF"]) != key(["A_MDF", "B_MDF"])
+    # Palettes that only differ by missing materials resolve to the same slots
+    assert material_slots(mesh, ["A_MDF", "X_MDF"], available)[0] == ["A_MDF"]
+    assert key(["A_MDF", "X_MDF"]) == key(["A_MDF", "Y_MDF"])
+    assert key(["A_MDF", "X_MDF"]) != key(["A_MDF", "B_MDF"])
+
+def test_meshops_decoded_on_request():
+    lines = ["NUMVERTICES 1", "XYZ 0 0 0", "NUMMESHOPS 4", "MESHOP_VA 3 0 5.0e-01 2", "MESHOP_EL 1", "MESHOP_VA 1 2 0 3.5 1", "MESHOP_SW 0 x"]
+    mesh, _ = dmspritedef2_parse(lines, arrays=True)
+    assert 'meshop_records' not in mesh
+
+    records, undecoded = decode_meshops(mesh['meshops'])
+    assert records['op'].tolist() == [meshop_codes["VA"], meshop_codes["EL"]]
+    assert records['index1'].tolist() == [3, 1]
+    assert records['value'].tolist() == [0.5, 0.0]
+    assert records['param'].tolist() == [2, 0]
+    assert undecoded == [["MESHOP_VA", "1", "2", "0", "3.5", "1"], ["MESHOP_SW", "0", "x"]]
@@ -1,5 +1,8 @@
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 
 # Manually set the directory containing your scripts
 script_dir = r'C:\Users\dariu\Documents\Quail\Importer'  # Replace with the actual path
@@ -7,59 +10,310 @@ print(f"Script directory: {script_dir}")  # Check the path
 if script_dir not in sys.path:
     sys.path.append(script_dir)
 
-from main_parse import main_parse
+from main_parse import include_file_path, iter_sections, path_key, section_tag, split_file
 from material_palette_parse import material_palette_parse
 from dmspritedef2_parse import dmspritedef2_parse
 from hierarchicalspritedef_parse import hierarchicalspritedef_parse
-from track_parse import track_parse
+from track_parse import parse_track_definition, parse_track_instance, name_track_definition, name_track_instance, link_tracks
 from polyhedrondefinition_parse import polyhedrondefinition_parse
 from simplespritedef_parse import simplespritedef_parse
 from materialdefinition_parse import materialdefinition_parse
+from spatial_index import mesh_polyhedron, placed_boxes, section_bounds, spatial_index
 
-def eq_ascii_parse(filepath):
-    def recursive_parse(filepath, parsed_sections=None, include_paths=None):
-        if parsed_sections is None:
-            parsed_sections = {}
-        if include_paths is None:
-            include_paths = []
+# Part of the parse_cache key of parsed files; bump it when a parser's output changes
+PARSED_FORMAT = 3
 
-        sections, includes = main_parse(filepath)
+# Sections with bounds, which bbox and build_spatial_index look at
+bounded_kinds = {'DMSPRITEDEF2', 'POLYHEDRONDEFINITION'}
 
-        # Merge sections into parsed_sections
-        for section, instances in sections.items():
-            if section not in parsed_sections:
-                parsed_sections[section] = []
-            parsed_sections[section].extend(instances)
+def recursive_parse(filepath, include_paths=None, kinds=None, tags=None):
+    """
+    Yields (section, lines) for every section of filepath, then for each of its
+    INCLUDEs depth first. Every include path visited is appended to include_paths.
+    A file reached a second time is skipped, and an INCLUDE cycle is reported
+    and skipped.
 
-        # Process INCLUDE statements
-        for include in includes:
-            include_path = os.path.join(os.path.dirname(filepath), include)
-            if include_path not in include_paths:
-                include_paths.append(include_path)
-                recursive_parse(include_path, parsed_sections, include_paths)
+    kinds and tags restrict the sections yielded, see main_parse.iter_sections.
+    """
+    def read(path):
+        includes = []
+        return stream_sections(path, includes, kinds, tags), includes
 
-        return parsed_sections, include_paths
+    yield from walk_files(filepath, include_paths, read)
 
-    # Start the recursive parsing from the main file
-    parsed_sections, include_paths = recursive_parse(filepath)
+def stream_sections(filepath, includes, kinds=None, tags=None):
+    with open(filepath, 'r') as file:
+        for section, data in iter_sections(file, kinds, tags):
+            if section == "INCLUDE":
+                includes.append(data)
+            else:
+                yield section, data
 
-    # Parse material palettes
-    material_palettes = {}
-    for instance in parsed_sections.get('MATERIALPALETTE', []):
-        material_palette = material_palette_parse(instance)
-        if material_palette['name']:
-            material_palettes[material_palette['name']] = material_palette['materials']
+def walk_files(filepath, include_paths, read):
+    # read(path) returns (items, includes); includes may fill up while items are consumed
+    if include_paths is None:
+        include_paths = []
 
-    # Parse DMSPRITEDEF2 sections
-    meshes = []
-    for instance in parsed_sections.get('DMSPRITEDEF2', []):
-        dmspritedef2, inner_sections = dmspritedef2_parse(instance)
-        meshes.append(dmspritedef2)
+    visited = {path_key(filepath)}
+    visited.update(path_key(include_path) for include_path in include_paths)
+    yield from walk_includes(filepath, include_paths, visited, set(), read)
+
+def walk_includes(filepath, include_paths, visited, ancestors, read):
+    key = path_key(filepath)
+    directory = os.path.dirname(filepath)
+    items, includes = read(filepath)
+    yield from items
+
+    # Process INCLUDE statements
+    ancestors.add(key)
+    for include in includes:
+        include_path = include_file_path(directory, include)
+        include_key = path_key(include_path)
+        if include_key in ancestors:
+            print(f"Warning: INCLUDE cycle, '{filepath}' includes '{include}' which is already being parsed")
+            continue
+        if include_key in visited:
+            continue
+        visited.add(include_key)
+        include_paths.append(include_path)
+        yield from walk_includes(include_path, include_paths, visited, ancestors, read)
+    ancestors.discard(key)
+
+def section_key(section, tag, counts):
+    # (section, tag, n) for the n-th section of that kind with that tag; the same in every walk over a tree
+    number = counts.get((section, tag), 0)
+    counts[section, tag] = number + 1
+    return section, tag, number
+
+def section_placement(section, lines):
+    # What placed_entries needs of a section: its own bounds and, for a mesh, the polyhedron it names
+    return section_bounds(section, lines), mesh_polyhedron(lines) if section == 'DMSPRITEDEF2' else None
+
+def placed_entries(bounds):
+    """
+    (section_key, box) of every (section, tag, box, polyhedron) in bounds, in
+    order, with polyhedron boxes placed by the meshes naming them (see
+    spatial_index.placed_boxes).
+    """
+    counts = {}
+    return placed_boxes((section_key(section, tag, counts), section, tag, box, polyhedron)
+        for section, tag, box, polyhedron in bounds)
+
+def keys_in_box(bounds, bbox):
+    # section_key of the bounds entries whose placed box meets bbox, or that have no box
+    return set(spatial_index(placed_entries(bounds)).query(bbox))
+
+def tree_bounds(filepath):
+    # A pass over filepath and its includes that reads only the sections with bounds
+    for section, lines in recursive_parse(filepath, None, bounded_kinds):
+        yield (section, section_tag(lines)) + section_placement(section, lines)
+
+def sections_in_box(sections, keys, stats=None):
+    counts = {}
+    for section, lines in sections:
+        if section in bounded_kinds and section_key(section, section_tag(lines), counts) not in keys:
+            if stats is not None:
+                stats.count("outside_bbox")
+            continue
+        yield section, lines
+
+def definition_parsers(mesh_arrays=False):
+    # Tracks keep their tags here, iter_definitions makes them unique in file order
+    return {
+        'MATERIALPALETTE': material_palette_parse,
+        'DMSPRITEDEF2': lambda lines: dmspritedef2_parse(lines, mesh_arrays)[0],
+        'HIERARCHICALSPRITEDEF': hierarchicalspritedef_parse,
+        'POLYHEDRONDEFINITION': polyhedrondefinition_parse,
+        'SIMPLESPRITEDEF': simplespritedef_parse,
+        'MATERIALDEFINITION': materialdefinition_parse,
+        'TRACKDEFINITION': parse_track_definition,
+        'TRACKINSTANCE': parse_track_instance
+    }
+
+def parse_file(filepath, mesh_arrays=False, kinds=None, tags=None):
+    """
+    Splits and parses one file, without its includes; kinds and tags restrict
+    the sections parsed, see main_parse.iter_sections. Returns a dict with
+    'includes' and 'definitions', a file-ordered list of
+    (kind, tag, box, polyhedron, line count, seconds, definition) where box
+    and polyhedron are the section's section_placement. This is what
+    parse_cache keeps per file.
+    """
+    parsers = definition_parsers(mesh_arrays)
+    sections, includes = split_file(filepath, kinds, tags)
+    definitions = []
+    for section, lines in sections:
+        parser = parsers.get(section)
+        if parser:
+            start = time.perf_counter()
+            definition = parser(lines)
+            definitions.append((section, section_tag(lines)) + section_placement(section, lines) + (len(lines), time.perf_counter() - start, definition))
+    return {'definitions': definitions, 'includes': includes}
+
+def parsed_file_reader(cache=None, pool=None, mesh_arrays=False, kinds=None, tags=None):
+    """
+    A read function for walk_files that returns each file's parse_file
+    (definitions, includes), loading unchanged files from cache. With a
+    process pool, the includes of every file read are submitted to it at
+    once, so sibling includes are split and parsed concurrently while
+    walk_files still takes them in include order. kinds and tags are only
+    passed on to parse_file without a cache, which keeps whole files; a
+    bbox query also leaves them out, as it needs the meshes placing polyhedrons.
+    """
+    variant = f"parsed{PARSED_FORMAT}-{'arrays' if mesh_arrays else 'lists'}"
+    if cache is not None:
+        kinds = tags = None
+    started = {}
+    seen = set()
+
+    def start(path):
+        key = path_key(path)
+        if key not in seen:
+            seen.add(key)
+            result = cache.load(path, variant) if cache is not None else None
+            if result is not None:
+                # Nothing is parsed for a hit, so its seconds are 0
+                result['definitions'] = [record[:5] + (0.0, record[6]) for record in result['definitions']]
+                started[key] = (result, True)
+            elif pool is not None:
+                started[key] = (pool.submit(parse_file, path, mesh_arrays, kinds, tags), False)
+            else:
+                started[key] = (None, False)
+        return key
+
+    def read(path):
+        result, cached = started.pop(start(path))
+        if result is None:
+            result = parse_file(path, mesh_arrays, kinds, tags)
+        elif not cached:
+            result = result.result()
+        if cache is not None and not cached:
+            cache.store(path, result, variant)
+        if pool is not None:
+            directory = os.path.dirname(path)
+            for include in result['includes']:
+                start(include_file_path(directory, include))
+        return result['definitions'], result['includes']
+
+    return read
+
+def iter_definitions(filepath, include_paths=None, cache=None, kinds=None, tags=None, stats=None, mesh_arrays=False, bbox=None,
+        workers=0):
+    """
+    Parses filepath and its includes, yielding (kind, definition) as soon as
+    each definition's END marker has been read. kind is the section keyword
+    and definition is what that section's parser returns; tracks are yielded
+    with their unique names assigned but not yet linked (see link_tracks).
+
+    :param filepath: Path to the main .wce/.mod file.
+    :param include_paths: Optional list that collects every include visited.
+    :param cache: Optional parse_cache; unchanged files are loaded from it already parsed, and changed
+        files are parsed whole and stored. kinds, tags and bbox then filter the parsed definitions.
+    :param kinds: Optional set of section keywords to parse, e.g. {"DMSPRITEDEF2"}; other sections are skipped unread.
+    :param tags: Optional collection of TAG names to parse.
+    :param stats: Optional import_stats; gets the split time and per-kind counts and parse times.
+    :param mesh_arrays: Return DMSPRITEDEF2 vertex and face data as numpy arrays (see dmspritedef2_parse).
+    :param bbox: Optional ((min x, y, z), (max x, y, z)); DMSPRITEDEF2 and POLYHEDRONDEFINITION sections whose
+        bounds lie outside it are dropped before they are decoded. The bounds of the whole tree are read first,
+        polyhedrons are placed by the meshes naming them (see placed_entries), and a spatial_index over them
+        answers the query.
+    :param workers: Number of processes that split and parse files, includes being handed out as soon as the file
+        naming them is read. Definitions are yielded in the same order as with the default, 0, which parses in
+        this process.
+    """
+    existing_track_definitions = set()
+    existing_track_instances = set()
+    track_def_suffixes = {}
+    definition_counters = {}
+    instance_counters = {}
 
-    # Parse HIERARCHICALSPRITEDEF sections
+    # Track names depend on every file read before, so they are assigned here
+    # in file order, also for definitions that come parsed from the cache
+    def name_tracks(kind, definition):
+        if kind == 'TRACKDEFINITION':
+            name_track_definition(definition, existing_track_definitions, definition_counters)
+        elif kind == 'TRACKINSTANCE':
+            name_track_instance(definition, existing_track_instances, track_def_suffixes, instance_counters)
+        return definition
+
+    if cache is not None or workers:
+        pool = ProcessPoolExecutor(max_workers=workers) if workers else None
+        try:
+            files = walk_files(filepath, include_paths, parsed_file_reader(cache, pool, mesh_arrays,
+                *((kinds, tags) if bbox is None else ())))
+            if stats is not None:
+                files = stats.timed(files, "cached_files" if cache is not None else "parsed_files")
+            if bbox is not None:
+                # A polyhedron can be named by a mesh in any file, so every file is loaded first
+                files = list(files)
+                keys = keys_in_box((record[:4] for record in files if record[0] in bounded_kinds), bbox)
+                counts = {}
+            for kind, tag, box, polyhedron, line_count, seconds, definition in files:
+                if (kinds is not None and kind not in kinds) or (tags is not None and tag not in tags):
+                    continue
+                if bbox is not None and kind in bounded_kinds and section_key(kind, tag, counts) not in keys:
+                    if stats is not None:
+                        stats.count("outside_bbox")
+                    continue
+                if stats is not None:
+                    stats.add_definition(kind, line_count, seconds)
+                yield kind, name_tracks(kind, definition)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            if cache is not None:
+                cache.save()
+        return
+
+    parsers = definition_parsers(mesh_arrays)
+    sections = recursive_parse(filepath, include_paths, kinds, tags)
+    if bbox is not None:
+        sections = sections_in_box(sections, keys_in_box(tree_bounds(filepath), bbox), stats)
+    if stats is None:
+        for section, lines in sections:
+            parser = parsers.get(section)
+            if parser:
+                yield section, name_tracks(section, parser(lines))
+        return
+
+    for section, lines in stats.timed(sections, "split"):
+        parser = parsers.get(section)
+        if parser:
+            start = time.perf_counter()
+            definition = name_tracks(section, parser(lines))
+            stats.add_definition(section, lines, time.perf_counter() - start)
+            yield section, definition
+
+def eq_ascii_parse(filepath, cache=None, kinds=None, tags=None, stats=None, mesh_arrays=False, bbox=None, workers=0):
+    material_palettes = {}
+    meshes = []
     armature_data = None
-    for instance in parsed_sections.get('HIERARCHICALSPRITEDEF', []):
-        armature_data = hierarchicalspritedef_parse(instance)
+    polyhedrons = []
+    textures = {}
+    materials = []
+    track_definitions = {}
+    track_instances = []
+    include_paths = []
+
+    for kind, definition in iter_definitions(filepath, include_paths, cache, kinds, tags, stats, mesh_arrays, bbox, workers):
+        if kind == 'MATERIALPALETTE':
+            if definition['name']:
+                material_palettes[definition['name']] = definition['materials']
+        elif kind == 'DMSPRITEDEF2':
+            meshes.append(definition)
+        elif kind == 'HIERARCHICALSPRITEDEF':
+            armature_data = definition
+        elif kind == 'POLYHEDRONDEFINITION':
+            polyhedrons.append(definition)
+        elif kind == 'SIMPLESPRITEDEF':
+            if definition:
+                textures.update(definition)
+        elif kind == 'MATERIALDEFINITION':
+            materials.extend(definition)
+        elif kind == 'TRACKDEFINITION':
+            track_definitions[definition['name']] = definition
+        elif kind == 'TRACKINSTANCE':
+            track_instances.append(definition)
 
     # Debug print to display the collected armature data
     if armature_data:
@@ -67,34 +321,32 @@ def eq_ascii_parse(filepath):
         for key, value in armature_data.items():
             print(f"{key}: {value}")
 
-    # Parse POLYHEDRONDEFINITION sections
-    polyhedrons = []
-    for instance in parsed_sections.get('POLYHEDRONDEFINITION', []):
-        polyhedron = polyhedrondefinition_parse(instance)
-        polyhedrons.append(polyhedron)
-
-    # Parse SIMPLESPRITEDEF sections
-    textures = {}
-    for instance in parsed_sections.get('SIMPLESPRITEDEF', []):
-        sprite_textures = simplespritedef_parse(instance)
-        if sprite_textures:
-            textures.update(sprite_textures)
-
-    # Parse MATERIALDEFINITION sections
-    materials = []
-    for instance in parsed_sections.get('MATERIALDEFINITION', []):
-        material_defs = materialdefinition_parse(instance)
-        materials.extend(material_defs)
-
     # Get the base name for the main object
     base_name = os.path.splitext(os.path.basename(filepath))[0]
     base_name = base_name.upper()
 
-    # Parse track definitions and instances
-    track_definitions = track_parse(parsed_sections, base_name)
+    # Link track instances to their definitions
+    with stats.stage("link_tracks") if stats is not None else nullcontext():
+        track_definitions = link_tracks(track_definitions, track_instances, base_name)
+
+    if stats is not None:
+        stats.count("include_files", len(include_paths))
+        if cache is not None:
+            stats.count("cache_hits", cache.hits)
+            stats.count("cache_misses", cache.misses)
 
     return meshes, armature_data, track_definitions, material_palettes, include_paths, polyhedrons, textures, materials
 
+def build_spatial_index(filepath, cell_size=None):
+    """
+    Grid index of the (tag, box) of every DMSPRITEDEF2 and POLYHEDRONDEFINITION
+    in filepath and its includes, from their bounds lines only, with
+    polyhedrons placed by the meshes naming them (see placed_entries). Unlike
+    eq_ascii_parse's bbox, the index can answer many area queries after one
+    pass over the files.
+    """
+    return spatial_index([(key[1], box) for key, box in placed_entries(tree_bounds(filepath))], cell_size)
+
 if __name__ == '__main__':
     # Example usage:
     filepath = r"C:\Users\dariu\Documents\Quail\crushbone.quail\r.mod"
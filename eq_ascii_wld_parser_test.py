@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+
+from corpus_generator import write_mod_corpus
+from eq_ascii_wld_parser import build_spatial_index, eq_ascii_parse, recursive_parse
+from parse_cache import parse_cache
+
+def summary(result):
+    meshes, armature_data, track_definitions, _, include_paths, _, _, _ = result
+    tracks = {}
+    for group in ('armature_tracks', 'animations'):
+        for name, track in track_definitions.get(group, {}).items():
+            definition = track['definition']
+            tracks[name] = (definition['translations'].tolist(), definition['rotations'].tolist())
+    return [mesh['name'] for mesh in meshes], armature_data, tracks, [path.lower() for path in include_paths]
+
+def test_cache_matches_sequential(tmp_path):
+    root = write_mod_corpus(str(tmp_path), meshes=2, vertices=20, tracks=6, frames=4, bones=4, includes=2)
+    sequential = summary(eq_ascii_parse(root))
+    assert sequential[2] and len(sequential[3]) == 2
+
+    cache = parse_cache(str(tmp_path / "cache"))
+    assert summary(eq_ascii_parse(root, cache=cache)) == sequential
+    cached = parse_cache(str(tmp_path / "cache"))
+    assert summary(eq_ascii_parse(root, cache=cached)) == sequential
+    assert cached.hits == 3 and cached.misses == 0
+
+    # Filters apply to the parsed definitions of a cached file
+    meshes_only = eq_ascii_parse(root, cache=parse_cache(str(tmp_path / "cache")), kinds={"DMSPRITEDEF2"})
+    assert [mesh['name'] for mesh in meshes_only[0]] == sequential[0]
+    assert meshes_only[2] == {'animations': {}, 'armature_tracks': {}}
+
+def test_workers_match_sequential(tmp_path):
+    root = write_mod_corpus(str(tmp_path), meshes=2, vertices=20, tracks=6, frames=4, bones=4, includes=2)
+    sequential = summary(eq_ascii_parse(root))
+
+    assert summary(eq_ascii_parse(root, workers=2)) == sequential
+    assert summary(eq_ascii_parse(root, cache=parse_cache(str(tmp_path / "cache")), workers=2)) == sequential
+    cached = parse_cache(str(tmp_path / "cache"))
+    assert summary(eq_ascii_parse(root, cache=cached, workers=2)) == sequential
+    assert cached.hits == 3 and cached.misses == 0
+
+    meshes_only = eq_ascii_parse(root, kinds={"DMSPRITEDEF2"}, workers=2)
+    assert [mesh['name'] for mesh in meshes_only[0]] == sequential[0]
+    assert meshes_only[2] == {'animations': {}, 'armature_tracks': {}}
+
+def test_mesh_arrays(tmp_path):
+    root = write_mod_corpus(str(tmp_path), meshes=1, vertices=20, tracks=0, includes=0)
+    lists = eq_ascii_parse(root)[0][0]
+    arrays = eq_ascii_parse(root, mesh_arrays=True)[0][0]
+    assert np.allclose(arrays['vertices'], lists['vertices'])
+
+def test_repeated_and_cyclic_includes_are_read_once(tmp_path):
+    (tmp_path / "ROOT.MOD").write_text('INCLUDE "A.INC"\nINCLUDE "B.INC"\nINCLUDE "./A.INC"\n')
+    (tmp_path / "A.INC").write_text('INCLUDE "ROOT.MOD"\nINCLUDE "B.INC"\nMATERIALPALETTE\n\tTAG "A_PAL"\nENDMATERIALPALETTE\n')
+    (tmp_path / "B.INC").write_text('INCLUDE "A.INC"\nMATERIALPALETTE\n\tTAG "B_PAL"\nENDMATERIALPALETTE\n')
+    include_paths = []
+    sections = list(recursive_parse(str(tmp_path / "ROOT.MOD"), include_paths))
+    assert [lines[0] for _, lines in sections] == ['TAG "A_PAL"', 'TAG "B_PAL"']
+    assert [os.path.basename(path) for path in include_paths] == ["A.INC", "B.INC"]
+
+def mesh_section(tag, offset, polyhedron):
+    return (f'DMSPRITEDEF2\n\tTAG "{tag}"\n\tCENTEROFFSET {offset} 0 0\n\tNUMVERTICES 1\n\tXYZ 0 0 0\n'
+        f'\tPOLYHEDRON\n\t\tDEFINITION "{polyhedron}"\n\tENDPOLYHEDRON\n\tNUMFACE2S 0\n'
+        '\tBOUNDINGBOXMIN -1 -1 -1\n\tBOUNDINGBOXMAX 1 1 1\nENDDMSPRITEDEF2\n')
+
+def test_bbox_places_polyhedrons_like_their_meshes(tmp_path):
+    # FAR_PH is in the mesh's local coordinates; its mesh sits at x = 100 and is in the include
+    (tmp_path / "ROOT.MOD").write_text('POLYHEDRONDEFINITION\n\tTAG "FAR_PH"\n\tNUMVERTICES 2\n\tXYZ 0 0 0\n\tXYZ 1 1 1\n'
+        'ENDPOLYHEDRONDEFINITION\n' + mesh_section("NEAR_DMSPRITEDEF", 0, "") + 'INCLUDE "FAR.INC"\n')
+    (tmp_path / "FAR.INC").write_text(mesh_section("FAR_DMSPRITEDEF", 100, "FAR_PH"))
+    root = str(tmp_path / "ROOT.MOD")
+
+    index = build_spatial_index(root)
+    assert index.query(((99.5, 0.0, 0.0), (100.5, 0.5, 0.5))) == ["FAR_PH", "FAR_DMSPRITEDEF"]
+    assert index.query(((0.0, 0.0, 0.0), (0.5, 0.5, 0.5))) == ["NEAR_DMSPRITEDEF"]
+
+    for cache in (None, parse_cache(str(tmp_path / "cache")), parse_cache(str(tmp_path / "cache"))):
+        near = eq_ascii_parse(root, cache=cache, bbox=((0.0, 0.0, 0.0), (0.5, 0.5, 0.5)))
+        assert [mesh['name'] for mesh in near[0]] == ["NEAR_DMSPRITEDEF"] and near[5] == []
+        far = eq_ascii_parse(root, cache=cache, bbox=((99.5, 0.0, 0.0), (100.5, 0.5, 0.5)))
+        assert [mesh['name'] for mesh in far[0]] == ["FAR_DMSPRITEDEF"]
+        assert [polyhedron['name'] for polyhedron in far[5]] == ["FAR_PH"]
@@ -0,0 +1,114 @@
+import cProfile, io, json, pstats, time, tracemalloc
+from contextlib import contextmanager
+
+class import_stats:
+    """
+    Timings and counters collected over one import. Stages are timed with
+    stage() (nested stages are timed independently) and can also be run
+    under cProfile or tracemalloc by naming them in profile_stages or
+    trace_memory_stages. Everything except the profiles is plain data and
+    can be written out with dump().
+    """
+    stages:dict
+    kinds:dict
+    counters:dict
+    profiles:dict
+
+    def __init__(self, profile_stages=(), trace_memory_stages=()):
+        self.stages = {}
+        self.kinds = {}
+        self.counters = {}
+        self.profiles = {}
+        self.profile_stages = set(profile_stages)
+        self.trace_memory_stages = set(trace_memory_stages)
+
+    def _stage(self, name:str) -> dict:
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {'seconds': 0.0, 'calls': 0}
+        return stage
+
+    @contextmanager
+    def stage(self, name:str):
+        profile = None
+        if name in self.profile_stages:
+            profile = self.profiles.get(name)
+            if profile is None:
+                profile = self.profiles[name] = cProfile.Profile()
+        tracing = name in self.trace_memory_stages and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        start = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            elapsed = time.perf_counter() - start
+            stage = self._stage(name)
+            stage['seconds'] += elapsed
+            stage['calls'] += 1
+            if tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                stage['peak_mb'] = max(stage.get('peak_mb', 0.0), peak / (1024 * 1024))
+
+    def timed(self, iterable, name:str):
+        """
+        Yields from iterable, adding the time spent producing each item to the
+        stage name. Used for streaming stages such as splitting, whose work is
+        interleaved with whatever consumes them.
+        """
+        iterator = iter(iterable)
+        stage = self._stage(name)
+        stage['calls'] += 1
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                stage['seconds'] += time.perf_counter() - start
+                return
+            stage['seconds'] += time.perf_counter() - start
+            yield item
+
+    def count(self, name:str, amount:int=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_definition(self, kind:str, lines, seconds:float=0.0):
+        # lines is the section's lines, or their count for sections parsed earlier (e.g. cached)
+        entry = self.kinds.get(kind)
+        if entry is None:
+            entry = self.kinds[kind] = {'definitions': 0, 'lines': 0, 'seconds': 0.0}
+        entry['definitions'] += 1
+        entry['lines'] += lines if isinstance(lines, int) else len(lines)
+        entry['seconds'] += seconds
+
+    def profile_text(self, name:str, limit:int=25) -> str:
+        stream = io.StringIO()
+        pstats.Stats(self.profiles[name], stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def to_dict(self) -> dict:
+        return {'stages': self.stages, 'kinds': self.kinds, 'counters': self.counters}
+
+    def dump(self, path:str):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def report(self) -> str:
+        lines = ["Import stats:"]
+        for name, stage in self.stages.items():
+            line = f"  {name:<28} {stage['seconds']:9.3f}s"
+            if stage['calls'] > 1:
+                line += f" ({stage['calls']} calls)"
+            if 'peak_mb' in stage:
+                line += f" peak {stage['peak_mb']:.1f} MB"
+            lines.append(line)
+        for kind, entry in self.kinds.items():
+            lines.append(f"  {kind:<28} {entry['definitions']:9d} defs {entry['lines']:10d} lines {entry['seconds']:9.3f}s")
+        for name, value in self.counters.items():
+            lines.append(f"  {name:<28} {value:9d}")
+        return "\n".join(lines)
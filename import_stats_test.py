@@ -0,0 +1,28 @@
+import json
+
+from import_stats import import_stats
+
+def test_stages_counters_and_json(tmp_path):
+    stats = import_stats(profile_stages=["build"], trace_memory_stages=["build"])
+
+    with stats.stage("build"):
+        data = [list(range(100)) for _ in range(100)]
+    with stats.stage("build"):
+        pass
+    items = list(stats.timed(iter(data), "split"))
+    stats.count("vertices", 30)
+    stats.count("vertices", 12)
+    stats.add_definition("DMSPRITEDEF2", ["TAG \"A\"", "NUMVERTICES 0"], 0.5)
+
+    assert len(items) == 100
+    assert stats.stages["build"]["calls"] == 2
+    assert stats.stages["build"]["peak_mb"] > 0
+    assert stats.stages["split"]["calls"] == 1
+    assert stats.counters == {"vertices": 42}
+    assert stats.kinds["DMSPRITEDEF2"] == {"definitions": 1, "lines": 2, "seconds": 0.5}
+    assert "function calls" in stats.profile_text("build")
+
+    path = tmp_path / "stats.json"
+    stats.dump(str(path))
+    assert json.loads(path.read_text())["counters"]["vertices"] == 42
+    assert "DMSPRITEDEF2" in stats.report()
@@ -0,0 +1,104 @@
+import numpy as np
+
+# Columns of a bone's channel array: location x/y/z, rotation_quaternion w/x/y/z, scale x/y/z
+bone_channels = [('location', 0), ('location', 1), ('location', 2),
+    ('rotation_quaternion', 0), ('rotation_quaternion', 1), ('rotation_quaternion', 2), ('rotation_quaternion', 3),
+    ('scale', 0), ('scale', 1), ('scale', 2)]
+
+def keyframe_coordinates(frames, values):
+    """
+    (N, 2) (frame, value) rows sorted by frame. When a frame repeats, the
+    last value given for it wins, like successive keyframe_points.insert calls.
+    """
+    frames = np.asarray(frames, dtype=np.float64).ravel()
+    values = np.asarray(values, dtype=np.float64).ravel()
+    order = np.argsort(frames, kind='stable')
+    frames = frames[order]
+    values = values[order]
+    last = np.ones(len(frames), dtype=bool)
+    last[:-1] = frames[1:] != frames[:-1]
+    return np.column_stack([frames[last], values[last]])
+
+def reduce_keyframes(co, tolerance=0.0):
+    """
+    Drops the keys of sorted (N, 2) co rows that linear interpolation
+    between the kept keys reproduces within tolerance (Douglas-Peucker), so
+    every original key stays within tolerance of the reduced curve. A
+    channel whose values all lie within tolerance keeps only its first key.
+    """
+    if len(co) < 2:
+        return co
+    values = co[:, 1]
+    if values.max() - values.min() <= tolerance:
+        return co[:1]
+
+    keep = np.zeros(len(co), dtype=bool)
+    keep[[0, -1]] = True
+    segments = [(0, len(co) - 1)]
+    while segments:
+        start, end = segments.pop()
+        if end - start < 2:
+            continue
+        frames = co[start:end + 1, 0]
+        segment = values[start:end + 1]
+        between = segment[0] + (segment[-1] - segment[0]) * (frames[1:-1] - frames[0]) / (frames[-1] - frames[0])
+        errors = np.abs(between - segment[1:-1])
+        worst = int(np.argmax(errors))
+        if errors[worst] > tolerance:
+            middle = start + 1 + worst
+            keep[middle] = True
+            segments.append((start, middle))
+            segments.append((middle, end))
+    return co[keep]
+
+def write_keyframes(fcurve, frames, values, interpolation='LINEAR', tolerance=None):
+    """
+    Adds one key per (frame, value) to fcurve with keyframe_points.add and
+    foreach_set instead of an insert call per key. Keys already on the curve
+    are kept unless a new key lands on the same frame. With a tolerance, the
+    merged keys are first thinned with reduce_keyframes, so the curve can end
+    up with fewer points than it had. Returns the key count.
+    """
+    points = fcurve.keyframe_points
+    existing = len(points)
+    if existing:
+        old = np.empty(existing * 2, dtype=np.float32)
+        points.foreach_get("co", old)
+        old = old.reshape(-1, 2)
+        frames = np.concatenate([old[:, 0], np.asarray(frames, dtype=np.float64).ravel()])
+        values = np.concatenate([old[:, 1], np.asarray(values, dtype=np.float64).ravel()])
+    co = keyframe_coordinates(frames, values)
+    if tolerance is not None:
+        co = reduce_keyframes(co, tolerance)
+    if len(co) == 0:
+        return 0
+    # Every key is rewritten below, so only the point count has to match
+    if len(co) > existing:
+        points.add(len(co) - existing)
+    for _ in range(existing - len(co)):
+        points.remove(points[-1], fast=True)
+    points.foreach_set("co", co.astype(np.float32).ravel())
+
+    mode = points[0].bl_rna.properties['interpolation'].enum_items[interpolation].value
+    try:
+        points.foreach_set("interpolation", np.full(len(co), mode, dtype=np.int32))
+    except (TypeError, RuntimeError):
+        # Older Blender versions cannot foreach_set enum properties
+        for point in points:
+            point.interpolation = interpolation
+    fcurve.update()
+    return len(co)
+
+def write_bone_keyframes(action, bone_name, frames, channels, interpolation='LINEAR', tolerance=None):
+    """
+    Creates the location, rotation_quaternion and scale fcurves of bone_name
+    in action and fills them from channels, an (N, 10) array with one row
+    per frame and one column per bone_channels entry. Returns the number of
+    keys written.
+    """
+    channels = np.asarray(channels, dtype=np.float64).reshape(-1, len(bone_channels))
+    fcurves = {}
+    for data_path, index in sorted(bone_channels, key=lambda channel: (channel[0] == 'rotation_quaternion', channel[1])):
+        fcurves[data_path, index] = action.fcurves.new(data_path=f'pose.bones["{bone_name}"].{data_path}', index=index)
+    return sum(write_keyframes(fcurves[channel], frames, channels[:, column], interpolation, tolerance)
+        for column, channel in enumerate(bone_channels))
@@ -0,0 +1,80 @@
+import numpy as np
+
+from types import SimpleNamespace
+
+from keyframe_writer import bone_channels, keyframe_coordinates, reduce_keyframes, write_keyframes
+
+class keyframe_points(list):
+    # Just enough of Blender's FCurveKeyframePoints for write_keyframes
+    def add(self, count):
+        assert count > 0
+        interpolation = SimpleNamespace(enum_items={'LINEAR': SimpleNamespace(value=1)})
+        self.extend(SimpleNamespace(co=(0.0, 0.0), interpolation=0,
+            bl_rna=SimpleNamespace(properties={'interpolation': interpolation})) for _ in range(count))
+
+    def remove(self, point, fast=False):
+        list.remove(self, point)
+
+    def foreach_get(self, name, out):
+        out[:] = np.ravel([getattr(point, name) for point in self])
+
+    def foreach_set(self, name, data):
+        data = np.asarray(data).reshape(len(self), -1)
+        for point, value in zip(self, data):
+            setattr(point, name, tuple(value.tolist()) if len(value) > 1 else value[0])
+
+def fake_fcurve(co=()):
+    fcurve = SimpleNamespace(keyframe_points=keyframe_points(), update=lambda: None)
+    if len(co):
+        fcurve.keyframe_points.add(len(co))
+        fcurve.keyframe_points.foreach_set("co", np.ravel(co))
+    return fcurve
+
+def curve_keys(fcurve):
+    return [list(point.co) for point in fcurve.keyframe_points]
+
+def test_keyframe_coordinates_sorted_last_value_wins():
+    co = keyframe_coordinates([3, 1, 2, 1, 2.5], [30, 10, 20, 11, 25])
+    assert co.tolist() == [[1, 11], [2, 20], [2.5, 25], [3, 30]]
+    assert keyframe_coordinates([], []).shape == (0, 2)
+
+def test_bone_channel_columns():
+    assert len(bone_channels) == 10
+    assert [path for path, _ in bone_channels].count('rotation_quaternion') == 4
+
+def test_reduce_keyframes_within_tolerance():
+    frames = np.arange(200, dtype=np.float64)
+    constant = keyframe_coordinates(frames, np.full(200, 0.5))
+    assert reduce_keyframes(constant).tolist() == [[0, 0.5]]
+
+    # Two straight runs keep their ends only
+    ramp = keyframe_coordinates(frames, np.minimum(frames, 100) * 0.25)
+    assert reduce_keyframes(ramp)[:, 0].tolist() == [0, 100, 199]
+
+    values = np.sin(frames / 15) + np.random.default_rng(0).normal(0, 0.001, 200)
+    co = keyframe_coordinates(frames, values)
+    reduced = reduce_keyframes(co, 0.01)
+    assert 2 < len(reduced) < 100
+    assert np.abs(np.interp(frames, reduced[:, 0], reduced[:, 1]) - values).max() <= 0.01
+    assert len(reduce_keyframes(co, 0.0)) == 200
+
+def test_write_keyframes_merges_existing_keys():
+    fcurve = fake_fcurve([[0, 1], [5, 2], [10, 3]])
+    assert write_keyframes(fcurve, [5, 20], [7, 9]) == 4
+    assert curve_keys(fcurve) == [[0, 1], [5, 7], [10, 3], [20, 9]]
+    assert [point.interpolation for point in fcurve.keyframe_points] == [1] * 4
+
+    # All new keys on existing frames: the point count stays the same
+    assert write_keyframes(fcurve, [0, 20], [4, 4]) == 4
+    assert curve_keys(fcurve) == [[0, 4], [5, 7], [10, 3], [20, 4]]
+
+def test_write_keyframes_reduces_onto_existing_keys():
+    # A keyed ramp; new keys continue it, so the merged curve thins to its ends
+    fcurve = fake_fcurve([[frame, frame * 0.5] for frame in range(10)])
+    assert write_keyframes(fcurve, [10, 11, 12], [5, 5.5, 6], tolerance=0.0) == 2
+    assert curve_keys(fcurve) == [[0, 0], [12, 6]]
+
+    # Extending a flat channel leaves only its first key
+    fcurve = fake_fcurve([[0, 1], [1, 1], [2, 1]])
+    assert write_keyframes(fcurve, [3, 4], [1, 1], tolerance=0.001) == 1
+    assert curve_keys(fcurve) == [[0, 1]]
@@ -1,78 +1,167 @@
-def main_parse(filepath):
-    def strip_comments(line):
-        return line.split('//')[0].strip()
-    
-    with open(filepath, 'r') as file:
-        lines = file.readlines()
-        
-    includes = []
-    sections = {}
+import os
+
+# Top-level section keywords and the keyword that closes each of them
+main_keywords = {
+    "MATERIALPALETTE": "ENDMATERIALPALETTE",
+    "DMSPRITEDEF2": "ENDDMSPRITEDEF2",
+    "TRACKDEFINITION": "ENDTRACKDEFINITION",
+    "TRACKINSTANCE": "ENDTRACKINSTANCE",
+    "HIERARCHICALSPRITEDEF": "ENDHIERARCHICALSPRITEDEF",
+    "POLYHEDRONDEFINITION": "ENDPOLYHEDRONDEFINITION",
+    "SIMPLESPRITEDEF": "ENDSIMPLESPRITEDEF",
+    "MATERIALDEFINITION": "ENDMATERIALDEFINITION"
+}
+
+# Line actions, looked up by the first token of a line
+INCLUDE_LINE = 0
+SECTION_START = 1
+SECTION_END = 2
+
+line_actions = {"INCLUDE": INCLUDE_LINE}
+for _keyword, _end_keyword in main_keywords.items():
+    line_actions[_keyword] = SECTION_START
+    line_actions[_end_keyword] = SECTION_END
+
+def path_key(path):
+    # Normalized form used to recognise the same file reached by different INCLUDE spellings
+    return os.path.normcase(os.path.abspath(path))
+
+def include_file_path(directory, include):
+    # WCE files name their includes in upper case while the files on disk are lower case
+    path = os.path.join(directory, include)
+    if not os.path.exists(path):
+        lower_path = os.path.join(directory, include.lower())
+        if os.path.exists(lower_path):
+            return lower_path
+    return path
+
+def section_tag(section_lines):
+    # TAG of a split section, or None when it has none
+    for line in section_lines:
+        if line.startswith("TAG") and '"' in line:
+            return line.split('"')[1]
+    return None
+
+def section_wanted(section, section_lines, kinds=None, tags=None):
+    if kinds is not None and section not in kinds:
+        return False
+    return tags is None or section_tag(section_lines) in tags
+
+def iter_sections(lines, kinds=None, tags=None):
+    """
+    Streams section events out of an iterable of lines (e.g. an open file).
+
+    Yields ("INCLUDE", include_name) for every INCLUDE line and
+    (section_name, section_lines) each time a section is closed, either by its
+    END keyword, by the next section header or by the end of the input.
+
+    With kinds and/or tags, only sections of those kinds and with those TAGs
+    are yielded. The body of a skipped section is fast-forwarded to its END
+    line with a substring check; only lines starting in the first column are
+    tokenized meanwhile, so a header or INCLUDE indented inside a skipped
+    section is not seen.
+
+    :param lines: Iterable of raw text lines.
+    :param kinds: Optional collection of section names to keep.
+    :param tags: Optional collection of TAG names to keep.
+    """
     current_section = None
-    main_keywords = {
-        "MATERIALPALETTE": "ENDMATERIALPALETTE",
-        "DMSPRITEDEF2": "ENDDMSPRITEDEF2",
-        "TRACKDEFINITION": "ENDTRACKDEFINITION",
-        "TRACKINSTANCE": "ENDTRACKINSTANCE",
-        "HIERARCHICALSPRITEDEF": "ENDHIERARCHICALSPRITEDEF",
-        "POLYHEDRONDEFINITION": "ENDPOLYHEDRONDEFINITION",
-        "SIMPLESPRITEDEF": "ENDSIMPLESPRITEDEF",
-        "MATERIALDEFINITION": "ENDMATERIALDEFINITION"  # Add MATERIALDEFINITION section
-    }
+    current_lines = None
+    end_keyword = None
+    skip_until = None  # END keyword of the section being skipped
+    tag_pending = False  # Section kept so far, but its TAG is not known yet
+
+    if tags is not None:
+        tags = set(tags)
 
     for line in lines:
-        line = strip_comments(line)
+        if skip_until is not None and skip_until not in line and line[:1].isspace():
+            continue
+
+        if '//' in line:
+            line = line[:line.index('//')]
+        line = line.strip()
         if not line:
             continue
-        
-        if line.startswith("INCLUDE"):
-            include = line.split('"')[1]
-            includes.append(include)
-        elif line.startswith("MATERIALPALETTE") and '"' not in line:
-            if current_section == "DMSPRITEDEF2":
+
+        token = line.split(None, 1)[0]
+        action = line_actions.get(token)
+
+        if action is None:
+            if current_lines is not None:
+                if tag_pending and token == "TAG" and '"' in line:
+                    tag_pending = False
+                    if line.split('"')[1] not in tags:
+                        current_lines = None
+                        skip_until = end_keyword
+                        continue
+                current_lines.append(line)
+        elif action == INCLUDE_LINE:
+            yield "INCLUDE", line.split('"')[1]
+        elif action == SECTION_START:
+            # A quoted MATERIALPALETTE is the palette reference inside a DMSPRITEDEF2
+            if token == "MATERIALPALETTE" and '"' in line:
+                if current_lines is not None:
+                    current_lines.append(line)
+                continue
+            if current_lines is not None and not tag_pending:
+                yield current_section, current_lines
+            if token == "MATERIALPALETTE" and current_section == "DMSPRITEDEF2":
                 current_section = "DMSPRITEDEF2_MATERIALPALETTE"
+                end_keyword = main_keywords["DMSPRITEDEF2"]
+            else:
+                current_section = token
+                end_keyword = main_keywords[token]
+            if kinds is not None and current_section not in kinds:
+                current_lines = None
+                skip_until = end_keyword
             else:
-                current_section = "MATERIALPALETTE"
-            if current_section not in sections:
-                sections[current_section] = []
-            sections[current_section].append([])
-        elif line.startswith("DMSPRITEDEF2"):
-            current_section = "DMSPRITEDEF2"
-            if current_section not in sections:
-                sections[current_section] = []
-            sections[current_section].append([])
-        elif line.startswith("TRACKDEFINITION"):
-            current_section = "TRACKDEFINITION"
-            if current_section not in sections:
-                sections[current_section] = []
-            sections[current_section].append([])
-        elif line.startswith("TRACKINSTANCE"):
-            current_section = "TRACKINSTANCE"
-            if current_section not in sections:
-                sections[current_section] = []
-            sections[current_section].append([])
-        elif line.startswith("HIERARCHICALSPRITEDEF"):
-            current_section = "HIERARCHICALSPRITEDEF"
-            if current_section not in sections:
-                sections[current_section] = []
-            sections[current_section].append([])
-        elif line.startswith("POLYHEDRONDEFINITION"):
-            current_section = "POLYHEDRONDEFINITION"
-            if current_section not in sections:
-                sections[current_section] = []
-            sections[current_section].append([])
-        elif line.startswith("SIMPLESPRITEDEF"):
-            current_section = "SIMPLESPRITEDEF"
-            if current_section not in sections:
-                sections[current_section] = []
-            sections[current_section].append([])
-        elif line.startswith("MATERIALDEFINITION"):  # Handle MATERIALDEFINITION
-            current_section = "MATERIALDEFINITION"
-            if current_section not in sections:
-                sections[current_section] = []
-            sections[current_section].append([])
-        elif current_section and line.startswith(main_keywords.get(current_section.split('_')[0], '')):
+                current_lines = []
+                skip_until = None
+            tag_pending = tags is not None and current_lines is not None
+        elif token == end_keyword:
+            if current_lines is not None and not tag_pending:
+                yield current_section, current_lines
             current_section = None
-        elif current_section:
-            sections[current_section][-1].append(line)
-        
+            current_lines = None
+            end_keyword = None
+            skip_until = None
+            tag_pending = False
+        elif current_lines is not None:
+            current_lines.append(line)
+
+    if current_lines is not None and not tag_pending:
+        yield current_section, current_lines
+
+def split_file(filepath, kinds=None, tags=None):
+    """
+    Returns the ordered (section_name, section_lines) list of one file and
+    its INCLUDE names. Used by worker processes, so it only needs this module.
+    kinds and tags filter the sections as in iter_sections.
+    """
+    includes = []
+    sections = []
+
+    with open(filepath, 'r') as file:
+        for section, data in iter_sections(file, kinds, tags):
+            if section == "INCLUDE":
+                includes.append(data)
+            else:
+                sections.append((section, data))
+
+    return sections, includes
+
+def main_parse(filepath):
+    includes = []
+    sections = {}
+
+    with open(filepath, 'r') as file:
+        for section, data in iter_sections(file):
+            if section == "INCLUDE":
+                includes.append(data)
+            elif section in sections:
+                sections[section].append(data)
+            else:
+                sections[section] = [data]
+
     return sections, includes
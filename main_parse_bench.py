@@ -0,0 +1,183 @@
+import os
+import sys
+import tempfile
+import time
+
+from main_parse import main_parse
+
+# The readlines/elif splitter main_parse replaced, kept as the benchmark reference
+def legacy_main_parse(filepath):
+    def strip_comments(line):
+        return line.split('//')[0].strip()
+    
+    with open(filepath, 'r') as file:
+        lines = file.readlines()
+        
+    includes = []
+    sections = {}
+    current_section = None
+    main_keywords = {
+        "MATERIALPALETTE": "ENDMATERIALPALETTE",
+        "DMSPRITEDEF2": "ENDDMSPRITEDEF2",
+        "TRACKDEFINITION": "ENDTRACKDEFINITION",
+        "TRACKINSTANCE": "ENDTRACKINSTANCE",
+        "HIERARCHICALSPRITEDEF": "ENDHIERARCHICALSPRITEDEF",
+        "POLYHEDRONDEFINITION": "ENDPOLYHEDRONDEFINITION",
+        "SIMPLESPRITEDEF": "ENDSIMPLESPRITEDEF",
+        "MATERIALDEFINITION": "ENDMATERIALDEFINITION"  # Add MATERIALDEFINITION section
+    }
+
+    for line in lines:
+        line = strip_comments(line)
+        if not line:
+            continue
+        
+        if line.startswith("INCLUDE"):
+            include = line.split('"')[1]
+            includes.append(include)
+        elif line.startswith("MATERIALPALETTE") and '"' not in line:
+            if current_section == "DMSPRITEDEF2":
+                current_section = "DMSPRITEDEF2_MATERIALPALETTE"
+            else:
+                current_section = "MATERIALPALETTE"
+            if current_section not in sections:
+                sections[current_section] = []
+            sections[current_section].append([])
+        elif line.startswith("DMSPRITEDEF2"):
+            current_section = "DMSPRITEDEF2"
+            if current_section not in sections:
+                sections[current_section] = []
+            sections[current_section].append([])
+        elif line.startswith("TRACKDEFINITION"):
+            current_section = "TRACKDEFINITION"
+            if current_section not in sections:
+                sections[current_section] = []
+            sections[current_section].append([])
+        elif line.startswith("TRACKINSTANCE"):
+            current_section = "TRACKINSTANCE"
+            if current_section not in sections:
+                sections[current_section] = []
+            sections[current_section].append([])
+        elif line.startswith("HIERARCHICALSPRITEDEF"):
+            current_section = "HIERARCHICALSPRITEDEF"
+            if current_section not in sections:
+                sections[current_section] = []
+            sections[current_section].append([])
+        elif line.startswith("POLYHEDRONDEFINITION"):
+            current_section = "POLYHEDRONDEFINITION"
+            if current_section not in sections:
+                sections[current_section] = []
+            sections[current_section].append([])
+        elif line.startswith("SIMPLESPRITEDEF"):
+            current_section = "SIMPLESPRITEDEF"
+            if current_section not in sections:
+                sections[current_section] = []
+            sections[current_section].append([])
+        elif line.startswith("MATERIALDEFINITION"):  # Handle MATERIALDEFINITION
+            current_section = "MATERIALDEFINITION"
+            if current_section not in sections:
+                sections[current_section] = []
+            sections[current_section].append([])
+        elif current_section and line.startswith(main_keywords.get(current_section.split('_')[0], '')):
+            current_section = None
+        elif current_section:
+            sections[current_section][-1].append(line)
+        
+    return sections, includes
+
+# A small character-style block set, repeated to build a synthetic input file
+sample_blocks = '''INCLUDE "ELFCH0001.INC"
+// synthetic main_parse benchmark input
+MATERIALPALETTE
+	TAG "ELF_MP"
+	NUMMATERIALS 1
+	MATERIAL "ELFCH0001_MDF"
+ENDMATERIALPALETTE
+
+DMSPRITEDEF2
+	TAG "ELF_DMSPRITEDEF"
+	CENTEROFFSET 0.00000000e+00 0.00000000e+00 0.00000000e+00
+	NUMVERTICES 3
+	XYZ 1.00000000e+00 2.00000000e+00 3.00000000e+00
+	XYZ 4.00000000e+00 5.00000000e+00 6.00000000e+00
+	XYZ 7.00000000e+00 8.00000000e+00 9.00000000e+00
+	NUMUVS 3
+	UV 0.00000000e+00 0.00000000e+00
+	UV 1.00000000e+00 0.00000000e+00
+	UV 1.00000000e+00 1.00000000e+00
+	MATERIALPALETTE "ELF_MP"
+	NUMFACE2S 1
+	DMFACE2 //0
+		PASSABLE 0
+		TRIANGLE 0, 1, 2
+	ENDDMFACE2 //0
+	FACEMATERIALGROUPS 1 1 0
+ENDDMSPRITEDEF2
+
+TRACKDEFINITION
+	TAG "C01ELFHE_TRACKDEF"
+	NUMFRAMES 2
+	FRAMETRANSFORM
+		XYZSCALE 256
+		XYZ 0 0 0
+		ROTSCALE? 16384
+		ROTABC? 0 0 0
+	ENDFRAMETRANSFORM
+	FRAMETRANSFORM
+		XYZSCALE 256
+		XYZ 10 0 -3
+		ROTSCALE? 16384
+		ROTABC? 120 -40 0
+	ENDFRAMETRANSFORM
+ENDTRACKDEFINITION
+
+TRACKINSTANCE
+	TAG "C01ELFHE_TRACK"
+	DEFINITION "C01ELFHE_TRACKDEF"
+	INTERPOLATE 0
+	SLEEP? 100
+ENDTRACKINSTANCE
+
+'''
+
+def write_sample_file(path, target_bytes):
+    block_bytes = len(sample_blocks.encode())
+    with open(path, 'w') as file:
+        for _ in range(max(1, target_bytes // block_bytes)):
+            file.write(sample_blocks)
+
+def time_parse(parse_function, filepath, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parse_function(filepath)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+def run_benchmark(filepath, repeat=3):
+    size_mb = os.path.getsize(filepath) / (1024 * 1024)
+
+    legacy_time, legacy_result = time_parse(legacy_main_parse, filepath, repeat)
+    new_time, new_result = time_parse(main_parse, filepath, repeat)
+
+    if legacy_result != new_result:
+        raise Exception("main_parse output differs from the legacy splitter")
+
+    print(f"Input: {filepath} ({size_mb:.1f} MB)")
+    print(f"legacy main_parse: {size_mb / legacy_time:8.1f} MB/s ({legacy_time:.3f}s)")
+    print(f"main_parse:        {size_mb / new_time:8.1f} MB/s ({new_time:.3f}s)")
+    print(f"Speedup: {legacy_time / new_time:.2f}x")
+
+if __name__ == '__main__':
+    # Usage: python main_parse_bench.py [file.mod|file.wce] [repeat]
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    if len(sys.argv) > 1:
+        run_benchmark(sys.argv[1], repeat)
+    else:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sample_path = os.path.join(temp_dir, "sample.mod")
+            write_sample_file(sample_path, 32 * 1024 * 1024)
+            run_benchmark(sample_path, repeat)
@@ -0,0 +1,48 @@
+from main_parse import iter_sections, main_parse, section_wanted
+from main_parse_bench import legacy_main_parse, sample_blocks
+
+def test_main_parse_matches_legacy(tmp_path):
+    path = tmp_path / "sample.mod"
+    path.write_text(sample_blocks * 3)
+
+    sections, includes = main_parse(str(path))
+
+    assert (sections, includes) == legacy_main_parse(str(path))
+    assert includes == ["ELFCH0001.INC"] * 3
+    assert len(sections["DMSPRITEDEF2"]) == 3
+    assert sections["MATERIALPALETTE"][0] == ['TAG "ELF_MP"', 'NUMMATERIALS 1', 'MATERIAL "ELFCH0001_MDF"']
+
+def test_iter_sections_order():
+    lines = [
+        'DMSPRITEDEF2',
+        '\tTAG "A" // comment',
+        '\tMATERIALPALETTE "A_MP"',
+        'ENDDMSPRITEDEF2',
+        'INCLUDE "B.INC"',
+        'TRACKINSTANCE',
+        '\tTAG "A_TRACK"',
+        'TRACKINSTANCE',
+        '\tTAG "B_TRACK"',
+    ]
+
+    events = list(iter_sections(lines))
+
+    assert events == [
+        ("DMSPRITEDEF2", ['TAG "A"', 'MATERIALPALETTE "A_MP"']),
+        ("INCLUDE", "B.INC"),
+        ("TRACKINSTANCE", ['TAG "A_TRACK"']),
+        ("TRACKINSTANCE", ['TAG "B_TRACK"']),
+    ]
+
+def test_iter_sections_filters_match_full_split():
+    lines = (sample_blocks * 2).replace('C01ELFHE', 'C02ELFHE', 1).splitlines()
+    full = list(iter_sections(lines))
+
+    for kinds, tags in [({"DMSPRITEDEF2"}, None), ({"TRACKINSTANCE"}, None), (None, ["C02ELFHE_TRACKDEF", "ELF_MP"]), ({"TRACKDEFINITION"}, {"C01ELFHE_TRACKDEF"})]:
+        expected = [event for event in full if event[0] == "INCLUDE" or section_wanted(event[0], event[1], kinds, tags)]
+        assert list(iter_sections(lines, kinds, tags)) == expected
+
+    meshes = list(iter_sections(lines, kinds={"DMSPRITEDEF2"}))
+    assert [section for section, _ in meshes] == ["INCLUDE", "DMSPRITEDEF2", "INCLUDE", "DMSPRITEDEF2"]
+    tracks = list(iter_sections(lines, tags=["C02ELFHE_TRACKDEF"]))
+    assert [section for section, _ in tracks if section != "INCLUDE"] == ["TRACKDEFINITION"]
@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus_generator import write_mod_corpus
+from dmspritedef2_parse import dmspritedef2_parse
+from main_parse import main_parse
+from mesh_builder import build_mesh, pydata_mesh
+
+# Times create_mesh's geometry setup the old way (from_pydata and per-loop UV /
+# per-polygon material assignment) against mesh_builder.build_mesh. Needs
+# Blender, run it in background mode:
+#
+#   blender --background --factory-startup --python mesh_build_benchmark.py -- --vertices 50000
+
+def legacy_mesh(mesh_data):
+    return pydata_mesh(mesh_data['name'], mesh_data['vertices'], mesh_data['faces'], mesh_data['uvs'], mesh_data['normals'],
+        mesh_data['face_material_indices'].tolist())
+
+def bulk_mesh(mesh_data):
+    return build_mesh(mesh_data['name'], mesh_data['vertices'], mesh_data['faces'], mesh_data['uvs'], mesh_data['normals'],
+        mesh_data['face_material_indices'])
+
+def measure(build, mesh_data, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        mesh = build(mesh_data)
+        elapsed = time.perf_counter() - start
+        bpy.data.meshes.remove(mesh)
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark mesh creation in Blender.")
+    parser.add_argument("--vertices", type=int, default=50000)
+    parser.add_argument("--materials", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = write_mod_corpus(directory, meshes=1, vertices=args.vertices, tracks=0, materials=args.materials, includes=0)
+        lines = main_parse(root)[0]['DMSPRITEDEF2'][0]
+    lists = dmspritedef2_parse(lines)[0]
+    arrays = dmspritedef2_parse(lines, arrays=True)[0]
+
+    print(f"{args.vertices} vertices, {len(lists['faces'])} faces, Blender {bpy.app.version_string}")
+    before = measure(legacy_mesh, lists, args.repeat)
+    after = measure(bulk_mesh, arrays, args.repeat)
+    print(f"from_pydata + loops  {before:8.3f}s")
+    print(f"build_mesh           {after:8.3f}s  ({before / after:.1f}x)")
+
+if __name__ == '__main__':
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
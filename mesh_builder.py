@@ -0,0 +1,73 @@
+import bpy
+import numpy as np
+
+def build_mesh(name, vertices, faces, uvs=None, normals=None, material_indices=None, uv_name=None):
+    """
+    Creates a triangle mesh from flat arrays, filling vertices, loops, polygons,
+    UVs, material indices and custom normals with foreach_set instead of
+    from_pydata and per-loop Python assignments.
+
+    :param vertices: (V, 3) vertex positions.
+    :param faces: (F, 3) vertex indices, one triangle per row.
+    :param uvs: Optional (V, 2) per-vertex UVs, stored per loop as (u, v - 1).
+    :param normals: Optional (V, 3) custom normals, used when there is one per vertex.
+    :param material_indices: Optional (F,) material slot of every face.
+    :param uv_name: UV layer name, name + "_uv" by default.
+    """
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    faces = np.asarray(faces, dtype=np.int32).reshape(-1, 3)
+    loop_vertices = faces.ravel()
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", vertices.ravel())
+    mesh.loops.add(len(loop_vertices))
+    mesh.loops.foreach_set("vertex_index", loop_vertices)
+    mesh.polygons.add(len(faces))
+    mesh.polygons.foreach_set("loop_start", np.arange(0, len(loop_vertices), 3, dtype=np.int32))
+    # Blender 4 derives loop_total from loop_start and no longer lets it be set
+    if not mesh.polygons.bl_rna.properties['loop_total'].is_readonly:
+        mesh.polygons.foreach_set("loop_total", np.full(len(faces), 3, dtype=np.int32))
+    if material_indices is not None:
+        mesh.polygons.foreach_set("material_index", np.asarray(material_indices, dtype=np.int32))
+    mesh.update(calc_edges=True)
+
+    if uvs is not None and len(uvs):
+        loop_uvs = np.asarray(uvs, dtype=np.float32).reshape(-1, 2)[loop_vertices]
+        loop_uvs[:, 1] -= 1
+        uv_layer = mesh.uv_layers.new(name=uv_name or name + "_uv")
+        uv_layer.data.foreach_set("uv", loop_uvs.ravel())
+
+    if normals is not None and len(normals) == len(vertices):
+        if hasattr(mesh, "use_auto_smooth"):
+            # Custom normals need auto smooth before Blender 4.1, which removed the property
+            mesh.use_auto_smooth = True
+        mesh.normals_split_custom_set_from_vertices(np.asarray(normals, dtype=np.float32).reshape(-1, 3))
+
+    return mesh
+
+def pydata_mesh(name, vertices, faces, uvs=None, normals=None, material_indices=None, uv_name=None):
+    """
+    build_mesh the way create_mesh used to do it: from_pydata, then a Python
+    assignment per UV loop and per polygon material. Kept as the reference
+    build_mesh is checked and timed against (see mesh_build_benchmark.py).
+    """
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(vertices, [], [face[:3] for face in faces])
+    mesh.update()
+
+    if uvs is not None and len(uvs):
+        uv_layer = mesh.uv_layers.new(name=uv_name or name + "_uv")
+        for triangle in mesh.polygons:
+            for j, vertex in enumerate(triangle.vertices):
+                uv_layer.data[triangle.loop_indices[j]].uv = (uvs[vertex][0], uvs[vertex][1] - 1)
+
+    if normals is not None and len(normals) == len(vertices):
+        if hasattr(mesh, "use_auto_smooth"):
+            mesh.use_auto_smooth = True
+        mesh.normals_split_custom_set_from_vertices(normals)
+
+    if material_indices is not None:
+        for face_index, material_index in enumerate(material_indices):
+            mesh.polygons[face_index].material_index = int(material_index)
+    return mesh
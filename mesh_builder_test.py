@@ -0,0 +1,142 @@
+import importlib, sys
+
+import numpy as np
+import pytest
+
+from types import SimpleNamespace
+
+from corpus_generator import write_mod_corpus
+from dmspritedef2_parse import dmspritedef2_parse
+from main_parse import main_parse
+
+class elements(list):
+    # Just enough of a bpy_prop_collection for mesh_builder: add, foreach_set and item access
+    def __init__(self, make, readonly=()):
+        self.make = make
+        self.readonly = set(readonly)
+        self.calls = []
+        self.bl_rna = SimpleNamespace(properties={'loop_total': SimpleNamespace(is_readonly='loop_total' in self.readonly)})
+
+    def add(self, count):
+        self.extend(self.make(len(self) + number) for number in range(count))
+
+    def foreach_set(self, name, data):
+        if name in self.readonly:
+            raise AttributeError(name)
+        data = np.asarray(data)
+        self.calls.append((name, data.copy()))
+        rows = data.reshape(len(self), -1)
+        for item, row in zip(self, rows):
+            setattr(item, name, tuple(row.tolist()) if len(row) > 1 else row[0].item())
+
+class polygon(SimpleNamespace):
+    # Loops are derived from loop_start like Blender 4 does
+    def __init__(self, mesh, index):
+        super().__init__(mesh=mesh, index=index, loop_start=0, material_index=0)
+
+    @property
+    def loop_indices(self):
+        polygons = self.mesh.polygons
+        end = polygons[self.index + 1].loop_start if self.index + 1 < len(polygons) else len(self.mesh.loops)
+        return range(self.loop_start, end)
+
+    @property
+    def vertices(self):
+        return [self.mesh.loops[loop].vertex_index for loop in self.loop_indices]
+
+class mesh_standin:
+    def __init__(self, name, loop_total_readonly=True):
+        self.name = name
+        self.vertices = elements(lambda index: SimpleNamespace(co=(0.0, 0.0, 0.0)))
+        self.loops = elements(lambda index: SimpleNamespace(vertex_index=0))
+        self.polygons = elements(lambda index: polygon(self, index), ['loop_total'] if loop_total_readonly else [])
+        self.uv_layers = SimpleNamespace(new=self.new_uv_layer)
+        self.layers = {}
+        self.custom_normals = None
+
+    def new_uv_layer(self, name):
+        layer = SimpleNamespace(data=elements(lambda index: SimpleNamespace(uv=(0.0, 0.0))))
+        layer.data.add(len(self.loops))
+        self.layers[name] = layer
+        return layer
+
+    def from_pydata(self, vertices, edges, faces):
+        self.vertices.add(len(vertices))
+        for vertex, co in zip(self.vertices, vertices):
+            vertex.co = tuple(float(value) for value in co)
+        for face in faces:
+            self.polygons.add(1)
+            self.polygons[-1].loop_start = len(self.loops)
+            self.loops.add(len(face))
+            for loop, vertex in zip(self.loops[-len(face):], face):
+                loop.vertex_index = int(vertex)
+
+    def update(self, calc_edges=False):
+        pass
+
+    def normals_split_custom_set_from_vertices(self, normals):
+        self.custom_normals = np.asarray(normals, dtype=np.float32).reshape(-1, 3)
+
+class pre_4_1_mesh_standin(mesh_standin):
+    # Before Blender 4.1, custom normals also needed auto smooth
+    use_auto_smooth = False
+
+@pytest.fixture
+def mesh_builder(monkeypatch):
+    meshes = SimpleNamespace(new=lambda name: meshes.make(name), make=mesh_standin)
+    monkeypatch.setitem(sys.modules, "bpy", SimpleNamespace(data=SimpleNamespace(meshes=meshes)))
+    monkeypatch.delitem(sys.modules, "mesh_builder", raising=False)
+    yield importlib.import_module("mesh_builder")
+    sys.modules.pop("mesh_builder", None)
+
+def built(mesh):
+    return {
+        'co': [vertex.co for vertex in mesh.vertices],
+        'vertex_index': [loop.vertex_index for loop in mesh.loops],
+        'loop_start': [polygon.loop_start for polygon in mesh.polygons],
+        'material_index': [polygon.material_index for polygon in mesh.polygons],
+        'uv': {name: [loop.uv for loop in layer.data] for name, layer in mesh.layers.items()},
+        'normals': mesh.custom_normals.tolist(),
+    }
+
+def test_build_mesh_matches_from_pydata(mesh_builder, tmp_path):
+    root = write_mod_corpus(str(tmp_path), meshes=1, vertices=30, tracks=0, materials=3, includes=0)
+    lines = main_parse(root)[0]['DMSPRITEDEF2'][0]
+    lists = dmspritedef2_parse(lines)[0]
+    arrays = dmspritedef2_parse(lines, arrays=True)[0]
+
+    legacy = mesh_builder.pydata_mesh("ELF", lists['vertices'], lists['faces'], lists['uvs'], lists['normals'],
+        arrays['face_material_indices'].tolist())
+    bulk = mesh_builder.build_mesh("ELF", arrays['vertices'], arrays['faces'], arrays['uvs'], arrays['normals'],
+        arrays['face_material_indices'])
+    expected, actual = built(legacy), built(bulk)
+    for name in ('vertex_index', 'loop_start', 'material_index'):
+        assert actual[name] == expected[name]
+    assert np.allclose(actual['co'], expected['co'])
+    assert np.allclose(actual['uv']["ELF_uv"], expected['uv']["ELF_uv"])
+    assert np.allclose(actual['normals'], expected['normals'])
+
+    # Every array goes in with one foreach_set: a loop per face corner, a loop_start every 3 loops
+    faces = len(arrays['faces'])
+    calls = dict(bulk.polygons.calls)
+    assert calls['loop_start'].tolist() == list(range(0, faces * 3, 3))
+    assert 'loop_total' not in calls
+    assert dict(bulk.loops.calls)['vertex_index'].tolist() == arrays['faces'].ravel().tolist()
+    # UVs are gathered per loop from the loop's vertex and flipped to v - 1
+    uv = dict(bulk.layers["ELF_uv"].data.calls)['uv'].reshape(-1, 2)
+    assert np.allclose(uv, arrays['uvs'][arrays['faces'].ravel()] - [0, 1])
+
+def test_loop_total_and_auto_smooth_follow_the_blender_version(mesh_builder):
+    vertices = [(0, 0, 0), (1, 0, 0), (0, 1, 0)]
+    normals = [(0, 0, 1)] * 3
+
+    meshes = sys.modules["bpy"].data.meshes
+    meshes.make = lambda name: mesh_standin(name, loop_total_readonly=False)
+    writable = mesh_builder.build_mesh("OLD", vertices, [(0, 1, 2)], normals=normals)
+    assert dict(writable.polygons.calls)['loop_total'].tolist() == [3]
+    assert not hasattr(writable, "use_auto_smooth")
+
+    meshes.make = pre_4_1_mesh_standin
+    legacy = mesh_builder.build_mesh("OLD", vertices, [(0, 1, 2)], normals=normals)
+    assert legacy.use_auto_smooth is True
+    assert legacy.custom_normals.tolist() == [[0, 0, 1]] * 3
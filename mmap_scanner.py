@@ -0,0 +1,207 @@
+import mmap, os
+from typing import Iterator
+
+from ascii_lexer import scan_words
+
+# Encoding used for the few tokens that are decoded (quoted strings and lines
+# handed to text consumers)
+TEXT_ENCODING = "utf-8"
+
+# Byte values; "int in bytes" is a plain memchr, while "bytes in bytes" is
+# several times slower on short lines
+_DOUBLE_QUOTE = ord('"')
+_SINGLE_QUOTE = ord("'")
+_BACKSLASH = ord("\\")
+_SLASH = ord("/")
+
+# Bytes split into lines at a time by mapped_reader
+CHUNK_SIZE = 1 << 20
+
+def _separated(parts:list[bytes]) -> bool:
+    # True when every quoted part of line.split(b'"') stands alone as a word,
+    # so no quoted text has to be joined with its neighbours
+    last = len(parts) - 1
+    for i in range(0, len(parts), 2):
+        part = parts[i]
+        if i > 0 and part and not part[:1].isspace():
+            return False
+        if i < last and part and not part[-1:].isspace():
+            return False
+        if 0 < i < last and not part:
+            return False
+    return True
+
+def split_record(line:bytes) -> list:
+    """
+    Splits a raw line with shlex quoting rules without decoding it. Bare
+    tokens stay bytes (int() and float() accept them directly) and only
+    quoted tokens are decoded to str. Comments are not stripped.
+    """
+    single_quote = _SINGLE_QUOTE in line
+    backslash = _BACKSLASH in line
+    if _DOUBLE_QUOTE not in line and not single_quote and not backslash:
+        return line.split()
+    parts = line.split(b'"')
+    if len(parts) % 2 and not single_quote and not backslash and _separated(parts):
+        record = []
+        for i, part in enumerate(parts):
+            if i % 2:
+                record.append(part.decode(TEXT_ENCODING))
+            else:
+                record.extend(part.split())
+        return record
+    words = scan_words(line.decode(TEXT_ENCODING))
+    return [word if quoted else word.encode(TEXT_ENCODING) for word, quoted in words]
+
+def iter_lines(buffer, start:int=0, end:int=None) -> Iterator[tuple[int, bytes]]:
+    """
+    Yields (offset, line) for every line of a bytes object or mmap between
+    start and end, without the line terminator. An mmap is read with its own
+    readline(), which moves its file position.
+    """
+    if end is None:
+        end = len(buffer)
+    position = start
+    if isinstance(buffer, mmap.mmap):
+        buffer.seek(start)
+        readline = buffer.readline
+        while position < end:
+            line = readline()
+            next_position = position + len(line)
+            if next_position > end:
+                line = line[:end - position]
+                next_position = end
+            yield position, line.rstrip(b"\r\n")
+            position = next_position
+        return
+    while position < end:
+        line_end = buffer.find(b"\n", position, end)
+        if line_end < 0:
+            line_end = end
+        yield position, buffer[position:line_end].rstrip(b"\r")
+        position = line_end + 1
+
+class mapped_reader:
+    """
+    Read-only memory map of a WCE/MOD file. Iterating it yields one decoded
+    line at a time (without the newline), so it can stand in for a text
+    reader while the file itself stays in the page cache. records() gives the
+    bytes-level tokens of the remaining lines instead. Lines are split out of
+    the map CHUNK_SIZE bytes at a time, so only one chunk is ever copied.
+    """
+    path:str
+    buffer:object
+    line_number:int
+
+    def __init__(self, path:str, start:int=0, end:int=None):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.buffer = b""
+        self.end = size if end is None else min(end, size)
+        self.line_number = 0
+        self._position = start
+        self._pending = []
+        self._next = 0
+        self._chunk_line_number = 0
+        self._chunk_has_comments = False
+        self._chunk_has_escapes = False
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.buffer = b""
+        self._pending = []
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _fill(self) -> bool:
+        # Splits the next chunk of whole lines out of the map
+        if self._position >= self.end:
+            return False
+        chunk_end = min(self._position + CHUNK_SIZE, self.end)
+        chunk = self.buffer[self._position:chunk_end]
+        if chunk_end < self.end:
+            cut = chunk.rfind(b"\n")
+            if cut < 0:
+                # A single line longer than the chunk
+                cut = self.buffer.find(b"\n", chunk_end, self.end)
+                if cut < 0:
+                    cut = self.end
+                chunk = self.buffer[self._position:cut]
+                self._position = cut + 1
+            else:
+                chunk = chunk[:cut]
+                self._position += cut + 1
+        else:
+            self._position = chunk_end
+            if chunk.endswith(b"\n"):
+                chunk = chunk[:-1]
+        self._chunk_line_number += len(self._pending)
+        # Checked once per chunk so clean chunks skip the per-line tests
+        self._chunk_has_comments = b"//" in chunk
+        self._chunk_has_escapes = _SINGLE_QUOTE in chunk or _BACKSLASH in chunk
+        self._pending = chunk.split(b"\n")
+        self._next = 0
+        return True
+
+    def read_line(self) -> bytes:
+        """
+        Returns the next raw line, or None at the end of the mapped range.
+        """
+        if self._next >= len(self._pending) and not self._fill():
+            return None
+        line = self._pending[self._next]
+        self._next += 1
+        self.line_number = self._chunk_line_number + self._next
+        return line.rstrip(b"\r")
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        line = self.read_line()
+        if line is None:
+            raise StopIteration
+        return line.decode(TEXT_ENCODING)
+
+    def records(self) -> Iterator[tuple[int, list]]:
+        """
+        Yields (line_number, tokens) for every remaining non-empty line, with
+        // comments removed. See split_record for the token types.
+        """
+        while self._next < len(self._pending) or self._fill():
+            pending = self._pending
+            index = self._next
+            count = len(pending)
+            comments = self._chunk_has_comments
+            escapes = self._chunk_has_escapes
+            while index < count:
+                line = pending[index]
+                index += 1
+                if comments and b"//" in line:
+                    line = line[:line.index(b"//")]
+                if escapes or _DOUBLE_QUOTE in line:
+                    record = split_record(line.rstrip(b"\r"))
+                else:
+                    record = line.split()
+                if not record:
+                    continue
+                self._next = index
+                self.line_number = self._chunk_line_number + index
+                yield self.line_number, record
+                # The caller may have read lines through this reader meanwhile
+                if self._pending is not pending:
+                    break
+                index = self._next
+            else:
+                self._next = count
+                self.line_number = self._chunk_line_number + count
@@ -0,0 +1,57 @@
+import mmap_scanner
+from mmap_scanner import iter_lines, mapped_reader, split_record
+
+sample = (
+    'TRACKDEFINITION "ELF_TRACKDEF" // comment\r\n'
+    '\tTAGINDEX 0\n'
+    '\n'
+    '\tSPRITE ""\n'
+    '\t\tFRAME 256 1 2 3 -16384 4 5 6\n'
+    '\tFRAME "a b" "c"d\n'
+    "\tNAME 'single quoted'\n"
+    '\tNUMLEGACYFRAMES 0'
+)
+
+def test_split_record_decodes_only_quoted_tokens():
+    assert split_record(b'FRAME 256 1 -2') == [b"FRAME", b"256", b"1", b"-2"]
+    assert split_record(b'TAG "ELF_TRACK"') == [b"TAG", "ELF_TRACK"]
+    assert split_record(b'SPRITE ""') == [b"SPRITE", ""]
+    assert split_record(b'FRAME "a b""c" d') == [b"FRAME", "a bc", b"d"]
+
+def test_records_across_chunks(tmp_path, monkeypatch):
+    path = tmp_path / "sample.wce"
+    path.write_bytes(sample.encode())
+    monkeypatch.setattr(mmap_scanner, "CHUNK_SIZE", 16)
+
+    with mapped_reader(str(path)) as r:
+        records = list(r.records())
+
+    assert records == [
+        (1, [b"TRACKDEFINITION", "ELF_TRACKDEF"]),
+        (2, [b"TAGINDEX", b"0"]),
+        (4, [b"SPRITE", ""]),
+        (5, [b"FRAME", b"256", b"1", b"2", b"3", b"-16384", b"4", b"5", b"6"]),
+        (6, [b"FRAME", "a b", "cd"]),
+        (7, [b"NAME", "single quoted"]),
+        (8, [b"NUMLEGACYFRAMES", b"0"]),
+    ]
+
+def test_text_lines_and_records_share_position(tmp_path, monkeypatch):
+    path = tmp_path / "sample.wce"
+    path.write_bytes(sample.encode())
+    monkeypatch.setattr(mmap_scanner, "CHUNK_SIZE", 16)
+
+    with mapped_reader(str(path)) as r:
+        records = r.records()
+        assert next(records)[1][0] == b"TRACKDEFINITION"
+        assert next(r) == "\tTAGINDEX 0"
+        assert next(records) == (4, [b"SPRITE", ""])
+        assert list(r)[-1] == "\tNUMLEGACYFRAMES 0"
+
+def test_iter_lines_offsets(tmp_path):
+    path = tmp_path / "sample.wce"
+    path.write_bytes(b"A 1\r\nB 2\nC 3")
+
+    with mapped_reader(str(path)) as r:
+        assert list(iter_lines(r.buffer)) == [(0, b"A 1"), (5, b"B 2"), (9, b"C 3")]
+        assert list(iter_lines(r.buffer, 5, 9)) == [(5, b"B 2")]
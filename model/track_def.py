@@ -1,5 +1,6 @@
 import io
 from ascii_parse import parse_property
+from tag_index import find_definition, open_definition
 
 # TRACKDEFINITION "ELF_TRACKDEF"
 # 	TAGINDEX 0
@@ -54,5 +55,9 @@ class track_def:
             frame.rot = (int(records[5]), int(records[6]), int(records[7]), int(records[8]))
             self.legacy_frames.append(frame)
 
-
-
+def load_track_def(index:dict, tag:str) -> track_def:
+    """
+    Reads one TRACKDEFINITION located through a tag_index, seeking straight to it.
+    """
+    with open_definition(find_definition(index, tag, "TRACKDEFINITION")) as r:
+        return track_def(tag, r)
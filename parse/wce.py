@@ -1,7 +1,8 @@
 from model.track_def import *
 from model.track import *
 from model.world_def import *
-import shlex
+from ascii_lexer import split_line
+from mmap_scanner import mapped_reader
 import os
 
 class wce:
@@ -19,7 +20,7 @@ class wce:
 
         for line in r:
             line = line.strip()
-            records = shlex.split(line)
+            records = split_line(line)
             if len(records) == 0:
                 continue
 
@@ -29,10 +30,9 @@ class wce:
                 if len(records) != 2:
                     raise Exception(f"INCLUDE: expected 1 argument, got {len(records)-1}")
                 new_path = f"{current_dir}/{records[1].lower()}"
-                file_reader = open(new_path, "r")
-                data = file_reader.read()
-                r = io.StringIO(data)
-                self.parse_definitions(new_path, r)
+                with mapped_reader(new_path) as include_reader:
+                    self.parse_definitions(new_path, include_reader)
+                continue
 
 
             # if line.startswith("3DSPRITEDEF"):
@@ -162,6 +162,10 @@ class wce:
         return ""
 
 
+    def parse_file(self, path:str):
+        with mapped_reader(path) as r:
+            return self.parse_definitions(path, r)
+
     def method1(self):
         # Method 1 code here
         pass
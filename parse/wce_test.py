@@ -1,6 +1,7 @@
 import time, io
 
 import parse.wce as wce
+from corpus_generator import write_wce_corpus
 
 def test_wce_paunrse():
     e = wce.wce()
@@ -10,3 +11,11 @@ def test_wce_paunrse():
     r = io.StringIO(data)
     e.parse_definitions(path, r)
     print("Done")
+
+def test_wce_parse_generated_corpus(tmp_path):
+    path = write_wce_corpus(str(tmp_path), tracks=6, frames=4, bones=3, includes=2)
+    e = wce.wce()
+    e.parse_file(path)
+    assert len(e.track_defs) == len(e.tracks) == 6 + 3
+    assert e.world.zone == 0
+    assert sorted(len(definition.frames) for definition in e.track_defs) == [1] * 3 + [4] * 6
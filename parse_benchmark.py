@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from corpus_generator import write_mod_corpus, write_wce_corpus
+from dmspritedef2_parse import dmspritedef2_parse
+from hierarchicalspritedef_parse import hierarchicalspritedef_parse
+from main_parse import include_file_path, main_parse, path_key
+import parse.wce as wce
+
+from track_parse import track_parse
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parse_benchmark_baseline.json")
+
+# A benchmark slower than the baseline by more than this fraction is reported as a regression
+DEFAULT_TOLERANCE = 0.10
+
+def main_parse_tree(root):
+    # main_parse over root and every file it includes, merged depth first like the legacy importer did;
+    # each file is read once however often (or cyclically) it is included
+    sections = {}
+    paths = []
+    visited = set()
+
+    def visit(path):
+        visited.add(path_key(path))
+        paths.append(path)
+        file_sections, includes = main_parse(path)
+        for section, instances in file_sections.items():
+            sections.setdefault(section, []).extend(instances)
+        for include in includes:
+            include_path = include_file_path(os.path.dirname(path), include)
+            if path_key(include_path) not in visited:
+                visit(include_path)
+
+    visit(root)
+    return sections, paths
+
+def lines_bytes(instances):
+    return sum(len(line) + 1 for lines in instances for line in lines)
+
+def count_wce(e):
+    return len(e.track_defs) + len(e.tracks) + (1 if e.world is not None else 0)
+
+def parse_wce(root):
+    e = wce.wce()
+    e.parse_file(root)
+    return e
+
+def parse_tracks(sections, base_name):
+    track_parse(sections, base_name)
+    return len(sections.get('TRACKDEFINITION', [])) + len(sections.get('TRACKINSTANCE', []))
+
+def measure(run, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        defs = run()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    # Separate pass, tracemalloc slows allocation heavy code down a lot
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return defs, best, peak
+
+def run_benchmarks(mod_root, wce_root, repeat=3):
+    """
+    Times each parser on the generated corpus. Returns {name: result} where a
+    result holds defs, seconds (best of repeat), defs_per_s, mb_per_s and
+    peak_mb (tracemalloc peak of one extra run).
+    """
+    sections, mod_paths = main_parse_tree(mod_root)
+    wce_directory = os.path.dirname(wce_root)
+    wce_bytes = sum(os.path.getsize(os.path.join(wce_directory, name)) for name in os.listdir(wce_directory) if name.endswith(".wce"))
+    base_name = os.path.splitext(os.path.basename(mod_root))[0].upper()
+
+    cases = {
+        'main_parse': (
+            lambda: sum(len(instances) for instances in main_parse_tree(mod_root)[0].values()),
+            sum(os.path.getsize(path) for path in mod_paths)),
+        'dmspritedef2_parse': (
+            lambda: len([dmspritedef2_parse(lines) for lines in sections.get('DMSPRITEDEF2', [])]),
+            lines_bytes(sections.get('DMSPRITEDEF2', []))),
+        'track_parse': (
+            lambda: parse_tracks(sections, base_name),
+            lines_bytes(sections.get('TRACKDEFINITION', [])) + lines_bytes(sections.get('TRACKINSTANCE', []))),
+        'hierarchicalspritedef_parse': (
+            lambda: len([hierarchicalspritedef_parse(lines) for lines in sections.get('HIERARCHICALSPRITEDEF', [])]),
+            lines_bytes(sections.get('HIERARCHICALSPRITEDEF', []))),
+        'wce.parse_definitions': (
+            lambda: count_wce(parse_wce(wce_root)),
+            wce_bytes),
+    }
+
+    results = {}
+    for name, (run, size) in cases.items():
+        defs, seconds, peak = measure(run, repeat)
+        results[name] = {
+            'defs': defs,
+            'seconds': seconds,
+            'defs_per_s': defs / seconds if seconds else 0.0,
+            'mb_per_s': size / (1024 * 1024) / seconds if seconds else 0.0,
+            'peak_mb': peak / (1024 * 1024)
+        }
+    return results
+
+def print_results(results, baseline=None, tolerance=DEFAULT_TOLERANCE):
+    """
+    Prints one line per benchmark, with the change against baseline when one
+    is given. Returns the names that got slower than tolerance allows.
+    """
+    regressions = []
+    print(f"{'benchmark':<28} {'defs':>7} {'defs/s':>11} {'MB/s':>8} {'peak MB':>8}")
+    for name, result in results.items():
+        line = f"{name:<28} {result['defs']:>7} {result['defs_per_s']:>11.1f} {result['mb_per_s']:>8.2f} {result['peak_mb']:>8.2f}"
+        previous = (baseline or {}).get(name)
+        if previous and 'defs_per_s' in previous and previous['defs_per_s']:
+            ratio = result['defs_per_s'] / previous['defs_per_s']
+            line += f"  {ratio:.2f}x vs baseline"
+            if ratio < 1 - tolerance:
+                line += " (regression)"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+def load_baseline(path):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def save_baseline(path, corpus, results):
+    with open(path, 'w') as file:
+        json.dump({'corpus': corpus, 'results': results}, file, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the EQ ASCII parsers on a generated corpus.")
+    parser.add_argument("--meshes", type=int, default=8)
+    parser.add_argument("--vertices", type=int, default=1000)
+    parser.add_argument("--tracks", type=int, default=400)
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--materials", type=int, default=8)
+    parser.add_argument("--bones", type=int, default=20)
+    parser.add_argument("--includes", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--corpus-dir", help="Write the corpus here and keep it (default: a temporary directory)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    corpus = {
+        'meshes': args.meshes,
+        'vertices': args.vertices,
+        'tracks': args.tracks,
+        'frames': args.frames,
+        'materials': args.materials,
+        'bones': args.bones,
+        'includes': args.includes
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directory = args.corpus_dir or temp_dir
+        os.makedirs(directory, exist_ok=True)
+        mod_root = write_mod_corpus(directory, **corpus)
+        wce_root = write_wce_corpus(directory, tracks=args.tracks, frames=args.frames, bones=args.bones, includes=args.includes)
+        results = run_benchmarks(mod_root, wce_root, args.repeat)
+
+    baseline = load_baseline(args.baseline)
+    if baseline is not None and baseline.get('corpus') != corpus:
+        print(f"Baseline {args.baseline} was recorded on a different corpus, not comparing")
+        baseline = None
+    regressions = print_results(results, baseline and baseline['results'], args.tolerance)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, corpus, results)
+        print(f"Saved baseline to {args.baseline}")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
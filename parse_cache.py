@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+
+from main_parse import split_file
+
+# Bumped whenever the cache layout changes, which drops older entries
+CACHE_VERSION = 2
+
+DEFAULT_SIZE_LIMIT = 1024 * 1024 * 1024  # 1 GB
+
+def default_cache_dir(filepath):
+    # Next to the folder holding the file, e.g. crushbone.quail -> crushbone.quail.cache
+    folder = os.path.dirname(os.path.abspath(filepath))
+    return folder + ".cache"
+
+def file_hash(filepath):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filepath, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class parse_cache:
+    """
+    On-disk cache of per-file results, one pickle per distinct file content
+    and variant. The default variant holds main_parse.split_file results;
+    eq_ascii_wld_parser stores its parsed definitions under its own variants.
+    Entries are keyed by path and variant and validated by size and mtime,
+    falling back to the content hash when only the mtime changed. The least
+    recently used entries are evicted once the cache grows past size_limit.
+    """
+
+    def __init__(self, cache_dir, size_limit=DEFAULT_SIZE_LIMIT):
+        self.cache_dir = cache_dir
+        self.size_limit = size_limit
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(self.index_path, 'r') as file:
+                index = json.load(file)
+            if index.get('version') == CACHE_VERSION:
+                self.entries = index.get('entries', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def entry_path(self, entry):
+        variant = entry.get('variant')
+        return os.path.join(self.cache_dir, entry['hash'] + (f".{variant}" if variant else "") + ".pickle")
+
+    def entry_key(self, filepath, variant=None):
+        key = os.path.normcase(os.path.abspath(filepath))
+        return f"{key}|{variant}" if variant else key
+
+    def lookup(self, filepath, variant=None):
+        """
+        Returns the index entry for filepath if it still matches the file on disk.
+        """
+        entry = self.entries.get(self.entry_key(filepath, variant))
+        if entry is None:
+            return None
+        stat = os.stat(filepath)
+        if stat.st_size != entry['size']:
+            return None
+        if stat.st_mtime_ns != entry['mtime_ns']:
+            # Touched but possibly unchanged
+            if file_hash(filepath) != entry['hash']:
+                return None
+            entry['mtime_ns'] = stat.st_mtime_ns
+        if not os.path.exists(self.entry_path(entry)):
+            return None
+        return entry
+
+    def load(self, filepath, variant=None):
+        """
+        Returns the cached result for filepath, by default its (sections,
+        includes), or None on a miss.
+        """
+        entry = self.lookup(filepath, variant)
+        if entry is None:
+            self.misses += 1
+            return None
+        try:
+            with open(self.entry_path(entry), 'rb') as file:
+                data = file.read()
+            result = pickle.loads(data)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return None
+        entry['last_used'] = time.time()
+        self.hits += 1
+        self.bytes_read += len(data)
+        return result
+
+    def store(self, filepath, result, variant=None):
+        key = self.entry_key(filepath, variant)
+        stat = os.stat(filepath)
+        entry = {
+            'variant': variant,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': file_hash(filepath),
+            'bytes': 0,
+            'last_used': time.time()
+        }
+        path = self.entry_path(entry)
+        if not os.path.exists(path):
+            data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            temp_path = path + ".tmp"
+            with open(temp_path, 'wb') as file:
+                file.write(data)
+            os.replace(temp_path, path)
+            self.bytes_written += len(data)
+        entry['bytes'] = os.path.getsize(path)
+
+        previous = self.entries.get(key)
+        self.entries[key] = entry
+        if previous is not None and self.entry_path(previous) != path:
+            self.remove_unreferenced(previous)
+        self.evict()
+
+    def split_file(self, filepath):
+        """
+        main_parse.split_file through the cache.
+        """
+        result = self.load(filepath)
+        if result is None:
+            result = split_file(filepath)
+            self.store(filepath, result)
+        return result
+
+    def remove_unreferenced(self, entry):
+        # Identical files share one pickle, so only delete it once nothing points at it
+        path = self.entry_path(entry)
+        if any(self.entry_path(other) == path for other in self.entries.values()):
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def total_bytes(self):
+        sizes = {}
+        for entry in self.entries.values():
+            sizes[self.entry_path(entry)] = entry['bytes']
+        return sum(sizes.values())
+
+    def evict(self):
+        total = self.total_bytes()
+        for key, entry in sorted(self.entries.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.size_limit:
+                break
+            del self.entries[key]
+            if not any(self.entry_path(other) == self.entry_path(entry) for other in self.entries.values()):
+                total -= entry['bytes']
+            self.remove_unreferenced(entry)
+            self.evictions += 1
+
+    def save(self):
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, 'w') as file:
+            json.dump({'version': CACHE_VERSION, 'entries': self.entries}, file)
+        os.replace(temp_path, self.index_path)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'total_bytes': self.total_bytes(),
+            'size_limit': self.size_limit
+        }
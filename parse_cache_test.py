@@ -0,0 +1,49 @@
+import os
+
+from main_parse import split_file
+from main_parse_bench import sample_blocks
+from parse_cache import parse_cache
+
+def test_cache_hit_and_invalidation(tmp_path):
+    path = tmp_path / "sample.mod"
+    path.write_text(sample_blocks)
+    cache = parse_cache(str(tmp_path / "cache"))
+
+    assert cache.split_file(str(path)) == split_file(str(path))
+    assert cache.stats()['misses'] == 1
+    cache.save()
+
+    # A fresh instance reads the saved index
+    cache = parse_cache(str(tmp_path / "cache"))
+    assert cache.split_file(str(path)) == split_file(str(path))
+    assert cache.stats()['hits'] == 1
+
+    # Touched but unchanged content is still a hit
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+    assert cache.load(str(path)) is not None
+
+    path.write_text(sample_blocks + 'INCLUDE "EXTRA.INC"\n')
+    assert cache.load(str(path)) is None
+    assert cache.split_file(str(path))[1][-1] == "EXTRA.INC"
+    assert len([name for name in os.listdir(tmp_path / "cache") if name.endswith(".pickle")]) == 1
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"sample{i}.mod"
+        path.write_text(sample_blocks.replace("ELF", f"EL{i}"))
+        paths.append(str(path))
+
+    cache = parse_cache(str(tmp_path / "cache"))
+    cache.split_file(paths[0])
+    entry_bytes = cache.total_bytes()
+    cache.size_limit = entry_bytes * 2
+    cache.split_file(paths[1])
+    cache.load(paths[0])
+    cache.split_file(paths[2])
+
+    assert cache.stats()['evictions'] == 1
+    assert cache.lookup(paths[1]) is None
+    assert cache.lookup(paths[0]) is not None
+    assert cache.lookup(paths[2]) is not None
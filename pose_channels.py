@@ -0,0 +1,24 @@
+import numpy as np
+
+def track_channels(translations, rotations, xyz_scale=256) -> np.ndarray:
+    """
+    Location, rotation and scale keys of every frame of a track, as an
+    (F, 10) array in keyframe_writer.bone_channels column order.
+
+    This is what decomposing Translation @ Rotation @ Scale(xyz_scale / 256)
+    frame by frame gives: the uniform scale does not change the rotation,
+    so the quaternions only need normalizing, with w >= 0 like
+    Matrix.to_quaternion returns them.
+    """
+    translations = np.asarray(translations, dtype=np.float64).reshape(-1, 3)
+    rotations = np.asarray(rotations, dtype=np.float64).reshape(-1, 4)
+    channels = np.empty((len(translations), 10))
+    channels[:, 0:3] = translations
+
+    lengths = np.linalg.norm(rotations, axis=1, keepdims=True)
+    identity = np.tile([1.0, 0.0, 0.0, 0.0], (len(rotations), 1))
+    rotations = np.divide(rotations, lengths, out=identity, where=lengths > 0)
+    channels[:, 3:7] = np.where(rotations[:, :1] < 0, -rotations, rotations)
+
+    channels[:, 7:10] = xyz_scale / 256.0
+    return channels
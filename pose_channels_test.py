@@ -0,0 +1,51 @@
+import numpy as np
+
+from pose_channels import track_channels
+
+def quaternion_matrix(q):
+    w, x, y, z = q
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+        [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+        [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)],
+    ])
+
+def matrix_quaternion(m):
+    # Largest-component extraction from a rotation matrix, w >= 0
+    trace = np.trace(m)
+    candidates = [trace, m[0, 0], m[1, 1], m[2, 2]]
+    largest = int(np.argmax(candidates))
+    if largest == 0:
+        s = np.sqrt(1 + trace) * 2
+        q = [s / 4, (m[2, 1] - m[1, 2]) / s, (m[0, 2] - m[2, 0]) / s, (m[1, 0] - m[0, 1]) / s]
+    elif largest == 1:
+        s = np.sqrt(1 + m[0, 0] - m[1, 1] - m[2, 2]) * 2
+        q = [(m[2, 1] - m[1, 2]) / s, s / 4, (m[0, 1] + m[1, 0]) / s, (m[0, 2] + m[2, 0]) / s]
+    elif largest == 2:
+        s = np.sqrt(1 + m[1, 1] - m[0, 0] - m[2, 2]) * 2
+        q = [(m[0, 2] - m[2, 0]) / s, (m[0, 1] + m[1, 0]) / s, s / 4, (m[1, 2] + m[2, 1]) / s]
+    else:
+        s = np.sqrt(1 + m[2, 2] - m[0, 0] - m[1, 1]) * 2
+        q = [(m[1, 0] - m[0, 1]) / s, (m[0, 2] + m[2, 0]) / s, (m[1, 2] + m[2, 1]) / s, s / 4]
+    q = np.array(q)
+    return -q if q[0] < 0 else q
+
+def test_channels_match_matrix_decomposition():
+    rng = np.random.default_rng(0)
+    translations = rng.uniform(-2, 2, (50, 3))
+    rotations = rng.uniform(-16384, 16384, (50, 4))
+    channels = track_channels(translations, rotations, xyz_scale=512)
+
+    assert channels.shape == (50, 10)
+    for frame, (translation, rotation) in enumerate(zip(translations, rotations)):
+        matrix = np.eye(4)
+        matrix[:3, :3] = quaternion_matrix(rotation / np.linalg.norm(rotation)) * 2.0
+        matrix[:3, 3] = translation
+        assert np.allclose(channels[frame, 0:3], matrix[:3, 3])
+        assert np.allclose(channels[frame, 3:7], matrix_quaternion(matrix[:3, :3] / 2.0))
+        assert channels[frame, 3] >= 0
+    assert (channels[:, 7:10] == 2.0).all()
+
+def test_zero_rotation_is_identity():
+    channels = track_channels([[0, 0, 0]], [[0, 0, 0, 0]])
+    assert channels[0].tolist() == [0, 0, 0, 1, 0, 0, 0, 1, 1, 1]
@@ -0,0 +1,147 @@
+import itertools, math
+
+import numpy as np
+
+# Boxes are ((min x, min y, min z), (max x, max y, max z)) tuples of floats
+
+def _floats(line:str):
+    try:
+        return tuple(float(value) for value in line.split()[1:4])
+    except ValueError:
+        return None
+
+def mesh_bounds(lines:list):
+    """
+    World box of a DMSPRITEDEF2 from its CENTEROFFSET and BOUNDINGBOXMIN/MAX
+    (or BOUNDINGRADIUS) lines, without decoding the vertices. Returns None
+    when the section gives no usable bounds.
+    """
+    offset = (0.0, 0.0, 0.0)
+    for line in lines:
+        if line.startswith("CENTEROFFSET"):
+            offset = _floats(line) or offset
+            break
+        if line.startswith("NUMVERTICES"):
+            break
+
+    # The bounds follow the vertex and face data, so read from the end
+    box_min = box_max = radius = None
+    for line in reversed(lines):
+        if line.startswith("BOUNDINGBOXMIN"):
+            box_min = _floats(line)
+        elif line.startswith("BOUNDINGBOXMAX"):
+            box_max = _floats(line)
+        elif line.startswith("BOUNDINGRADIUS"):
+            radius = _floats(line)
+        elif line.startswith(("ENDDMFACE2", "RGBA", "XYZ", "NUMFACE2S")):
+            break
+
+    if box_min and box_max and len(box_min) == len(box_max) == 3 and box_min != box_max:
+        return (tuple(map(sum, zip(box_min, offset))), tuple(map(sum, zip(box_max, offset))))
+    if radius and radius[0] > 0:
+        return (tuple(value - radius[0] for value in offset), tuple(value + radius[0] for value in offset))
+    return None
+
+def polyhedron_bounds(lines:list):
+    # Box around a POLYHEDRONDEFINITION's XYZ vertices, in its own coordinates (see placed_boxes)
+    rows = [line[3:] for line in lines if line.startswith("XYZ")]
+    if not rows:
+        return None
+    try:
+        vertices = np.array(" ".join(rows).split(), dtype=np.float64).reshape(-1, 3)
+    except ValueError:
+        return None
+    return (tuple(vertices.min(axis=0).tolist()), tuple(vertices.max(axis=0).tolist()))
+
+def mesh_polyhedron(lines:list):
+    """
+    (tag, CENTEROFFSET) of the POLYHEDRONDEFINITION a DMSPRITEDEF2 names in
+    its POLYHEDRON block, or None when it names none.
+    """
+    offset = (0.0, 0.0, 0.0)
+    for number, line in enumerate(lines):
+        if line.startswith("CENTEROFFSET"):
+            offset = _floats(line) or offset
+        elif line == "POLYHEDRON" and number + 1 < len(lines) and lines[number + 1].startswith("DEFINITION"):
+            parts = lines[number + 1].split('"')
+            return (parts[1], offset) if len(parts) > 2 and parts[1] else None
+        elif line.startswith("NUMFACE2S"):
+            break
+    return None
+
+def placed_boxes(entries) -> list:
+    """
+    (key, box) of (key, section, tag, box, polyhedron) entries, polyhedron
+    being mesh_polyhedron of a DMSPRITEDEF2. A POLYHEDRONDEFINITION box is
+    moved by the CENTEROFFSET of the meshes naming its tag, as mesh_bounds
+    moves mesh boxes (the union when they differ); one no mesh names keeps
+    its own coordinates.
+    """
+    entries = list(entries)
+    offsets = {}
+    for _, _, _, _, polyhedron in entries:
+        if polyhedron is not None:
+            offsets.setdefault(polyhedron[0], set()).add(polyhedron[1])
+
+    placed = []
+    for key, section, tag, box, _ in entries:
+        if section == 'POLYHEDRONDEFINITION' and box is not None and tag in offsets:
+            shifts = np.array(list(offsets[tag]))
+            box = (tuple((np.array(box[0]) + shifts.min(axis=0)).tolist()), tuple((np.array(box[1]) + shifts.max(axis=0)).tolist()))
+        placed.append((key, box))
+    return placed
+
+def section_bounds(section:str, lines:list):
+    if section == 'DMSPRITEDEF2':
+        return mesh_bounds(lines)
+    if section == 'POLYHEDRONDEFINITION':
+        return polyhedron_bounds(lines)
+    return None
+
+def boxes_intersect(a, b) -> bool:
+    return all(a[0][axis] <= b[1][axis] and b[0][axis] <= a[1][axis] for axis in range(3))
+
+class spatial_index:
+    """
+    Uniform grid over the boxes of (key, box) entries for region queries.
+    Entries without bounds are returned by every query; boxes spanning more
+    than max_cells cells are kept aside and tested on every query.
+    """
+    entries:list
+    cell_size:float
+
+    def __init__(self, entries, cell_size:float=None, max_cells:int=64):
+        self.entries = list(entries)
+        self.cells = {}
+        self.oversized = []
+        bounded = [index for index, (_, box) in enumerate(self.entries) if box is not None]
+        self.unbounded = [index for index, (_, box) in enumerate(self.entries) if box is None]
+
+        if cell_size is None:
+            # Around the size of a typical box, so most land in a few cells
+            extents = [max(high - low for low, high in zip(*self.entries[index][1])) for index in bounded]
+            cell_size = float(np.median(extents)) if extents else 1.0
+        self.cell_size = cell_size if cell_size > 0 else 1.0
+
+        for index in bounded:
+            ranges = self._cell_ranges(self.entries[index][1])
+            if math.prod(len(axis) for axis in ranges) > max_cells:
+                self.oversized.append(index)
+                continue
+            for cell in itertools.product(*ranges):
+                self.cells.setdefault(cell, []).append(index)
+
+    def _cell_ranges(self, box):
+        return [range(math.floor(low / self.cell_size), math.floor(high / self.cell_size) + 1) for low, high in zip(*box)]
+
+    def query(self, box) -> list:
+        """Keys of the entries whose box intersects box, in entry order."""
+        ranges = self._cell_ranges(box)
+        if math.prod(len(axis) for axis in ranges) > len(self.entries):
+            candidates = set(range(len(self.entries))) - set(self.unbounded)
+        else:
+            candidates = set(self.oversized)
+            for cell in itertools.product(*ranges):
+                candidates.update(self.cells.get(cell, ()))
+        hits = [index for index in candidates if boxes_intersect(self.entries[index][1], box)]
+        return [self.entries[index][0] for index in sorted(hits + self.unbounded)]
@@ -0,0 +1,39 @@
+from corpus_generator import write_mod_corpus
+from main_parse import main_parse
+from spatial_index import mesh_bounds, mesh_polyhedron, placed_boxes, polyhedron_bounds, spatial_index
+
+def test_mesh_bounds_from_header_lines(tmp_path):
+    root = write_mod_corpus(str(tmp_path), meshes=1, vertices=10, tracks=0, includes=0)
+    lines = main_parse(root)[0]['DMSPRITEDEF2'][0]
+    assert mesh_bounds(lines) == ((-10.0, -10.0, -10.0), (10.0, 10.0, 10.0))
+
+    moved = [line.replace("CENTEROFFSET 0.00000000e+00", "CENTEROFFSET 1.00000000e+02") for line in lines]
+    assert mesh_bounds(moved) == ((90.0, -10.0, -10.0), (110.0, 10.0, 10.0))
+
+    radius_only = [line for line in moved if not line.startswith("BOUNDINGBOX")]
+    assert mesh_bounds(radius_only)[0][0] == 100.0 - 17.3205078
+    assert mesh_bounds(["TAG \"EMPTY\"", "NUMVERTICES 0"]) is None
+
+def test_polyhedron_bounds():
+    assert polyhedron_bounds(["NUMVERTICES 2", "XYZ -1 2 3", "XYZ 4 -5 6"]) == ((-1.0, -5.0, 3.0), (4.0, 2.0, 6.0))
+
+def test_polyhedrons_placed_by_the_meshes_naming_them():
+    mesh = ['TAG "A_DMSPRITEDEF"', "CENTEROFFSET 10 0 0", "POLYHEDRON", 'DEFINITION "A_PH"', "ENDPOLYHEDRON", "NUMFACE2S 0"]
+    assert mesh_polyhedron(mesh) == ("A_PH", (10.0, 0.0, 0.0))
+    assert mesh_polyhedron(["POLYHEDRON", 'DEFINITION ""', "ENDPOLYHEDRON"]) is None
+
+    box = ((0.0, 0.0, 0.0), (1.0, 1.0, 1.0))
+    entries = [(0, 'POLYHEDRONDEFINITION', "A_PH", box, None), (1, 'POLYHEDRONDEFINITION', "B_PH", box, None),
+        (2, 'DMSPRITEDEF2', "A1", None, ("A_PH", (10.0, 0.0, 0.0))), (3, 'DMSPRITEDEF2', "A2", None, ("A_PH", (0.0, -5.0, 0.0)))]
+    assert placed_boxes(entries) == [(0, ((0.0, -5.0, 0.0), (11.0, 1.0, 1.0))), (1, box), (2, None), (3, None)]
+
+def test_grid_query():
+    entries = [("A", ((x * 10.0, 0.0, 0.0), (x * 10.0 + 5.0, 5.0, 5.0))) for x in range(100)]
+    entries.append(("TERRAIN", ((-1000.0, -1000.0, -10.0), (1000.0, 1000.0, 10.0))))
+    entries.append(("UNKNOWN", None))
+    index = spatial_index([(f"{key}{number}", box) for number, (key, box) in enumerate(entries)])
+
+    assert index.query(((21.0, 1.0, 1.0), (34.0, 2.0, 2.0))) == ["A2", "A3", "TERRAIN100", "UNKNOWN101"]
+    assert index.query(((2000.0, 0.0, 0.0), (2001.0, 1.0, 1.0))) == ["UNKNOWN101"]
+    # A query bigger than the grid falls back to testing every entry
+    assert len(index.query(((-5000.0, -5000.0, -5000.0), (5000.0, 5000.0, 5000.0)))) == 102
@@ -0,0 +1,222 @@
+import json, os, re
+
+from main_parse import INCLUDE_LINE, SECTION_START, include_file_path, line_actions, main_keywords, path_key
+from mmap_scanner import TEXT_ENCODING, _DOUBLE_QUOTE, mapped_reader
+
+# Bumped whenever the sidecar layout or the scan rules change
+TAG_INDEX_VERSION = 2
+
+# Written next to the root file, e.g. elf.mod -> elf.mod.tagindex
+SIDECAR_SUFFIX = ".tagindex"
+
+_line_actions = {token.encode(): action for token, action in line_actions.items()}
+_end_keywords = {keyword.encode(): end.encode() for keyword, end in main_keywords.items()}
+_end_keywords[b"DMSPRITEDEF2_MATERIALPALETTE"] = _end_keywords[b"DMSPRITEDEF2"]
+
+# "TAG.001", the name eq_ascii_parse gives the second track with the same TAG
+_suffixed_tag = re.compile(r"(.+)\.(\d{3})")
+
+def _quoted(line:bytes) -> str:
+    return line.split(b'"')[1].decode(TEXT_ENCODING)
+
+# Lines the scan has to look at: section keywords, INCLUDE and TAG lines, and
+# anything starting in the first column. Indented body lines are skipped by
+# the regex engine, which is what keeps the scan cheap on large files.
+_marker_lines = re.compile(
+    rb"^(?:[ \t]*(?:" + b"|".join(sorted(_line_actions, key=len, reverse=True)) + rb"|TAG)(?=\s|//|$)|[^\s/]|/(?!/))[^\r\n]*",
+    re.MULTILINE)
+
+def _trimmed_end(buffer, start:int, end:int) -> int:
+    while end > start and buffer[end - 1] in b" \t\r\n":
+        end -= 1
+    return end
+
+def scan_file(filepath:str) -> tuple[list[tuple[str, int, int, str]], list[str]]:
+    """
+    Returns (tag, offset, length, kind) for every tagged top-level definition
+    of one file, plus its INCLUDE names, from a single pass over the raw bytes.
+
+    MOD sections are split exactly like main_parse.iter_sections and run from
+    their header line to their END line (or up to the next header). WCE
+    definitions carry their tag on the header line and run until the next line
+    that is not indented.
+    """
+    definitions = []
+    includes = []
+    section = None  # [kind, offset, end keyword, tag]
+    wce = None  # [kind, offset, tag]
+
+    with mapped_reader(filepath) as r:
+        buffer = r.buffer
+
+        def close_section(end):
+            if section[3] is not None:
+                end = _trimmed_end(buffer, section[1], end)
+                definitions.append((section[3], section[1], end - section[1], section[0].decode(TEXT_ENCODING)))
+
+        def close_wce(end):
+            end = _trimmed_end(buffer, wce[1], end)
+            definitions.append((wce[2], wce[1], end - wce[1], wce[0].decode(TEXT_ENCODING)))
+
+        for match in _marker_lines.finditer(buffer):
+            raw = match.group()
+            line = raw
+            if b"//" in line:
+                line = line[:line.index(b"//")]
+            line = line.strip()
+            if not line:
+                continue
+            offset = match.start()
+            indented = raw[:1].isspace()
+
+            if wce is not None:
+                if indented:
+                    continue
+                close_wce(offset)
+                wce = None
+
+            token = line.split(None, 1)[0]
+            action = _line_actions.get(token)
+            quoted = _DOUBLE_QUOTE in line
+
+            if section is None and quoted and not indented and action != INCLUDE_LINE:
+                wce = [token, offset, _quoted(line)]
+            elif action is None:
+                if section is not None and section[3] is None and token == b"TAG" and quoted:
+                    section[3] = _quoted(line)
+            elif action == INCLUDE_LINE:
+                includes.append(_quoted(line))
+            elif action == SECTION_START:
+                # A quoted MATERIALPALETTE is the palette reference inside a DMSPRITEDEF2
+                if token == b"MATERIALPALETTE" and quoted:
+                    continue
+                kind = token
+                if section is not None:
+                    close_section(offset)
+                    if token == b"MATERIALPALETTE" and section[0] == b"DMSPRITEDEF2":
+                        kind = b"DMSPRITEDEF2_MATERIALPALETTE"
+                section = [kind, offset, _end_keywords[kind], None]
+            elif section is not None and token == section[2]:
+                close_section(match.end())
+                section = None
+
+        if section is not None:
+            close_section(len(buffer))
+        if wce is not None:
+            close_wce(len(buffer))
+
+    return definitions, includes
+
+def build_tag_index(filepath:str) -> dict:
+    """
+    Scans filepath and its INCLUDE tree depth first. Every definition of a tag
+    is kept, in the order recursive_parse reads them in.
+    """
+    index = {'version': TAG_INDEX_VERSION, 'files': {}, 'tags': {}}
+    visited = set()
+
+    def index_file(path):
+        visited.add(path_key(path))
+        stat = os.stat(path)
+        index['files'][path] = [stat.st_size, stat.st_mtime_ns]
+        definitions, includes = scan_file(path)
+        for tag, offset, length, kind in definitions:
+            index['tags'].setdefault(tag, []).append({'file': path, 'offset': offset, 'length': length, 'kind': kind})
+        directory = os.path.dirname(path)
+        for include in includes:
+            include_path = include_file_path(directory, include)
+            if path_key(include_path) not in visited:
+                index_file(include_path)
+
+    index_file(filepath)
+    return index
+
+def is_current(index:dict) -> bool:
+    if index.get('version') != TAG_INDEX_VERSION:
+        return False
+    for path, (size, mtime_ns) in index['files'].items():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+            return False
+    return True
+
+def load_tag_index(filepath:str, sidecar:str=None) -> dict:
+    """
+    Returns the tag index of filepath's INCLUDE tree, read from its sidecar
+    file when none of the indexed files changed, otherwise rebuilt and saved.
+    """
+    if sidecar is None:
+        sidecar = filepath + SIDECAR_SUFFIX
+    try:
+        with open(sidecar, 'r') as file:
+            index = json.load(file)
+        if is_current(index):
+            return index
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    index = build_tag_index(filepath)
+    temp_path = sidecar + ".tmp"
+    with open(temp_path, 'w') as file:
+        json.dump(index, file)
+    os.replace(temp_path, sidecar)
+    return index
+
+def find_definition(index:dict, tag:str, kind:str=None, occurrence:int=None) -> dict:
+    """
+    Returns the index entry of one definition of tag. occurrence counts the
+    definitions of that tag (of kind, when given) in read order and defaults
+    to the first. A tag that is not in the index but has a ".001" style
+    suffix, as eq_ascii_parse names repeated track tags, is looked up as
+    that occurrence of its base tag.
+    """
+    entries = index['tags'].get(tag)
+    if entries is None and occurrence is None:
+        match = _suffixed_tag.fullmatch(tag)
+        if match:
+            entries = index['tags'].get(match[1])
+            occurrence = int(match[2])
+    if entries is None:
+        raise Exception(f"{tag}: not in tag index")
+    if kind is not None:
+        kind_entries = [entry for entry in entries if entry['kind'] == kind]
+        if not kind_entries:
+            raise Exception(f"{tag}: expected {kind}, index has {entries[0]['kind']}")
+        entries = kind_entries
+    occurrence = occurrence or 0
+    if occurrence >= len(entries):
+        raise Exception(f"{tag}: occurrence {occurrence} requested, tag index has {len(entries)}")
+    return entries[occurrence]
+
+def open_definition(entry:dict) -> mapped_reader:
+    """
+    Returns a mapped_reader over one definition, positioned after its header
+    line, for readers such as model.track_def that consume the body directly.
+    """
+    r = mapped_reader(entry['file'], entry['offset'], entry['offset'] + entry['length'])
+    r.read_line()
+    return r
+
+def read_section(entry:dict) -> list[str]:
+    """
+    Returns the body lines of one definition as main_parse.iter_sections
+    would have produced them, without reading the rest of its file.
+    """
+    end_keyword = _end_keywords.get(entry['kind'].encode(), b"").decode(TEXT_ENCODING)
+    lines = []
+    with open_definition(entry) as r:
+        for line in r:
+            if '//' in line:
+                line = line[:line.index('//')]
+            line = line.strip()
+            if not line:
+                continue
+            token = line.split(None, 1)[0]
+            if token == end_keyword:
+                break
+            if token != "INCLUDE":
+                lines.append(line)
+    return lines
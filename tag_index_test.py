@@ -0,0 +1,96 @@
+import os
+
+from eq_ascii_wld_parser import recursive_parse
+from main_parse import iter_sections
+from main_parse_bench import sample_blocks
+from model.track_def import load_track_def
+from tag_index import build_tag_index, find_definition, load_tag_index, read_section, scan_file
+
+wce_sample = '''// wce sample
+TRACKDEFINITION "ELF_TRACKDEF"
+\tTAGINDEX 0
+\tSPRITE "ELF_DMSPRITEDEF"
+\tNUMFRAMES 1
+\t\tFRAME 256 1 2 3 -16384 4 5 6 // first
+\tNUMLEGACYFRAMES 0
+
+TRACKINSTANCE "ELF_TRACK"
+\tTAGINDEX 0
+'''
+
+def test_scan_matches_iter_sections(tmp_path):
+    path = tmp_path / "sample.mod"
+    text = sample_blocks.replace("ELF_MP", "ELF_MP_A") + '''DMSPRITEDEF2
+\tTAG "NESTED_DMSPRITEDEF"
+\tNUMVERTICES 0
+MATERIALPALETTE
+\tTAG "NESTED_MP"
+\tNUMMATERIALS 0
+ENDDMSPRITEDEF2
+'''
+    path.write_bytes(text.replace("\n", "\r\n").encode())
+    (tmp_path / "ELFCH0001.INC").write_text("")
+
+    definitions, includes = scan_file(str(path))
+    index = build_tag_index(str(path))
+
+    assert includes == ["ELFCH0001.INC"]
+    assert [(tag, kind) for tag, _, _, kind in definitions] == [
+        ("ELF_MP_A", "MATERIALPALETTE"),
+        ("ELF_DMSPRITEDEF", "DMSPRITEDEF2"),
+        ("C01ELFHE_TRACKDEF", "TRACKDEFINITION"),
+        ("C01ELFHE_TRACK", "TRACKINSTANCE"),
+        ("NESTED_DMSPRITEDEF", "DMSPRITEDEF2"),
+        ("NESTED_MP", "DMSPRITEDEF2_MATERIALPALETTE"),
+    ]
+    expected = [section for section in iter_sections(text.splitlines()) if section[0] != "INCLUDE"]
+    assert [(entry['kind'], read_section(entry)) for entries in index['tags'].values() for entry in entries] == expected
+    offset = definitions[2][1]
+    assert path.read_bytes()[offset:offset + definitions[2][2]].startswith(b"TRACKDEFINITION\r\n")
+    assert path.read_bytes()[offset:offset + definitions[2][2]].endswith(b"ENDTRACKDEFINITION")
+
+def test_sidecar_reused_until_a_file_changes(tmp_path):
+    root = tmp_path / "elf.wce"
+    root.write_text('INCLUDE "TRACKS.WCE"\n')
+    (tmp_path / "tracks.wce").write_text(wce_sample)
+
+    index = load_tag_index(str(root))
+    assert os.path.exists(str(root) + ".tagindex")
+    assert find_definition(index, "ELF_TRACK", "TRACKINSTANCE")['file'].endswith("tracks.wce")
+
+    definition = load_track_def(index, "ELF_TRACKDEF")
+    assert definition.sprite == "ELF_DMSPRITEDEF"
+    assert definition.frames[0].xyz == (1, 2, 3)
+
+    (tmp_path / "elf.wce.tagindex").write_text(
+        (tmp_path / "elf.wce.tagindex").read_text().replace("ELF_TRACK\"", "CACHED_TRACK\""))
+    assert "CACHED_TRACK" in load_tag_index(str(root))['tags']
+
+    (tmp_path / "tracks.wce").write_text(wce_sample.replace("ELF_TRACK\"", "OTHER_TRACK\""))
+    assert sorted(load_tag_index(str(root))['tags']) == ["ELF_TRACKDEF", "OTHER_TRACK"]
+
+def test_repeated_tags_are_all_indexed(tmp_path):
+    root = tmp_path / "elf.wce"
+    root.write_text(wce_sample + 'INCLUDE "MORE.WCE"\n')
+    (tmp_path / "MORE.WCE").write_text(wce_sample.replace("FRAME 256 1 2 3", "FRAME 256 7 8 9"))
+
+    index = build_tag_index(str(root))
+    assert len(index['tags']["ELF_TRACKDEF"]) == 2
+    assert load_track_def(index, "ELF_TRACKDEF").frames[0].xyz == (1, 2, 3)
+    second = find_definition(index, "ELF_TRACKDEF", "TRACKDEFINITION", occurrence=1)
+    assert second['file'].endswith("MORE.WCE")
+    assert find_definition(index, "ELF_TRACKDEF.001", "TRACKDEFINITION") == second
+    assert load_track_def(index, "ELF_TRACKDEF.001").frames[0].xyz == (7, 8, 9)
+
+def test_index_and_parser_resolve_includes_alike(tmp_path):
+    root = tmp_path / "ROOT.MOD"
+    root.write_text('INCLUDE "Mixed.INC"\n')
+    (tmp_path / "mixed.inc").write_text('MATERIALPALETTE\n\tTAG "MIXED_PAL"\nENDMATERIALPALETTE\n')
+
+    include_paths = []
+    sections = list(recursive_parse(str(root), include_paths))
+    index = build_tag_index(str(root))
+    assert [os.path.basename(path) for path in include_paths] == ["mixed.inc"]
+    assert list(index['files']) == [str(root)] + include_paths
+    assert find_definition(index, "MIXED_PAL")['file'] == include_paths[0]
+    assert [lines for _, lines in sections] == [['TAG "MIXED_PAL"']]
@@ -1,6 +1,8 @@
-import bpy
 import re
-import mathutils
+
+import numpy as np
+
+from tag_index import find_definition, read_section
 
 # Define the list of animation prefixes
 animation_prefixes = [
@@ -14,89 +16,129 @@ animation_prefixes = [
 
 # Create a new list that includes the variants with "A" and "B"
 animation_prefix_variants = animation_prefixes + [prefix + "A" for prefix in animation_prefixes] + [prefix + "B" for prefix in animation_prefixes]
+animation_prefix_set = frozenset(animation_prefix_variants)
 
-def generate_unique_name(base_name, existing_names):
+def generate_unique_name(base_name, existing_names, counters=None):
     if base_name not in existing_names:
         return base_name
-    
-    suffix = 1
+
+    # Names are never released, so every suffix below the counter is taken
+    suffix = counters.get(base_name, 1) if counters is not None else 1
     while True:
         new_name = f"{base_name}.{suffix:03d}"
         if new_name not in existing_names:
+            if counters is not None:
+                counters[base_name] = suffix + 1
             return new_name
         suffix += 1
 
-def process_track_definition(lines, existing_track_definitions):
+def base_name_prefix(name, base_name):
+    # The part of name before the first base_name, or None when name has no base_name
+    position = name.find(base_name)
+    return name[:position] if position != -1 else None
+
+def frame_array(rows, width, missing):
+    # One row of numbers per frame; frames that lacked the line get missing
+    if None not in rows:
+        return np.array(" ".join(rows).split(), dtype=np.float64).reshape(len(rows), width)
+    values = np.tile(np.array(missing, dtype=np.float64), (len(rows), 1))
+    for index, row in enumerate(rows):
+        if row is not None:
+            values[index] = row.split()
+    return values
+
+def parse_track_definition(lines):
+    """
+    Parses a TRACKDEFINITION into 'translations', a float32 (F,3) array of
+    XYZ / 256, and 'rotations', a float32 (F,4) array of normalized (w, x, y, z)
+    quaternions built from ROTSCALE? and ROTABC?, one row per FRAMETRANSFORM.
+    Frames without an XYZ or ROTABC? line get (0, 0, 0) / (1, 0, 0, 0).
+    xyz_scale and rot_scale are the last XYZSCALE and ROTSCALE? values.
+    """
     track_def = {
         'name': '',
+        'tag': '',
+        'tag_index': None,
         'num_frames': 0,
-        'frame_transforms': [],
-        'xyz_scale': 256
+        'xyz_scale': 256,
+        'rot_scale': None
     }
-    
-    frame_transform = None
+
+    # Number text of each frame's XYZ and (ROTSCALE?, ROTABC?) lines
+    translation_rows = []
+    rotation_rows = []
+    translation = None
+    rotation = None
+    in_frame = False
 
     for line in lines:
-        if line.startswith("TAG") and not line.startswith("TAGINDEX"):
-            base_name = line.split('"')[1]
-            track_def['name'] = generate_unique_name(base_name, existing_track_definitions)
-            existing_track_definitions.add(track_def['name'])
+        if line.startswith("TAGINDEX"):
+            track_def['tag_index'] = int(line.split()[1])
+        elif line.startswith("TAG"):
+            track_def['name'] = track_def['tag'] = line.split('"')[1]
         elif line.startswith("NUMFRAMES"):
             track_def['num_frames'] = int(line.split()[1])
         elif line.startswith("FRAMETRANSFORM"):
-            frame_transform = {
-                'translation': None,
-                'rotation': None
-            }
+            translation = None
+            rotation = None
+            in_frame = True
         elif line.startswith("XYZSCALE"):
             xyz_scale = float(line.split()[1])
             track_def['xyz_scale'] = xyz_scale
         elif line.startswith("XYZ"):
-            parts = line.split()
-            tx = float(parts[1]) / 256
-            ty = float(parts[2]) / 256
-            tz = float(parts[3]) / 256
-            frame_transform['translation'] = (tx, ty, tz)
+            translation = line[3:]
         elif line.startswith("ROTSCALE?"):
-            rot_scale = float(line.split()[1])
+            track_def['rot_scale'] = float(line.split()[1])
         elif line.startswith("ROTABC?"):
-            parts = line.split()
-            rx = float(parts[1])
-            ry = float(parts[2])
-            rz = float(parts[3])
-            rotation = mathutils.Quaternion((rot_scale, rx, ry, rz))
-            rotation.normalize()
-#            print(f"Quaternion: {rotation}")  # Print out the quaternion
-            frame_transform['rotation'] = rotation
+            if track_def['rot_scale'] is None:
+                raise Exception(f"{track_def['name']}: ROTABC? before any ROTSCALE?")
+            rotation = f"{track_def['rot_scale']!r} {line[7:]}"
         elif line.startswith("ENDFRAMETRANSFORM"):
-            if frame_transform:
-                track_def['frame_transforms'].append(frame_transform)
+            if in_frame:
+                translation_rows.append(translation)
+                rotation_rows.append(rotation)
+
+    translations = frame_array(translation_rows, 3, (0.0, 0.0, 0.0)) / 256
+    rotations = frame_array(rotation_rows, 4, (1.0, 0.0, 0.0, 0.0))
+    lengths = np.linalg.norm(rotations, axis=1, keepdims=True)
+    rotations = np.divide(rotations, lengths, out=np.tile([1.0, 0.0, 0.0, 0.0], (len(rotations), 1)), where=lengths > 0)
+    track_def['translations'] = translations.astype(np.float32)
+    track_def['rotations'] = rotations.astype(np.float32)
 
     return track_def
 
-def process_track_instance(lines, existing_track_instances, track_def_suffixes):
+def load_track_definition(index, tag):
+    # Parses one TRACKDEFINITION located through a tag_index
+    return parse_track_definition(read_section(find_definition(index, tag, "TRACKDEFINITION")))
+
+def name_track_definition(track_def, existing_track_definitions, name_counters=None):
+    # Renames a parsed definition so its tag is unique among those seen so far
+    if track_def['name']:
+        track_def['name'] = generate_unique_name(track_def['name'], existing_track_definitions, name_counters)
+        existing_track_definitions.add(track_def['name'])
+
+def process_track_definition(lines, existing_track_definitions, name_counters=None):
+    track_def = parse_track_definition(lines)
+    name_track_definition(track_def, existing_track_definitions, name_counters)
+    return track_def
+
+def parse_track_instance(lines):
     track_instance = {
         'name': '',
         'definition': '',
+        'definition_tag': '',
+        'definition_index': None,
         'interpolate': False,
         'sleep': 0
     }
     
     for line in lines:
         if line.startswith("TAG") and not line.startswith("TAGINDEX"):
-            base_name = line.split('"')[1]
-            track_instance['name'] = generate_unique_name(base_name, existing_track_instances)
-            existing_track_instances.add(track_instance['name'])
-        elif line.startswith("DEFINITION") and not line.startswith("DEFINITIONINDEX"):
-            base_name = line.split('"')[1]
-            if base_name in track_def_suffixes:
-                suffix = track_def_suffixes[base_name]
-                new_definition_name = f"{base_name}.{suffix:03d}"
-                track_instance['definition'] = new_definition_name
-                track_def_suffixes[base_name] += 1
-            else:
-                track_instance['definition'] = base_name
-                track_def_suffixes[base_name] = 1
+            track_instance['name'] = line.split('"')[1]
+        elif line.startswith("DEFINITIONINDEX"):
+            track_instance['definition_index'] = int(line.split()[1])
+        elif line.startswith("DEFINITION"):
+            track_instance['definition'] = track_instance['definition_tag'] = line.split('"')[1]
         elif line.startswith("INTERPOLATE"):
             track_instance['interpolate'] = bool(int(line.split()[1]))
         elif line.startswith("SLEEP?"):
@@ -104,48 +146,97 @@ def process_track_instance(lines, existing_track_instances, track_def_suffixes):
 
     return track_instance
 
-def track_parse(sections, base_name):
-    track_definitions = {}
+def load_track_instance(index, tag):
+    # Parses one TRACKINSTANCE located through a tag_index
+    return parse_track_instance(read_section(find_definition(index, tag, "TRACKINSTANCE")))
+
+def name_track_instance(track_instance, existing_track_instances, track_def_suffixes, name_counters=None):
+    # Makes the instance tag unique and points the instance at the matching
+    # suffixed copy of its definition: the second reference to a definition
+    # tag gets .001, the third .002 and so on
+    if track_instance['name']:
+        track_instance['name'] = generate_unique_name(track_instance['name'], existing_track_instances, name_counters)
+        existing_track_instances.add(track_instance['name'])
+
+    base_name = track_instance['definition']
+    if base_name:
+        if base_name in track_def_suffixes:
+            suffix = track_def_suffixes[base_name]
+            track_instance['definition'] = f"{base_name}.{suffix:03d}"
+            track_def_suffixes[base_name] += 1
+        else:
+            track_def_suffixes[base_name] = 1
+
+def process_track_instance(lines, existing_track_instances, track_def_suffixes, name_counters=None):
+    track_instance = parse_track_instance(lines)
+    name_track_instance(track_instance, existing_track_instances, track_def_suffixes, name_counters)
+    return track_instance
+
+def definition_index(track_definitions):
+    # Definitions by (TAG, TAGINDEX), for instances that give a DEFINITIONINDEX;
+    # keys used by several definitions are left out, those link by name
+    index = {}
+    for track_def in track_definitions.values():
+        if track_def.get('tag_index') is not None:
+            key = (track_def['tag'], track_def['tag_index'])
+            index[key] = None if key in index else track_def
+    return index
+
+def link_tracks(track_definitions, track_instances, base_name):
     animations = {}
     armature_tracks = {}
+    by_tag_index = definition_index(track_definitions)
+
+    for track_instance in track_instances:
+        track_def = None
+        if track_instance.get('definition_index') is not None:
+            track_def = by_tag_index.get((track_instance['definition_tag'], track_instance['definition_index']))
+        if track_def is None:
+            track_def = track_definitions.get(track_instance['definition'])
+
+        if track_def:
+            # Name the definition actually linked, which DEFINITIONINDEX may have changed
+            track_instance['definition'] = track_def['name']
+            # Tracks whose tag has an animation prefix before the base_name are animations
+            prefix_part = base_name_prefix(track_instance['name'], base_name)
+            if prefix_part is None:
+                continue
+            if prefix_part in animation_prefix_set:
+                animations[track_instance['name']] = {
+                    'instance': track_instance,
+                    'definition': track_def,
+                    'animation_prefix': prefix_part  # Store the animation prefix
+                }
+            else:
+                armature_tracks[track_instance['name']] = {
+                    'instance': track_instance,
+                    'definition': track_def
+                }
+
+    return {'animations': animations, 'armature_tracks': armature_tracks}
+
+def track_parse(sections, base_name):
+    track_definitions = {}
+    track_instances = []
 
     existing_track_definitions = set()
     existing_track_instances = set()
     track_def_suffixes = {}
+    definition_counters = {}
+    instance_counters = {}
 
     for instance in sections.get('TRACKDEFINITION', []):
-        track_def = process_track_definition(instance, existing_track_definitions)
+        track_def = process_track_definition(instance, existing_track_definitions, definition_counters)
         track_definitions[track_def['name']] = track_def
 
     for instance in sections.get('TRACKINSTANCE', []):
-        track_instance = process_track_instance(instance, existing_track_instances, track_def_suffixes)
-        definition_name = track_instance['definition']
+        track_instances.append(process_track_instance(instance, existing_track_instances, track_def_suffixes, instance_counters))
 
-        track_def = track_definitions.get(definition_name)
-
-        if track_def:
-            # Extract the part before the base_name for comparison
-            if base_name in track_instance['name']:
-                prefix_part = track_instance['name'].split(base_name)[0]
-
-                # Perform an exact match with the animation prefix variants
-                if prefix_part in animation_prefix_variants:
-                    animations[track_instance['name']] = {
-                        'instance': track_instance,
-                        'definition': track_def,
-                        'animation_prefix': prefix_part  # Store the animation prefix
-                    }
-                    # Debugging: Ensure the prefix is stored correctly
-                    print(f"Stored animation prefix '{prefix_part}' for track '{track_instance['name']}'")
-                else:
-                    armature_tracks[track_instance['name']] = {
-                        'instance': track_instance,
-                        'definition': track_def
-                    }
-
-    return {'animations': animations, 'armature_tracks': armature_tracks}
+    return link_tracks(track_definitions, track_instances, base_name)
 
 def build_animation(armature_obj, animations, frame_rate=30):
+    import bpy
+
     for anim_name, anim_data in animations.items():
         track_instance = anim_data['instance']
         track_definition = anim_data['definition']
@@ -162,14 +253,14 @@ def build_animation(armature_obj, animations, frame_rate=30):
 
         # Build the animation
         current_frame = 0
-        for i, frame_transform in enumerate(track_definition['frame_transforms']):
+        for translation, rotation in zip(track_definition['translations'].tolist(), track_definition['rotations'].tolist()):
             current_frame += (track_instance['sleep'] or 100) / 1000.0 * frame_rate
             frame = round(current_frame)
 
             for bone_name, bone in armature_obj.pose.bones.items():
                 if bone_name in track_instance['name']:
-                    bone.location = frame_transform['translation']
-                    bone.rotation_quaternion = frame_transform['rotation']
+                    bone.location = translation
+                    bone.rotation_quaternion = rotation
                     bone.keyframe_insert(data_path="location", frame=frame)
                     bone.keyframe_insert(data_path="rotation_quaternion", frame=frame)
                     break
@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+import pytest
+
+from corpus_generator import write_mod_corpus
+from main_parse import main_parse
+from track_parse import generate_unique_name, link_tracks, parse_track_definition, process_track_definition, process_track_instance
+
+def reference_frames(lines):
+    # Frame by frame, as the importer computed them with mathutils
+    frames = []
+    for line in lines:
+        parts = line.split()
+        if line.startswith("FRAMETRANSFORM"):
+            frames.append([None, None])
+        elif line.startswith("XYZ") and not line.startswith("XYZSCALE"):
+            frames[-1][0] = [float(value) / 256 for value in parts[1:4]]
+        elif line.startswith("ROTSCALE?"):
+            rot_scale = float(parts[1])
+        elif line.startswith("ROTABC?"):
+            rotation = [rot_scale] + [float(value) for value in parts[1:4]]
+            length = math.sqrt(sum(value * value for value in rotation))
+            frames[-1][1] = [value / length for value in rotation]
+    return frames
+
+def test_track_arrays_match_per_frame_math(tmp_path):
+    root = write_mod_corpus(str(tmp_path), meshes=0, tracks=3, frames=12, bones=4, includes=0)
+    for lines in main_parse(root)[0]['TRACKDEFINITION']:
+        track = parse_track_definition(lines)
+        frames = reference_frames(lines)
+
+        assert track['translations'].dtype == track['rotations'].dtype == np.float32
+        assert track['translations'].shape == (len(frames), 3)
+        assert track['rotations'].shape == (len(frames), 4)
+        assert track['xyz_scale'] == 256.0 and track['rot_scale'] == 16384.0
+        assert np.allclose(track['translations'], [translation for translation, _ in frames])
+        assert np.allclose(track['rotations'], [rotation for _, rotation in frames])
+
+def test_missing_and_invalid_frame_lines():
+    track = parse_track_definition([
+        'TAG "T"', "NUMFRAMES 3",
+        "FRAMETRANSFORM", "XYZ 256 0 0", "ROTSCALE? 0", "ROTABC? 0 0 0", "ENDFRAMETRANSFORM",
+        "FRAMETRANSFORM", "ENDFRAMETRANSFORM",
+        "FRAMETRANSFORM", "ROTABC? 0 3 4", "ENDFRAMETRANSFORM",
+    ])
+    assert track['translations'].tolist() == [[1, 0, 0], [0, 0, 0], [0, 0, 0]]
+    assert np.allclose(track['rotations'], [[1, 0, 0, 0], [1, 0, 0, 0], [0, 0, 0.6, 0.8]])
+
+    with pytest.raises(Exception):
+        parse_track_definition(['TAG "T"', "FRAMETRANSFORM", "ROTABC? 0 0 1", "ENDFRAMETRANSFORM"])
+
+def test_unique_names_with_counters_match_probing():
+    rng = np.random.default_rng(0)
+    tags = ["A", "B", "A.001", "A.003", "B.002"]
+    probed, counted, counters = set(), set(), {}
+    for tag in rng.choice(tags, 500).tolist():
+        name = generate_unique_name(tag, probed)
+        probed.add(name)
+        assert generate_unique_name(tag, counted, counters) == name
+        counted.add(name)
+
+def test_link_tracks_by_definition_index_and_prefix():
+    definitions, instances = {}, []
+    existing, counters = set(), {}
+    for tag_index in (0, 1):
+        lines = ['TAG "ELF_TRACKDEF"', f"TAGINDEX {tag_index}", "NUMFRAMES 1",
+            "FRAMETRANSFORM", f"XYZ {tag_index} 0 0", "ENDFRAMETRANSFORM"]
+        track_def = process_track_definition(lines, existing, counters)
+        definitions[track_def['name']] = track_def
+    assert list(definitions) == ["ELF_TRACKDEF", "ELF_TRACKDEF.001"]
+
+    suffixes = {}
+    for tag, definition_index in (("C01ELF_TRACK", 1), ("ELF_TRACK", 0), ("X01ELF_TRACK", 1), ("C02ORC_TRACK", 0)):
+        lines = [f'TAG "{tag}"', "TAGINDEX 0", 'DEFINITION "ELF_TRACKDEF"', f"DEFINITIONINDEX {definition_index}"]
+        instances.append(process_track_instance(lines, set(), suffixes))
+
+    linked = link_tracks(definitions, instances, "ELF")
+    assert list(linked['animations']) == ["C01ELF_TRACK"]
+    assert linked['animations']["C01ELF_TRACK"]['animation_prefix'] == "C01"
+    assert linked['animations']["C01ELF_TRACK"]['definition'] is definitions["ELF_TRACKDEF.001"]
+    # C02ORC_TRACK has no ELF in its name and belongs to neither
+    assert list(linked['armature_tracks']) == ["ELF_TRACK", "X01ELF_TRACK"]
+    assert linked['armature_tracks']["ELF_TRACK"]['definition'] is definitions["ELF_TRACKDEF"]
+    # The third reference would have been linked to ELF_TRACKDEF.002 by position
+    assert linked['armature_tracks']["X01ELF_TRACK"]['definition'] is definitions["ELF_TRACKDEF.001"]
+    assert [instance['definition'] for instance in instances] == ["ELF_TRACKDEF.001", "ELF_TRACKDEF", "ELF_TRACKDEF.001", "ELF_TRACKDEF"]
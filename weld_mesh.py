@@ -0,0 +1,83 @@
+import numpy as np
+
+def segment_ids(mesh:dict, count:int) -> np.ndarray:
+    # Consecutive vertices with the same bone and vertex material share a segment
+    changes = np.zeros(count, dtype=bool)
+    for name in ('vertex_bone_indices', 'vertex_material_indices'):
+        indices = mesh.get(name)
+        if indices is not None and len(indices) == count:
+            changes[1:] |= indices[1:] != indices[:-1]
+    return np.cumsum(changes)
+
+def vertex_keys(mesh:dict, count:int, epsilon:float) -> np.ndarray:
+    # One row per vertex holding everything that has to match for a weld
+    columns = [np.asarray(mesh['vertices'], dtype=np.float64).reshape(count, -1)]
+    for name in ('uvs', 'normals', 'colors'):
+        values = mesh.get(name)
+        if values is not None and len(values) == count:
+            columns.append(np.asarray(values, dtype=np.float64).reshape(count, -1))
+    keys = np.hstack(columns)
+    if epsilon > 0:
+        keys = np.round(keys / epsilon)
+    # -0.0 and 0.0 are the same vertex
+    return keys + 0.0
+
+def shrink_runs(runs:list, kept:np.ndarray) -> list:
+    # (start, end, index) runs over the old items -> runs over the kept ones
+    if not runs:
+        return runs
+    bounds = np.searchsorted(kept, np.array([(start, end) for start, end, _ in runs], dtype=np.int64))
+    return [(int(start), int(end), index) for (start, end), (_, _, index) in zip(bounds.tolist(), runs)]
+
+def weld_mesh(mesh:dict, epsilon:float=0.0) -> dict:
+    """
+    Merges vertices of an arrays=True dmspritedef2_parse mesh whose position,
+    UV, normal and color all match, exactly or after snapping to a grid of
+    epsilon, and remaps the faces onto the survivors. Faces left with a
+    repeated corner are dropped.
+
+    Vertices are only merged within a run of the same bone and vertex
+    material, and survivors keep their order, so SKINASSIGNMENTGROUPS and
+    VERTEXMATERIALGROUPS stay valid run-lengths and are shrunk in place;
+    FACEMATERIALGROUPS and the passable mask follow the dropped faces.
+
+    Meshes with MESHOPs are returned unchanged, as those address vertices by
+    index. Returns a new mesh dict; the input is not modified.
+    """
+    count = len(mesh['vertices'])
+    if count == 0 or mesh.get('meshops'):
+        return mesh
+
+    keys = np.column_stack([segment_ids(mesh, count), vertex_keys(mesh, count, epsilon)])
+    rows = np.ascontiguousarray(keys).view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    if len(first) == count:
+        return mesh
+
+    # Number the survivors in their original order
+    order = np.argsort(first)
+    kept = first[order]
+    new_index = np.empty(len(first), dtype=np.int64)
+    new_index[order] = np.arange(len(first))
+    remap = new_index[inverse.ravel()]
+
+    welded = dict(mesh)
+    for name in ('vertices', 'uvs', 'normals', 'colors', 'vertex_bone_indices', 'vertex_material_indices'):
+        values = mesh.get(name)
+        if values is not None and len(values) == count:
+            welded[name] = values[kept]
+    for name in ('vertex_groups', 'vertex_materials'):
+        if name in mesh:
+            welded[name] = shrink_runs(mesh[name], kept)
+
+    faces = remap[mesh['faces']].astype(mesh['faces'].dtype)
+    keep_faces = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    welded['faces'] = np.ascontiguousarray(faces[keep_faces])
+    if not keep_faces.all():
+        kept_faces = np.flatnonzero(keep_faces)
+        for name in ('passable', 'face_material_indices'):
+            if name in mesh:
+                welded[name] = mesh[name][keep_faces]
+        if 'face_materials' in mesh:
+            welded['face_materials'] = shrink_runs(mesh['face_materials'], kept_faces)
+    return welded
@@ -0,0 +1,41 @@
+from dmspritedef2_parse import dmspritedef2_parse
+from weld_mesh import weld_mesh
+
+def mesh_lines(last_z="0"):
+    positions = ["0 0 0", "1 0 0", "0 1 0", "0 0 " + last_z, "1 1 0", "1 0 0"]
+    uvs = ["0 0", "1 0", "0 1", "0 0", "1 1", "1 0"]
+    lines = ['TAG "WELD_DMSPRITEDEF"', "NUMVERTICES 6"]
+    lines += ["XYZ " + position for position in positions]
+    lines += ["NUMUVS 6"] + ["UV " + uv for uv in uvs]
+    lines += ["NUMVERTEXNORMALS 6"] + ["XYZ 0 0 1"] * 6
+    lines += ["NUMVERTEXCOLORS 6"] + ["RGBA 255 255 255 255"] * 6
+    # Vertex 5 repeats vertex 1, but is skinned to another bone
+    lines += ["SKINASSIGNMENTGROUPS 2 5 0 1 1", "NUMFACE2S 3"]
+    for triangle in ("0, 1, 2", "3, 4, 2", "0, 3, 5"):
+        lines += ["DMFACE2", "TRIANGLE " + triangle, "ENDDMFACE2"]
+    lines += ["FACEMATERIALGROUPS 2 2 0 1 1", "VERTEXMATERIALGROUPS 1 6 0"]
+    return lines
+
+def test_weld_within_skin_groups():
+    mesh, _ = dmspritedef2_parse(mesh_lines(), arrays=True)
+    welded = weld_mesh(mesh)
+
+    assert welded['vertices'].tolist() == [[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0], [1, 0, 0]]
+    assert len(welded['uvs']) == len(welded['normals']) == len(welded['colors']) == 5
+    # The third face collapses once vertex 3 becomes vertex 0
+    assert welded['faces'].tolist() == [[2, 1, 0], [2, 3, 0]]
+    assert welded['passable'].tolist() == [False, False]
+    assert welded['vertex_groups'] == [(0, 4, 0), (4, 5, 1)]
+    assert welded['vertex_bone_indices'].tolist() == [0, 0, 0, 0, 1]
+    assert welded['vertex_materials'] == [(0, 5, 0)]
+    assert welded['face_materials'] == [(0, 2, 0), (2, 2, 1)]
+    assert welded['face_material_indices'].tolist() == [0, 0]
+    assert len(mesh['vertices']) == 6
+
+def test_epsilon_weld_and_meshops():
+    mesh, _ = dmspritedef2_parse(mesh_lines(last_z="0.00001"), arrays=True)
+    assert len(weld_mesh(mesh)['vertices']) == 6
+    assert len(weld_mesh(mesh, epsilon=0.001)['vertices']) == 5
+
+    mesh['meshops'] = [["MESHOP_VA", "1", "2", "0", "0.5", "1"]]
+    assert weld_mesh(mesh, epsilon=0.001) is mesh